@@ -1,4 +1,6 @@
+from datetime import datetime
 from sqlmodel import Session, select
+from app.controllers import stats_controller
 from app.models.account_model import Account
 from app.services.database import engine
 
@@ -23,6 +25,9 @@ def update_account(account_id: int, data: dict) -> Account | None:
     with Session(engine) as session:
         account = session.get(Account, account_id)
         if account:
+            if "platform" in data and data["platform"] != account.platform:
+                # 按天汇总按平台分组，改平台时在同一事务中把该账号的汇总移到新平台下
+                stats_controller.move_account_rollup(session, account_id, data["platform"])
             for key, value in data.items():
                 setattr(account, key, value)
             session.add(account)
@@ -35,6 +40,8 @@ def delete_account(account_id: int) -> bool:
     with Session(engine) as session:
         account = session.get(Account, account_id)
         if account:
+            # 发布记录随账号级联删除，对应的按天汇总也在同一事务中删除
+            stats_controller.delete_account_rollup(session, account_id)
             session.delete(account)
             session.commit()
             return True
@@ -43,3 +50,14 @@ def delete_account(account_id: int) -> bool:
 def get_account_by_id(account_id: int) -> Account | None:
     with Session(engine) as session:
         return session.get(Account, account_id)
+
+
+def update_login_health(account_id: int, status: str, expires_at: datetime | None) -> None:
+    with Session(engine) as session:
+        account = session.get(Account, account_id)
+        if account:
+            account.login_status = status
+            account.session_expires_at = expires_at
+            account.login_checked_at = datetime.utcnow()
+            session.add(account)
+            session.commit()
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, insert
+from sqlmodel import Session, select, delete, update
+from app.models.publish_content_model import PublishContent
+from app.services.database import engine
+
+# A claim still unsettled after this long belongs to a run that crashed, was killed or failed to record
+# its result; the next claim_contents hands such rows back to the batch
+CLAIM_TIMEOUT = timedelta(hours=24)
+
+
+def add_contents(rows: list[dict]) -> int:
+    """
+    Bulk-inserts rendered contents (dicts with PublishContent fields) in one executemany.
+    """
+    if not rows:
+        return 0
+    with Session(engine) as session:
+        session.execute(insert(PublishContent), rows)
+        session.commit()
+    return len(rows)
+
+
+def batch_exists(batch: str) -> bool:
+    with Session(engine) as session:
+        return session.exec(select(PublishContent.id).where(PublishContent.batch == batch).limit(1)).first() is not None
+
+
+def get_batches() -> list[tuple[str, int, int]]:
+    """
+    Returns (batch, total, pending) for every batch, newest first.
+    """
+    with Session(engine) as session:
+        pending = func.sum(case((PublishContent.status == "pending", 1), else_=0))
+        statement = (
+            select(PublishContent.batch, func.count(PublishContent.id), pending)
+            .group_by(PublishContent.batch)
+            .order_by(func.max(PublishContent.id).desc())
+        )
+        return [(batch, total, pending or 0) for batch, total, pending in session.exec(statement).all()]
+
+
+def claim_contents(batch: str, account_ids: list[int]) -> dict[int, PublishContent]:
+    """
+    Claims the oldest pending content of the batch for each account that has one.
+
+    The pick and the pending -> claimed transition are a single UPDATE ... RETURNING, so two runs
+    started at the same time never get the same row. Claimed rows are settled by settle_content
+    once the job is recorded, or handed back with release_contents if the run never starts;
+    claims older than CLAIM_TIMEOUT are released first.
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.exec(
+            update(PublishContent)
+            .where(PublishContent.status == "claimed")
+            .where(PublishContent.claimed_at < now - CLAIM_TIMEOUT)
+            .values(status="pending", claimed_at=None)
+        )
+        first_ids = (
+            select(func.min(PublishContent.id))
+            .where(PublishContent.batch == batch)
+            .where(PublishContent.status == "pending")
+            .where(PublishContent.account_id.in_(account_ids))
+            .group_by(PublishContent.account_id)
+        )
+        statement = (
+            update(PublishContent)
+            .where(PublishContent.id.in_(first_ids))
+            .where(PublishContent.status == "pending")
+            .values(status="claimed", claimed_at=now)
+            .returning(PublishContent)
+        )
+        contents = {content.account_id: content for content in session.exec(statement).scalars()}
+        # Detach before committing so the returned rows keep their loaded values
+        session.expunge_all()
+        session.commit()
+        return contents
+
+
+def release_contents(content_ids: list[int]) -> None:
+    """
+    Hands claimed contents back to the batch (the run was rejected before it started).
+    """
+    if not content_ids:
+        return
+    with Session(engine) as session:
+        session.exec(
+            update(PublishContent)
+            .where(PublishContent.id.in_(content_ids))
+            .where(PublishContent.status == "claimed")
+            .values(status="pending", claimed_at=None)
+        )
+        session.commit()
+
+
+def settle_content(session: Session, content_id: int, used: bool) -> None:
+    """
+    Marks a claimed content used after a successful publish, or returns it to pending otherwise.
+    Runs in the caller's session so it commits together with the publication record.
+    """
+    session.exec(
+        update(PublishContent)
+        .where(PublishContent.id == content_id)
+        .where(PublishContent.status == "claimed")
+        .values(status="used" if used else "pending", claimed_at=None)
+    )
+
+
+def delete_batch(batch: str) -> None:
+    with Session(engine) as session:
+        session.exec(delete(PublishContent).where(PublishContent.batch == batch))
+        session.commit()
@@ -1,6 +1,19 @@
-from sqlmodel import Session
+import html
+import re
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+from app.controllers import content_controller, stats_controller
+from app.models.account_model import Account
 from app.models.publication_record_model import PublicationRecord
-from app.services.database import engine
+from app.services.database import (
+    PUBLICATION_FTS_TABLE, PUBLICATION_GRAM_FTS_TABLE, engine, publication_search_grams,
+)
+
+# The trigram tokenizer only indexes terms of at least this many characters; shorter ones use the gram index
+MIN_FTS_TERM_LENGTH = 3
+SNIPPET_LENGTH = 80
 
 
 def add_publication_record(
@@ -9,9 +22,13 @@ def add_publication_record(
     description: str,
     media_paths: list[str],
     status: str,
+    duration_ms: int | None = None,
+    diagnostics_path: str | None = None,
+    content_id: int | None = None,
 ) -> PublicationRecord:
     """
-    Adds a new publication record to the database.
+    Adds a new publication record to the database and updates its daily rollup in the same transaction.
+    content_id is the batch content the job claimed: it becomes used on success and pending again otherwise.
     """
     with Session(engine) as session:
         # Convert list of paths to a single string
@@ -23,8 +40,150 @@ def add_publication_record(
             description=description,
             media_paths=media_paths_str,
             status=status,
+            duration_ms=duration_ms,
+            diagnostics_path=diagnostics_path,
+            search_grams=publication_search_grams(title, description),
         )
         session.add(record)
+        account = session.get(Account, account_id) if account_id is not None else None
+        stats_controller.update_rollup(session, record, account.platform if account else "")
+        if content_id is not None:
+            content_controller.settle_content(session, content_id, used=status == "success")
         session.commit()
         session.refresh(record)
         return record
+
+
+def get_publication_records(
+    account_id: int | None = None,
+    status: str | None = None,
+    limit: int = 50,
+) -> list[PublicationRecord]:
+    """
+    Returns the most recent publication records, optionally filtered by account and status.
+    """
+    with Session(engine) as session:
+        statement = select(PublicationRecord)
+        if account_id is not None:
+            statement = statement.where(PublicationRecord.account_id == account_id)
+        if status:
+            statement = statement.where(PublicationRecord.status == status)
+        statement = statement.order_by(PublicationRecord.published_at.desc()).limit(limit)
+        return session.exec(statement).all()
+
+
+def _split_terms(query: str) -> list[str]:
+    return [term for term in query.split() if term]
+
+
+def _quote(term: str) -> str:
+    # A quoted FTS5 string, so that operators and punctuation in the query are literal
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def _highlight(value: str, terms: list[str], length: int | None = None) -> str:
+    """
+    HTML-escapes value and wraps every occurrence of the terms in <b>. With length, only a window
+    of that many characters around the first match is kept (a snippet).
+    """
+    value = value or ""
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.I)
+    if length is not None and len(value) > length:
+        match = pattern.search(value)
+        start = max(0, match.start() - length // 4) if match else 0
+        end = start + length
+        value = ("…" if start else "") + value[start:end] + ("…" if end < len(value) else "")
+    parts = []
+    position = 0
+    for match in pattern.finditer(value):
+        parts.append(html.escape(value[position:match.start()]))
+        parts.append(f"<b>{html.escape(match.group())}</b>")
+        position = match.end()
+    parts.append(html.escape(value[position:]))
+    return "".join(parts)
+
+
+def search_publication_records(
+    query: str,
+    account_id: int | None = None,
+    status: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    """
+    Full-text search over the title and description of the publication records.
+
+    Terms are ANDed. Terms of 3+ characters use the trigram FTS5 index and the results are ranked by bm25
+    (title matches weigh more); shorter terms look up the gram index (see publication_search_grams)
+    and are then checked with LIKE, which keeps punctuation in them exact.
+    since/until are inclusive days. Each row has the record fields plus username/platform and
+    title_html/description_html, HTML-escaped with the matches in <b>.
+    """
+    terms = _split_terms(query)
+    if not terms:
+        return []
+
+    fts_terms = [term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH]
+    like_terms = [term for term in terms if len(term) < MIN_FTS_TERM_LENGTH]
+    # Terms without any letter or digit have no grams and are matched by LIKE alone
+    gram_terms = [term for term in like_terms if any(char.isalnum() for char in term)]
+    params = {"limit": limit}
+    conditions = []
+    if gram_terms:
+        params["grams"] = " ".join(_quote(term) for term in gram_terms)
+        conditions.append(
+            f"publicationrecord.id IN (SELECT rowid FROM {PUBLICATION_GRAM_FTS_TABLE} "
+            f"WHERE {PUBLICATION_GRAM_FTS_TABLE} MATCH :grams)"
+        )
+    if fts_terms:
+        params["match"] = " ".join(_quote(term) for term in fts_terms)
+        source = (
+            f"{PUBLICATION_FTS_TABLE} JOIN publicationrecord ON publicationrecord.id = {PUBLICATION_FTS_TABLE}.rowid"
+        )
+        conditions.append(f"{PUBLICATION_FTS_TABLE} MATCH :match")
+        order = f"bm25({PUBLICATION_FTS_TABLE}, 10.0, 1.0), publicationrecord.published_at DESC"
+    else:
+        source = "publicationrecord"
+        order = "publicationrecord.published_at DESC"
+    for i, term in enumerate(like_terms):
+        params[f"like_{i}"] = "%{}%".format(term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+        conditions.append(
+            f"(publicationrecord.title LIKE :like_{i} ESCAPE '\\' OR publicationrecord.description LIKE :like_{i} ESCAPE '\\')"
+        )
+    if account_id is not None:
+        params["account_id"] = account_id
+        conditions.append("publicationrecord.account_id = :account_id")
+    if status:
+        params["status"] = status
+        conditions.append("publicationrecord.status = :status")
+    # published_at is stored as 'YYYY-MM-DD HH:MM:SS[.ffffff]', so whole days compare as strings
+    if since is not None:
+        params["since"] = since.isoformat()
+        conditions.append("publicationrecord.published_at >= :since")
+    if until is not None:
+        params["until"] = (until + timedelta(days=1)).isoformat()
+        conditions.append("publicationrecord.published_at < :until")
+
+    statement = text(
+        f"""
+        SELECT publicationrecord.id, publicationrecord.title, publicationrecord.description,
+               publicationrecord.status, publicationrecord.published_at, publicationrecord.account_id,
+               account.username, account.platform
+        FROM {source}
+        LEFT JOIN account ON account.id = publicationrecord.account_id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {order}
+        LIMIT :limit
+        """
+    )
+    with Session(engine) as session:
+        rows = session.execute(statement, params).mappings().all()
+
+    results = []
+    for row in rows:
+        result = dict(row)
+        result["title_html"] = _highlight(row["title"], terms)
+        result["description_html"] = _highlight(row["description"], terms, SNIPPET_LENGTH)
+        results.append(result)
+    return results
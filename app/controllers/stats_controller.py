@@ -0,0 +1,170 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, delete, select
+from app.models.account_model import Account
+from app.models.publication_record_model import PublicationRecord
+from app.models.publication_stat_model import PublicationDailyStat
+from app.services.database import engine
+
+
+def update_rollup(session: Session, record: PublicationRecord, platform: str) -> None:
+    """
+    Adds one publication record to its daily rollup row (upsert). Call inside the transaction that writes the record.
+    """
+    has_duration = record.duration_ms is not None
+    duration = record.duration_ms or 0
+    values = {
+        "day": record.published_at.date().isoformat(),
+        "platform": platform or "",
+        "account_id": record.account_id or 0,
+        "total": 1,
+        "succeeded": int(record.status == "success"),
+        "failed": int(record.status == "failed"),
+        "cancelled": int(record.status == "cancelled"),
+        "duration_total_ms": duration,
+        "duration_count": int(has_duration),
+        "duration_max_ms": duration,
+    }
+    session.execute(_merge_into_existing(insert(PublicationDailyStat).values(**values)))
+
+
+def _merge_into_existing(statement):
+    """
+    Turns an insert into the rollup into an upsert that adds the counters to an existing row.
+    """
+    excluded = statement.excluded
+    stat = PublicationDailyStat
+    return statement.on_conflict_do_update(
+        index_elements=["day", "platform", "account_id"],
+        set_={
+            "total": stat.total + excluded.total,
+            "succeeded": stat.succeeded + excluded.succeeded,
+            "failed": stat.failed + excluded.failed,
+            "cancelled": stat.cancelled + excluded.cancelled,
+            "duration_total_ms": stat.duration_total_ms + excluded.duration_total_ms,
+            "duration_count": stat.duration_count + excluded.duration_count,
+            "duration_max_ms": func.max(stat.duration_max_ms, excluded.duration_max_ms),
+        },
+    )
+
+
+def move_account_rollup(session: Session, account_id: int, platform: str) -> None:
+    """
+    Re-files an account's rollup rows under its new platform, merging days that already have a row there.
+    Call inside the transaction that changes Account.platform.
+    """
+    stat = PublicationDailyStat
+    moved = (
+        select(
+            stat.day, literal(platform or ""), stat.account_id,
+            func.sum(stat.total), func.sum(stat.succeeded), func.sum(stat.failed), func.sum(stat.cancelled),
+            func.sum(stat.duration_total_ms), func.sum(stat.duration_count), func.max(stat.duration_max_ms),
+        )
+        .where(stat.account_id == account_id)
+        .where(stat.platform != (platform or ""))
+        .group_by(stat.day, stat.account_id)
+    )
+    columns = [
+        "day", "platform", "account_id", "total", "succeeded", "failed", "cancelled",
+        "duration_total_ms", "duration_count", "duration_max_ms",
+    ]
+    session.execute(_merge_into_existing(insert(stat).from_select(columns, moved)))
+    session.exec(delete(stat).where(stat.account_id == account_id).where(stat.platform != (platform or "")))
+
+
+def delete_account_rollup(session: Session, account_id: int) -> None:
+    """
+    Drops the rollup rows of an account whose records are being deleted. Call inside the same transaction.
+    """
+    session.exec(delete(PublicationDailyStat).where(PublicationDailyStat.account_id == account_id))
+
+
+def get_statistics(
+    group_by: str = "platform",
+    since: date | None = None,
+    until: date | None = None,
+    platform: str | None = None,
+    account_id: int | None = None,
+) -> list[dict]:
+    """
+    Aggregates the daily rollups, grouped by "platform", "account" or "day".
+
+    Each row has total/succeeded/failed/cancelled, success_rate, per_day (throughput over the
+    selected days) and avg/max duration in milliseconds.
+    """
+    stat = PublicationDailyStat
+    columns = {
+        "platform": [stat.platform],
+        "account": [stat.platform, stat.account_id, Account.username],
+        "day": [stat.day],
+    }[group_by]
+    statement = select(
+        *columns,
+        func.sum(stat.total),
+        func.sum(stat.succeeded),
+        func.sum(stat.failed),
+        func.sum(stat.cancelled),
+        func.sum(stat.duration_total_ms),
+        func.sum(stat.duration_count),
+        func.max(stat.duration_max_ms),
+        func.min(stat.day),
+        func.max(stat.day),
+    )
+    if group_by == "account":
+        statement = statement.outerjoin(Account, Account.id == stat.account_id)
+    if since is not None:
+        statement = statement.where(stat.day >= since.isoformat())
+    if until is not None:
+        statement = statement.where(stat.day <= until.isoformat())
+    if platform:
+        statement = statement.where(stat.platform == platform)
+    if account_id is not None:
+        statement = statement.where(stat.account_id == account_id)
+    statement = statement.group_by(*columns[:2] if group_by == "account" else columns)
+    statement = statement.order_by(stat.day.desc() if group_by == "day" else func.sum(stat.total).desc())
+
+    with Session(engine) as session:
+        rows = session.execute(statement).all()
+
+    results = []
+    for row in rows:
+        keys = row[:len(columns)]
+        total, succeeded, failed, cancelled, duration_total, duration_count, duration_max, first_day, last_day = (
+            row[len(columns):]
+        )
+        # 吞吐量按所选时间范围（未指定时按该分组实际有数据的日期范围）折算为每天发布数
+        start = since or date.fromisoformat(first_day)
+        end = until or (utc_today() if since else date.fromisoformat(last_day))
+        days = 1 if group_by == "day" else max((end - start).days + 1, 1)
+        result = {
+            "total": total,
+            "succeeded": succeeded,
+            "failed": failed,
+            "cancelled": cancelled,
+            "success_rate": succeeded / total if total else 0.0,
+            "per_day": total / days,
+            "avg_duration_ms": duration_total / duration_count if duration_count else None,
+            "max_duration_ms": duration_max if duration_count else None,
+        }
+        if group_by == "platform":
+            result["platform"] = keys[0]
+        elif group_by == "account":
+            result["platform"], result["account_id"], result["username"] = keys
+        else:
+            result["day"] = keys[0]
+        results.append(result)
+    return results
+
+
+def utc_today() -> date:
+    # Rollup days are UTC dates, like PublicationRecord.published_at
+    return datetime.utcnow().date()
+
+
+def days_back(days: int) -> date:
+    """
+    The first day (UTC) of a window of `days` days ending today.
+    """
+    return utc_today() - timedelta(days=days - 1)
@@ -0,0 +1,44 @@
+from sqlmodel import Session, select
+from app.models.publish_template_model import PublishTemplate
+from app.services.database import engine
+
+
+def add_template(name: str, title_template: str, description_template: str) -> PublishTemplate:
+    with Session(engine) as session:
+        template = PublishTemplate(name=name, title_template=title_template, description_template=description_template)
+        session.add(template)
+        session.commit()
+        session.refresh(template)
+        return template
+
+
+def get_all_templates() -> list[PublishTemplate]:
+    with Session(engine) as session:
+        return session.exec(select(PublishTemplate)).all()
+
+
+def get_template_by_id(template_id: int) -> PublishTemplate | None:
+    with Session(engine) as session:
+        return session.get(PublishTemplate, template_id)
+
+
+def update_template(template_id: int, data: dict) -> PublishTemplate | None:
+    with Session(engine) as session:
+        template = session.get(PublishTemplate, template_id)
+        if template:
+            for key, value in data.items():
+                setattr(template, key, value)
+            session.add(template)
+            session.commit()
+            session.refresh(template)
+        return template
+
+
+def delete_template(template_id: int) -> bool:
+    with Session(engine) as session:
+        template = session.get(PublishTemplate, template_id)
+        if template:
+            session.delete(template)
+            session.commit()
+            return True
+        return False
@@ -2,6 +2,9 @@
 
 from .account_model import Account
 from .publication_record_model import PublicationRecord
+from .publish_template_model import PublishTemplate
+from .publish_content_model import PublishContent
+from .publication_stat_model import PublicationDailyStat
 
 # 兼容 Pydantic v2 / v1 的前向引用处理
 
@@ -17,4 +20,7 @@ except AttributeError:
 __all__ = [
     "Account",
     "PublicationRecord",
+    "PublishTemplate",
+    "PublishContent",
+    "PublicationDailyStat",
 ]
@@ -1,4 +1,6 @@
+from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import DateTime
 from sqlmodel import Field, SQLModel, Relationship
 
 if TYPE_CHECKING:
@@ -11,6 +13,10 @@ class Account(SQLModel, table=True):
     username: str
     password: str
     remark: Optional[str] = None
+    # 登录健康状态，由 SessionKeeper 定期更新: "healthy", "expiring", "expired", "unknown"
+    login_status: Optional[str] = None
+    session_expires_at: Optional[datetime] = Field(default=None, sa_type=DateTime)  # 登录 Cookie 中最早的过期时间 (UTC)
+    login_checked_at: Optional[datetime] = Field(default=None, sa_type=DateTime)
 
     publication_records: List["PublicationRecord"] = Relationship(
         back_populates="account",
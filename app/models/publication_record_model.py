@@ -1,4 +1,5 @@
 from typing import Optional, List
+from sqlalchemy import DateTime
 from sqlmodel import Field, SQLModel, Relationship
 from datetime import datetime
 from .account_model import Account
@@ -9,8 +10,11 @@ class PublicationRecord(SQLModel, table=True):
     title: str
     description: str
     media_paths: str  # Storing as a semicolon-separated string
-    status: str = Field(index=True) # e.g., "success", "failed"
-    published_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    status: str = Field(index=True) # e.g., "success", "failed", "cancelled"
+    published_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, sa_type=DateTime)
+    duration_ms: Optional[int] = None  # 从任务开始到结束的耗时
+    diagnostics_path: Optional[str] = None  # 失败诊断目录（截图、事件与 trace），可能已被保留策略删除
+    search_grams: Optional[str] = None  # 标题与正文的单字/双字索引词（空格分隔），供 1-2 字检索词走索引
     
     account_id: Optional[int] = Field(default=None, foreign_key="account.id")
     # This is a forward reference, so it's a string.
@@ -0,0 +1,19 @@
+from sqlmodel import Field, SQLModel
+
+
+class PublicationDailyStat(SQLModel, table=True):
+    """
+    publicationrecord 的按天汇总（UTC 日期 × 平台 × 账号），写入发布记录时在同一事务中增量更新，
+    统计页面只读这张表，不需要扫描发布记录。
+    """
+    day: str = Field(primary_key=True)  # YYYY-MM-DD (UTC)
+    platform: str = Field(primary_key=True)
+    account_id: int = Field(primary_key=True)  # 0 when the record has no account
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    # 耗时（毫秒）：只统计有 duration_ms 的记录
+    duration_total_ms: int = 0
+    duration_count: int = 0
+    duration_max_ms: int = 0
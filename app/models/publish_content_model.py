@@ -0,0 +1,20 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import DateTime
+from sqlmodel import Field, SQLModel
+
+
+class PublishContent(SQLModel, table=True):
+    """
+    模板按账号渲染出的一条发布内容；同一次批量生成的内容共用一个 batch 名称。
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    batch: str = Field(index=True)
+    template_id: Optional[int] = Field(default=None, foreign_key="publishtemplate.id")
+    account_id: int = Field(foreign_key="account.id", index=True)
+    title: str
+    description: str
+    media_paths: str = ""  # Semicolon-separated; empty means use the media chosen in the publish form
+    status: str = Field(default="pending", index=True)  # "pending", "claimed" (a run has it) or "used"
+    claimed_at: Optional[datetime] = Field(default=None, sa_type=DateTime)  # When a run claimed it; stale claims expire
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, sa_type=DateTime)
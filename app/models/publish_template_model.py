@@ -0,0 +1,13 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import DateTime
+from sqlmodel import Field, SQLModel
+
+
+class PublishTemplate(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(index=True, unique=True)
+    # 模板语法见 app/services/template_engine.py，例如 "{{ username }} 的新品 {{ tags|hashtags }}"
+    title_template: str
+    description_template: str
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, sa_type=DateTime)
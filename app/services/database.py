@@ -1,13 +1,207 @@
+import logging
+import os
+from sqlalchemy.exc import OperationalError
 from sqlmodel import create_engine, SQLModel
 
 # Import all models here to ensure they are registered with SQLModel's metadata
 from app.models.account_model import Account
 from app.models.publication_record_model import PublicationRecord
+from app.models.publish_template_model import PublishTemplate
+from app.models.publish_content_model import PublishContent
+from app.models.publication_stat_model import PublicationDailyStat
 
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = "sqlite:///database.db"
-engine = create_engine(DATABASE_URL, echo=True)
+# SQL echo is useful while debugging but slows startup and floods stdout; enable with PUBX_SQL_ECHO=1
+engine = create_engine(DATABASE_URL, echo=os.environ.get("PUBX_SQL_ECHO") == "1")
+
+# Bump whenever the tables change; stored in SQLite's PRAGMA user_version
+# 2: Account login health columns (login_status, session_expires_at, login_checked_at)
+# 3: PublishTemplate and PublishContent tables
+# 4: PublicationRecord.duration_ms and the PublicationDailyStat rollup (backfilled from existing records)
+# 5: publicationrecord_fts full-text index over title/description, kept in sync by triggers
+# 6: PublicationRecord.diagnostics_path
+# 7: PublicationRecord.search_grams and the publicationrecord_gram_fts index for 1-2 character terms
+# 8: PublishContent.claimed_at; claims made before it existed are handed back to their batch
+# 9: Rollup rebuilt so every account's rows are filed under its current platform
+SCHEMA_VERSION = 9
+
+# External-content FTS5 index: stores only the index, the text stays in publicationrecord
+PUBLICATION_FTS_TABLE = "publicationrecord_fts"
+# Index over PublicationRecord.search_grams, for terms too short for the trigram tokenizer
+PUBLICATION_GRAM_FTS_TABLE = "publicationrecord_gram_fts"
+
+
+def publication_search_grams(*texts) -> str:
+    """
+    Every letter/digit and every pair of adjacent letters/digits of the texts, lowercased and
+    space-separated: the tokens that let 1-2 character terms (mostly Chinese) use an index.
+    """
+    grams = set()
+    for value in texts:
+        value = (value or "").lower()
+        for i, char in enumerate(value):
+            if not char.isalnum():
+                continue
+            grams.add(char)
+            if i + 1 < len(value) and value[i + 1].isalnum():
+                grams.add(value[i:i + 2])
+    return " ".join(sorted(grams))
+
+
+def create_publication_search_index(connection):
+    """
+    Creates the FTS5 index and its sync triggers, then builds it from the existing records.
+
+    The trigram tokenizer (SQLite >= 3.34) matches any substring of 3+ characters, which is what
+    Chinese text needs (unicode61 would treat a whole run of CJK characters as one token).
+    """
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {PUBLICATION_FTS_TABLE}")
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {PUBLICATION_FTS_TABLE} USING fts5("
+                f"title, description, content='publicationrecord', content_rowid='id', tokenize='{tokenizer}')"
+            )
+            break
+        except OperationalError:
+            if tokenizer == "unicode61":
+                raise
+            logger.warning(
+                "SQLite %s 不支持 trigram 分词器（需要 3.34+），发布记录的全文检索改用 unicode61："
+                "3 字及以上的中文检索词只能匹配完整的词",
+                connection.exec_driver_sql("SELECT sqlite_version()").scalar(),
+            )
+    fts = PUBLICATION_FTS_TABLE
+    for statement in (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS publicationrecord_fts_insert AFTER INSERT ON publicationrecord BEGIN
+            INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS publicationrecord_fts_delete AFTER DELETE ON publicationrecord BEGIN
+            INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS publicationrecord_fts_update AFTER UPDATE OF title, description
+        ON publicationrecord BEGIN
+            INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        """,
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+def create_publication_gram_index(connection):
+    """
+    Fills PublicationRecord.search_grams for the existing records, then creates the FTS5 index over it
+    and its sync triggers. unicode61 splits search_grams on the spaces, so every gram is one token.
+    """
+    rows = connection.exec_driver_sql("SELECT id, title, description FROM publicationrecord").all()
+    if rows:
+        connection.exec_driver_sql(
+            "UPDATE publicationrecord SET search_grams = ? WHERE id = ?",
+            [(publication_search_grams(title, description), record_id) for record_id, title, description in rows],
+        )
+    fts = PUBLICATION_GRAM_FTS_TABLE
+    for statement in (
+        f"DROP TABLE IF EXISTS {fts}",
+        f"""
+        CREATE VIRTUAL TABLE {fts} USING fts5(
+            search_grams, content='publicationrecord', content_rowid='id', tokenize='unicode61'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS publicationrecord_gram_fts_insert AFTER INSERT ON publicationrecord BEGIN
+            INSERT INTO {fts}(rowid, search_grams) VALUES (new.id, new.search_grams);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS publicationrecord_gram_fts_delete AFTER DELETE ON publicationrecord BEGIN
+            INSERT INTO {fts}({fts}, rowid, search_grams) VALUES ('delete', old.id, old.search_grams);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS publicationrecord_gram_fts_update AFTER UPDATE OF search_grams
+        ON publicationrecord BEGIN
+            INSERT INTO {fts}({fts}, rowid, search_grams) VALUES ('delete', old.id, old.search_grams);
+            INSERT INTO {fts}(rowid, search_grams) VALUES (new.id, new.search_grams);
+        END
+        """,
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+# Data migrations run once, in order, when upgrading past the given version (after the tables and columns exist).
+# Each step is a SQL string or a callable taking the connection.
+# Rebuilds the whole daily rollup from the publication records
+REBUILD_ROLLUP = [
+    "DELETE FROM publicationdailystat",
+    """
+    INSERT INTO publicationdailystat (
+        day, platform, account_id, total, succeeded, failed, cancelled,
+        duration_total_ms, duration_count, duration_max_ms
+    )
+    SELECT
+        date(r.published_at), COALESCE(a.platform, ''), COALESCE(r.account_id, 0), count(*),
+        sum(r.status = 'success'), sum(r.status = 'failed'), sum(r.status = 'cancelled'),
+        COALESCE(sum(r.duration_ms), 0), count(r.duration_ms), COALESCE(max(r.duration_ms), 0)
+    FROM publicationrecord r LEFT JOIN account a ON a.id = r.account_id
+    GROUP BY 1, 2, 3
+    """,
+]
+
+MIGRATIONS = {
+    4: REBUILD_ROLLUP,
+    5: [create_publication_search_index],
+    7: [create_publication_gram_index],
+    # Without a timestamp these claims could never expire; any run that held them is gone after the upgrade
+    8: ["UPDATE publishcontent SET status = 'pending' WHERE status = 'claimed'"],
+    # Platform changes used to leave the rollup rows under the old platform
+    9: REBUILD_ROLLUP,
+}
+
+
+def get_schema_version(connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def add_missing_columns(connection):
+    """
+    create_all only creates missing tables; columns added to an existing model are added here.
+    New columns must be nullable (or have a server default) for ALTER TABLE ADD COLUMN to work.
+    """
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
 
 
 def create_db_and_tables():
+    # An up-to-date database costs a single PRAGMA read instead of create_all's per-table checks
+    with engine.connect() as connection:
+        current_version = get_schema_version(connection)
+        if current_version == SCHEMA_VERSION:
+            return
+
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        add_missing_columns(connection)
+        for version in sorted(MIGRATIONS):
+            if current_version < version <= SCHEMA_VERSION:
+                for step in MIGRATIONS[version]:
+                    if callable(step):
+                        step(connection)
+                    else:
+                        connection.exec_driver_sql(step)
+        connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
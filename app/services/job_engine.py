@@ -0,0 +1,278 @@
+import asyncio
+import contextlib
+import time
+import uuid
+from collections import defaultdict
+
+from app.controllers import publication_controller
+from app.services import job_runner
+from app.services.resource_watchdog import ResourceWatchdog
+
+
+class PublishJob:
+    """
+    一次批量发布（一个或多个账号）。事件按顺序保存，调用方可以从任意序号开始增量读取。
+    """
+
+    def __init__(self, jobs, task_data):
+        self.id = uuid.uuid4().hex[:12]
+        self.created_at = time.time()
+        # key 用作失败诊断的目录名，按时间排序且在所有批次中唯一
+        prefix = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.created_at))
+        self.jobs = [{**job, "key": f"{prefix}-{self.id}-{job['index']}"} for job in jobs]
+        self.task_data = task_data
+        self.status = "queued"  # queued / running / finished
+        self.results = {}  # job_index -> (success, error)
+        self.statuses = {}  # job_index -> success / failed / cancelled
+        self.started_at = {}  # job_index -> time.time() of its job_started event
+        self.diagnostics = {}  # job_index -> 失败诊断目录
+        self.events = []  # (seq, timestamp, event)
+        self.listeners = []
+        self.task = None
+        self.control = job_runner.ShardControl()  # 进程内执行时的取消入口
+        self.coordinator = None  # 多进程执行时的取消入口
+        self._changed = asyncio.Condition()
+        self._done = asyncio.Event()
+
+    @property
+    def success(self):
+        return len(self.results) == len(self.jobs) and all(success for success, _ in self.results.values())
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    async def wait(self):
+        await self._done.wait()
+
+    async def wait_events(self, since=0, timeout=0.0):
+        """
+        返回序号 >= since 的事件；没有新事件时最多等待 timeout 秒（长轮询）。
+        """
+        if timeout > 0 and since >= len(self.events) and not self._done.is_set():
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: since < len(self.events) or self._done.is_set()),
+                        timeout,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        return self.events[since:]
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.jobs),
+            "finished": len(self.results),
+            "succeeded": sum(1 for success, _ in self.results.values() if success),
+            "cancelled": sum(1 for status in self.statuses.values() if status == "cancelled"),
+            "created_at": self.created_at,
+            "accounts": [job["account"]["username"] for job in self.jobs],
+        }
+
+    def describe_event(self, seq, timestamp, event) -> dict:
+        """
+        把内部事件元组转换为便于序列化（JSON）的字典。
+        """
+        kind, job_index = event[0], event[1]
+        described = {"seq": seq, "time": timestamp, "type": kind}
+        if job_index is not None:
+            described["account"] = self.jobs[job_index]["account"]["username"]
+        if kind == "resources":
+            described["sample"] = event[2]
+        elif kind == "log":
+            described["message"] = event[2]
+        elif kind == "progress":
+            described.update(event[2])
+        elif kind == "diagnostics":
+            described["path"] = event[2]
+        elif kind == "job_finished":
+            described["success"], described["error"] = event[2], event[3]
+        elif kind == "job_recorded":
+            described["status"], described["saved"] = event[2], event[3]
+        return described
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+
+class JobEngine:
+    """
+    异步发布任务引擎：UI 与 MCP 服务共用同一套调度、结果入库与事件流。
+
+    所有入口都只在事件循环中提交任务，不会阻塞调用方；数据库写入放在线程池中执行。
+    watchdog_options 为 ResourceWatchdog 的参数：引擎只有一个看门狗，统计本进程与全部工作进程中的浏览器，
+    采样结果推送给所有执行中的批次，限流与回收决策下发到各个工作进程。
+    """
+
+    def __init__(
+        self, processes=1, concurrency=1, max_running=4, keep_finished=200, watchdog_options=None,
+        diagnostics_options=None,
+    ):
+        self.processes = processes
+        self.concurrency = concurrency  # 每个进程（或进程内执行时整个批次）同时打开的浏览器数
+        self.watchdog_options = watchdog_options
+        self.diagnostics_options = diagnostics_options
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self.profile_locks = defaultdict(asyncio.Lock)  # account_id -> 浏览器缓存目录锁
+        self.watchdog = None
+        self._watchdog_task = None
+        self._watched = {}  # job_id -> (PublishJob, emit)，执行中、接收资源采样的批次
+        self._running = asyncio.Semaphore(max_running)
+
+    def submit(self, jobs, task_data, on_event=None) -> PublishJob:
+        """
+        提交一批任务并立即返回；jobs 为 job_runner.build_jobs 的结果。
+        """
+        job = PublishJob(jobs, task_data)
+        if on_event is not None:
+            job.add_listener(on_event)
+        self.jobs[job.id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        self._prune()
+        return job
+
+    def get(self, job_id) -> PublishJob | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id, job_index=None) -> bool:
+        """
+        取消整批任务或其中一个任务（job_index）。必须在引擎所在的事件循环线程中调用。
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status == "finished":
+            return False
+        if job.coordinator is not None:
+            job.coordinator.cancel(job_index)
+        else:
+            job.control.cancel(job_index)
+        return True
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        pending_writes = set()
+
+        def emit(event):
+            job.events.append((len(job.events), time.time(), event))
+            for listener in job.listeners:
+                listener(event)
+            if event[0] == "job_started":
+                job.started_at[event[1]] = time.time()
+            elif event[0] == "diagnostics":
+                job.diagnostics[event[1]] = event[2]
+            if event[0] in ("job_finished", "job_cancelled"):
+                if event[0] == "job_cancelled":
+                    status = "cancelled"
+                    job.results[event[1]] = (False, "已取消")
+                else:
+                    status = "success" if event[2] else "failed"
+                    job.results[event[1]] = (event[2], event[3])
+                job.statuses[event[1]] = status
+                task = loop.create_task(self._record_result(job, event[1], status, emit))
+                pending_writes.add(task)
+                task.add_done_callback(pending_writes.discard)
+            loop.create_task(job._notify())
+
+        try:
+            async with self._running:
+                job.status = "running"
+                self._watch(job, emit)
+                if job.control.cancel_all:
+                    # 排队期间已被取消，不再启动浏览器
+                    for queued in job.jobs:
+                        emit(("job_cancelled", queued["index"]))
+                elif self.processes > 1:
+                    await self._run_coordinated(job, emit)
+                else:
+                    await job_runner.run_shard(
+                        job.jobs, job.task_data, emit, self.concurrency,
+                        locks=self.profile_locks, watchdog=self.watchdog, control=job.control,
+                        diagnostics_options=self.diagnostics_options,
+                    )
+        finally:
+            self._unwatch(job)
+            if pending_writes:
+                await asyncio.gather(*pending_writes, return_exceptions=True)
+            job.status = "finished"
+            job._done.set()
+            await job._notify()
+
+    async def _run_coordinated(self, job, emit):
+        """
+        多进程执行。asyncio 锁无法跨进程共享，因此先在引擎中按账号 ID 顺序锁住本批次用到的全部账号：
+        账号有重叠的批次依次执行，互不相干的批次仍然并行。
+        """
+        loop = asyncio.get_running_loop()
+        async with contextlib.AsyncExitStack() as stack:
+            for account_id in sorted({queued["account"]["id"] for queued in job.jobs}):
+                await stack.enter_async_context(self.profile_locks[account_id])
+            if job.control.cancel_all:
+                # 等待账号期间已被取消
+                for queued in job.jobs:
+                    emit(("job_cancelled", queued["index"]))
+                return
+            job.coordinator = job_runner.JobCoordinator(
+                job.jobs, job.task_data, self.processes, self.concurrency,
+                resource_limits=self.watchdog is not None, diagnostics_options=self.diagnostics_options,
+            )
+            for job_index in job.control.cancelled:
+                job.coordinator.cancel(job_index)
+            await asyncio.to_thread(job.coordinator.run, lambda event: loop.call_soon_threadsafe(emit, event))
+
+    def _watch(self, job, emit):
+        if self.watchdog_options is None:
+            return
+        if self.watchdog is None:
+            watchdog = ResourceWatchdog(on_sample=self._on_sample, **self.watchdog_options)
+            if not watchdog.available:
+                return
+            self.watchdog = watchdog
+        self._watched[job.id] = (job, emit)
+        if self._watchdog_task is None:
+            self._watchdog_task = asyncio.get_running_loop().create_task(self.watchdog.run())
+
+    def _unwatch(self, job):
+        self._watched.pop(job.id, None)
+        if not self._watched and self._watchdog_task is not None:
+            # 没有执行中的批次时停止采样
+            self._watchdog_task.cancel()
+            self._watchdog_task = None
+            self.watchdog.reset()
+
+    def _on_sample(self, sample):
+        for job, emit in list(self._watched.values()):
+            emit(("resources", None, sample))
+            if job.coordinator is not None:
+                job.coordinator.apply_limits(sample["throttled"], sample["recycle"])
+
+    async def _record_result(self, job, job_index, status, emit):
+        account = job.jobs[job_index]["account"]
+        task_data = job_runner.job_task_data(job.jobs[job_index], job.task_data)
+        started_at = job.started_at.get(job_index)
+        try:
+            await asyncio.to_thread(
+                publication_controller.add_publication_record,
+                account_id=account["id"],
+                title=task_data["title"],
+                description=task_data["description"],
+                media_paths=task_data["media_paths"],
+                status=status,
+                # 排队中就被取消的任务没有开始时间，不计入耗时统计
+                duration_ms=int((time.time() - started_at) * 1000) if started_at is not None else None,
+                diagnostics_path=job.diagnostics.get(job_index),
+                content_id=job.jobs[job_index].get("content_id"),
+            )
+        except Exception:
+            emit(("job_recorded", job_index, status, False))
+            raise
+        emit(("job_recorded", job_index, status, True))
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.status == "finished"]
+        excess = len(finished) - self.keep_finished
+        if excess > 0:
+            for job in sorted(finished, key=lambda j: j.created_at)[:excess]:
+                del self.jobs[job.id]
@@ -0,0 +1,422 @@
+import asyncio
+import contextlib
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+from app.services.resource_watchdog import ResourceLimits, kill_process_tree, pid_alive, profile_key
+from publishers import registry
+from publishers.diagnostics import FailureDiagnostics
+
+
+# 事件均为可被 pickle 的元组，既可以在进程内直接回调 emit(event)，也可以通过管道传回协调进程：
+#   ("job_started", job_index)
+#   ("log", job_index, message)
+#   ("progress", job_index, {"step", "sent", "total", "rate"})  —— 上传进度，rate 为字节/秒
+#   ("diagnostics", job_index, path)       —— 失败诊断的保存目录，紧接着是该任务的 job_finished
+#   ("job_finished", job_index, success, error)
+#   ("job_cancelled", job_index)
+#   ("worker_exited", worker_index)
+# JobEngine 在发布记录写入数据库之后还会产生：
+#   ("job_recorded", job_index, status, saved)  —— saved 为 False 表示写入失败
+# 以及引擎中唯一的 ResourceWatchdog 的采样结果（引擎进程、全部工作进程及其浏览器），不属于某个具体任务：
+#   ("resources", None, sample)
+
+
+def account_to_dict(account) -> dict:
+    """
+    把 Account 转成普通 dict，便于跨进程传递（不携带 ORM 会话状态）。
+    """
+    return {
+        "id": account.id,
+        "platform": account.platform,
+        "username": account.username,
+        "password": account.password,
+        "remark": account.remark,
+    }
+
+
+def build_jobs(jobs) -> list[dict]:
+    """
+    把 UI 收集的 {'account': Account, 'platform': str} 列表转换为带序号的可序列化任务。
+
+    可选的 'content' 为该账号单独的内容（模板渲染结果，例如 title / description / media_paths），
+    执行时覆盖整批共用的 task_data；'content_id' 为其来源的批次内容，记录结果时据此标记已使用或退回。
+    'login_expired' 为 True 的任务（见 session_keeper.flag_expired）
+    不打开浏览器，直接记为失败。
+    """
+    return [
+        {
+            "index": i,
+            "platform": job["platform"],
+            "account": account_to_dict(job["account"]),
+            "content": job.get("content", {}),
+            "content_id": job.get("content_id"),
+            "login_expired": job.get("login_expired", False),
+        }
+        for i, job in enumerate(jobs)
+    ]
+
+
+def job_task_data(job, task_data) -> dict:
+    return {**task_data, **job.get("content", {})}
+
+
+class ShardControl:
+    """
+    记录一个分片中每个任务对应的 asyncio.Task，用于协作式取消。
+
+    取消请求可能早于任务创建（例如仍在排队），因此先登记，任务注册时立即生效。
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.cancelled = set()
+        self.cancel_all = False
+
+    def register(self, job_index, task):
+        self.tasks[job_index] = task
+        if self.cancel_all or job_index in self.cancelled:
+            task.cancel()
+
+    def cancel(self, job_index=None):
+        if job_index is None:
+            self.cancel_all = True
+            targets = list(self.tasks.values())
+        else:
+            self.cancelled.add(job_index)
+            targets = [self.tasks[job_index]] if job_index in self.tasks else []
+        for task in targets:
+            task.cancel()
+
+
+async def run_job(playwright, job, task_data, emit, watchdog=None, diagnostics_options=None):
+    index = job["index"]
+    account = SimpleNamespace(**job["account"])
+    if job.get("login_expired"):
+        emit(("job_finished", index, False, "账号登录已失效，请先重新登录（未打开浏览器）"))
+        return
+    diagnostics = None
+    if diagnostics_options is not None:
+        diagnostics = FailureDiagnostics(job.get("key") or f"job-{index}", **diagnostics_options)
+    emit(("job_started", index))
+    try:
+        publisher_cls = registry.get(job["platform"])
+        publisher = publisher_cls(
+            account, job_task_data(job, task_data), lambda message: emit(("log", index, message)),
+            playwright=playwright, watchdog=watchdog,
+            progress_callback=lambda payload: emit(("progress", index, payload)),
+            diagnostics=diagnostics,
+        )
+        await publisher.publish()
+        emit(("job_finished", index, True, ""))
+    except Exception as e:
+        if diagnostics is not None and diagnostics.saved_path:
+            emit(("diagnostics", index, diagnostics.saved_path))
+        emit(("job_finished", index, False, str(e)))
+
+
+def _needs_browser(job) -> bool:
+    if job.get("login_expired"):
+        return False
+    # 不支持的平台由 run_job 记为失败
+    publisher_cls = registry.find(job["platform"])
+    return publisher_cls is not None and publisher_cls.uses_browser
+
+
+async def run_shard(
+    jobs, task_data, emit, concurrency=1, locks=None, watchdog=None, control=None, diagnostics_options=None,
+):
+    """
+    在当前事件循环中执行一组任务，所有浏览器共用同一个 Playwright 驱动连接。
+
+    locks 为 account_id -> asyncio.Lock 的映射时，同一账号的浏览器缓存目录同一时间只会被一个任务使用。
+    watchdog 为 ResourceLimits（或 ResourceWatchdog）；提供时按其决策暂停放行新任务，并在步骤之间回收超限的浏览器。
+    control 为 ShardControl 时可以取消单个任务或整个分片；被取消的任务会关闭浏览器并上报 job_cancelled。
+    diagnostics_options 为 FailureDiagnostics 的参数（不含 job_key）；提供时失败的任务会保存诊断信息。
+    """
+    control = control or ShardControl()
+    if control.cancel_all:
+        for job in jobs:
+            emit(("job_cancelled", job["index"]))
+        return
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_limited(job):
+        try:
+            async with semaphore:
+                if watchdog is not None:
+                    await watchdog.wait_for_admission()
+                if locks is None:
+                    await run_job(playwright, job, task_data, emit, watchdog, diagnostics_options)
+                    return
+                async with locks[job["account"]["id"]]:
+                    await run_job(playwright, job, task_data, emit, watchdog, diagnostics_options)
+        except asyncio.CancelledError:
+            # 发布脚本的 finally 已关闭浏览器，async with 也已释放信号量与账号锁
+            emit(("job_cancelled", job["index"]))
+
+    async with contextlib.AsyncExitStack() as stack:
+        playwright = None
+        if any(_needs_browser(job) for job in jobs):
+            # Playwright 只在真正需要打开浏览器时才加载（例如整批账号都已失效时不启动驱动）
+            from playwright.async_api import async_playwright
+
+            playwright = await stack.enter_async_context(async_playwright())
+        tasks = []
+        for job in jobs:
+            task = asyncio.create_task(run_limited(job))
+            control.register(job["index"], task)
+            tasks.append(task)
+        await asyncio.gather(*tasks)
+
+
+async def _listen_for_control(control_queue, control, limits):
+    """
+    处理协调进程下发的消息：("cancel", job_index) 与 ("limits", throttled, recycle_profiles)。
+    """
+    while True:
+        # 带超时的阻塞读取放在线程里，保证事件循环退出时线程也能很快结束
+        try:
+            message = await asyncio.to_thread(control_queue.get, True, 0.5)
+        except queue.Empty:
+            continue
+        if message[0] == "cancel":
+            control.cancel(message[1])
+        elif message[0] == "limits" and limits is not None:
+            limits.update(message[1], message[2])
+
+
+async def _run_worker_shard(jobs, task_data, emit, concurrency, resource_limits, diagnostics_options, control_queue):
+    control = ShardControl()
+    limits = ResourceLimits() if resource_limits else None
+    listener = asyncio.create_task(_listen_for_control(control_queue, control, limits))
+    try:
+        await run_shard(
+            jobs, task_data, emit, concurrency, locks=defaultdict(asyncio.Lock),
+            watchdog=limits, control=control, diagnostics_options=diagnostics_options,
+        )
+    finally:
+        listener.cancel()
+
+
+def _worker_main(
+    worker_index, jobs, task_data, concurrency, resource_limits, diagnostics_options, control_queue, event_conn,
+):
+    """
+    工作进程入口：独立的事件循环与浏览器集合，取消请求与资源决策（resource_limits 为 True 时）通过 control_queue 下发。
+
+    事件通过本进程独占的管道回传：进程被强制结束时即使消息只写了一半，也只影响它自己的通道。
+    """
+    send_lock = threading.Lock()
+
+    def emit(event):
+        with send_lock:
+            event_conn.send(event)
+
+    try:
+        asyncio.run(_run_worker_shard(
+            jobs, task_data, emit, concurrency, resource_limits, diagnostics_options, control_queue,
+        ))
+    finally:
+        emit(("worker_exited", worker_index))
+        event_conn.close()
+
+
+def _profile_dir(job):
+    return registry.get(job["platform"]).profile_dir_for(SimpleNamespace(**job["account"]))
+
+
+def wait_for_profile_release(job, timeout=10.0) -> bool:
+    """
+    等待仍在使用账号缓存目录的 Chromium 退出，返回目录是否已释放。
+
+    不删除 Singleton* 文件：持有者退出后，Chromium 下次启动时会自行接管残留的锁；持有者仍在运行时删除它们
+    会让两个浏览器同时打开同一个目录。SingletonLock 是指向 "<主机名>-<pid>" 的符号链接（Windows 上没有）。
+    """
+    profile_dir = _profile_dir(job)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            owner = os.readlink(profile_dir / "SingletonLock")
+            pid = int(owner.rsplit("-", 1)[-1])
+        except (OSError, ValueError):
+            return True
+        if not pid_alive(pid):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.2)
+
+
+class JobCoordinator:
+    """
+    把任务分片到 N 个工作进程执行，并在调用线程中汇总各进程上报的事件。
+
+    某个进程崩溃时，只有分配给它且尚未结束的任务会被标记为失败，其余进程不受影响。
+    取消整批任务后，超过 cancel_grace 秒仍未退出的进程会被强制结束。
+    resource_limits 为 True 时，工作进程按 apply_limits() 下发的资源决策限流与回收浏览器。
+    """
+    cancel_grace = 15.0
+
+    def __init__(self, jobs, task_data, processes, concurrency=1, resource_limits=False, diagnostics_options=None):
+        self.jobs = jobs
+        self.task_data = task_data
+        self.processes = max(1, min(processes, len(jobs)))
+        self.concurrency = concurrency
+        self.resource_limits = resource_limits
+        self.diagnostics_options = diagnostics_options
+        self._lock = threading.Lock()
+        self._control_queues = None
+        self._owned = {}  # worker_index -> 分配给该进程的 job_index 集合
+        self._profile_owners = {}  # 浏览器缓存目录 -> 使用它的 worker_index
+        self._early_cancels = []  # 工作进程启动前收到的取消请求
+        self._early_limits = (False, set())  # 工作进程启动前收到的资源决策
+        self._cancel_deadline = None
+
+    def cancel(self, job_index=None):
+        """
+        取消单个任务（job_index）或整批任务（None）；可以在任意线程中调用。
+        """
+        with self._lock:
+            if job_index is None and self._cancel_deadline is None:
+                self._cancel_deadline = time.monotonic() + self.cancel_grace
+            if self._control_queues is None:
+                self._early_cancels.append(job_index)
+                return
+            self._send_cancel(job_index)
+
+    def apply_limits(self, throttled, recycle=()):
+        """
+        下发资源决策：限流对所有工作进程生效，回收请求只发给使用该缓存目录的进程。可以在任意线程中调用。
+        """
+        with self._lock:
+            if self._control_queues is None:
+                self._early_limits = (throttled, self._early_limits[1] | set(recycle))
+                return
+            self._send_limits(throttled, recycle)
+
+    def _send_limits(self, throttled, recycle):
+        for worker_index, control_queue in self._control_queues.items():
+            profiles = [profile for profile in recycle if self._profile_owners.get(profile) == worker_index]
+            control_queue.put(("limits", throttled, profiles))
+
+    def _send_cancel(self, job_index):
+        for worker_index, control_queue in self._control_queues.items():
+            if job_index is None or job_index in self._owned[worker_index]:
+                control_queue.put(("cancel", job_index))
+
+    def shards(self) -> list[list[dict]]:
+        # 同一账号的任务放进同一个进程（进程内由账号锁串行执行），账号之间按任务数均衡分配
+        by_account = {}
+        for job in self.jobs:
+            by_account.setdefault(job["account"]["id"], []).append(job)
+        shards = [[] for _ in range(self.processes)]
+        for account_jobs in sorted(by_account.values(), key=len, reverse=True):
+            min(shards, key=len).extend(account_jobs)
+        return [sorted(shard, key=lambda job: job["index"]) for shard in shards if shard]
+
+    def run(self, on_event):
+        ctx = multiprocessing.get_context("spawn")
+
+        workers = {}
+        control_queues = {}
+        readers = {}  # 事件管道的读端 -> worker_index
+        pending = {}  # worker_index -> 尚未结束的 job_index 集合
+        for worker_index, shard in enumerate(self.shards()):
+            control_queue = ctx.Queue()
+            reader, writer = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_worker_main,
+                args=(
+                    worker_index, shard, self.task_data, self.concurrency,
+                    self.resource_limits, self.diagnostics_options, control_queue, writer,
+                ),
+                daemon=True,
+            )
+            process.start()
+            # 写端只留在子进程中，子进程退出后读端才会收到 EOF
+            writer.close()
+            workers[worker_index] = process
+            control_queues[worker_index] = control_queue
+            readers[reader] = worker_index
+            pending[worker_index] = {job["index"] for job in shard}
+
+        owner = {job_index: w for w, job_indexes in pending.items() for job_index in job_indexes}
+        self._owned = {w: set(job_indexes) for w, job_indexes in pending.items()}
+        self._profile_owners = {
+            profile_key(_profile_dir(job)): owner[job["index"]]
+            for job in self.jobs if registry.find(job["platform"]) is not None
+        }
+        with self._lock:
+            self._control_queues = control_queues
+            for job_index in self._early_cancels:
+                self._send_cancel(job_index)
+            if self.resource_limits:
+                self._send_limits(*self._early_limits)
+        running = set(workers)
+
+        def worker_exited(worker_index):
+            if worker_index in running:
+                workers[worker_index].join()
+                self._finish_pending(workers[worker_index], pending[worker_index], on_event)
+                running.discard(worker_index)
+
+        while running:
+            self._enforce_cancel_deadline(workers, running, on_event)
+            for reader in multiprocessing.connection.wait(list(readers), timeout=0.5):
+                worker_index = readers[reader]
+                try:
+                    event = reader.recv()
+                except (EOFError, OSError, pickle.UnpicklingError):
+                    # 进程已退出；没有 worker_exited 事件说明它被强制结束（例如驱动崩溃或取消超时）
+                    reader.close()
+                    del readers[reader]
+                    worker_exited(worker_index)
+                    continue
+
+                kind = event[0]
+                if kind in ("job_finished", "job_cancelled"):
+                    pending[owner[event[1]]].discard(event[1])
+                if kind == "worker_exited":
+                    worker_exited(event[1])
+                    continue
+                on_event(event)
+
+        with self._lock:
+            self._control_queues = None
+        for reader in readers:
+            reader.close()
+        for control_queue in control_queues.values():
+            control_queue.close()
+
+    def _enforce_cancel_deadline(self, workers, running, on_event):
+        if self._cancel_deadline is None or time.monotonic() < self._cancel_deadline:
+            return
+        for worker_index in running:
+            process = workers[worker_index]
+            if not process.is_alive():
+                continue
+            # 只结束工作进程会留下仍占用缓存目录的驱动与 Chromium，必须结束整个进程树
+            if not kill_process_tree(process.pid):
+                process.kill()
+            process.join(5)
+            for job in self.jobs:
+                if job["index"] in self._owned[worker_index] and not wait_for_profile_release(job):
+                    on_event(("log", job["index"], "浏览器进程仍未退出，账号缓存目录可能暂时无法打开。"))
+
+    def _finish_pending(self, process, job_indexes, on_event):
+        exitcode = process.exitcode
+        for job_index in sorted(job_indexes):
+            if self._cancel_deadline is not None:
+                on_event(("job_cancelled", job_index))
+            else:
+                on_event(("job_finished", job_index, False, f"工作进程异常退出 (exitcode={exitcode})"))
+        job_indexes.clear()
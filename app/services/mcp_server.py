@@ -0,0 +1,316 @@
+"""
+MCP 服务入口：让 AI Agent 通过工具调用提交发布任务、查询账号与发布记录，并实时获取任务进度。
+
+运行方式（需要安装可选依赖 `pip install "pubx[mcp]"`）：
+
+    python -m app.services.mcp_server                       # stdio，供本地 Agent 客户端拉起
+    python -m app.services.mcp_server --transport streamable-http --port 8765
+"""
+import argparse
+import asyncio
+from datetime import date
+
+from mcp.server.fastmcp import Context, FastMCP
+
+from app.controllers import (
+    account_controller, content_controller, publication_controller, stats_controller, template_controller
+)
+from app.services import database, job_runner, session_keeper, template_engine
+from app.services.job_engine import JobEngine
+from publishers import registry
+
+
+mcp = FastMCP("pubx")
+engine = JobEngine()
+
+
+def _account_summary(account) -> dict:
+    return {
+        "id": account.id,
+        "platform": account.platform,
+        "username": account.username,
+        "remark": account.remark,
+        "login_status": account.login_status,
+        "session_expires_at": account.session_expires_at.isoformat() if account.session_expires_at else None,
+    }
+
+
+@mcp.tool()
+async def list_accounts(platform: str | None = None) -> list[dict]:
+    """列出已配置的账号，可按平台过滤。"""
+    accounts = await asyncio.to_thread(account_controller.get_all_accounts)
+    return [_account_summary(a) for a in accounts if platform is None or a.platform == platform]
+
+
+@mcp.tool()
+async def list_platforms() -> list[str]:
+    """列出已注册、可以自动发布的平台。"""
+    return registry.platforms()
+
+
+@mcp.tool()
+async def enqueue_publish(
+    account_ids: list[int],
+    media_paths: list[str],
+    title: str = "",
+    description: str = "",
+    post_type: str = "image",
+    content_batch: str | None = None,
+) -> dict:
+    """
+    提交一批发布任务并立即返回 job_id；post_type 为 "image" 或 "video"。
+
+    指定 content_batch 时，每个账号使用该模板批次中下一条待发布的标题/正文（以及单独指定的媒体），
+    title / description 可以留空。
+    """
+    if post_type not in ("image", "video"):
+        raise ValueError(f"不支持的任务类型: {post_type}")
+    if content_batch is None and not (title and description):
+        raise ValueError("未指定 content_batch 时，标题和正文不能为空。")
+
+    accounts = await asyncio.gather(
+        *(asyncio.to_thread(account_controller.get_account_by_id, account_id) for account_id in account_ids)
+    )
+    missing = [account_id for account_id, account in zip(account_ids, accounts) if account is None]
+    if missing:
+        raise ValueError(f"账号不存在: {missing}")
+    unsupported = sorted({a.platform for a in accounts if registry.find(a.platform) is None})
+    if unsupported:
+        raise ValueError(f"不支持的平台: {unsupported}，已支持: {registry.platforms()}")
+
+    task_data = {
+        "title": title,
+        "post_type": post_type,
+        "media_paths": media_paths,
+        "description": description,
+    }
+    jobs = [{"account": a, "platform": a.platform} for a in accounts]
+    contents = {}
+    if content_batch is not None:
+        # 认领后的内容在任务记录结果时才标记为已使用（失败或取消则退回批次）
+        contents = await asyncio.to_thread(content_controller.claim_contents, content_batch, account_ids)
+        missing = [a.username for a in accounts if a.id not in contents]
+        if missing:
+            await asyncio.to_thread(content_controller.release_contents, [c.id for c in contents.values()])
+            raise ValueError(f"批次 {content_batch} 中以下账号没有待发布的内容: {missing}")
+        for job in jobs:
+            job["content"] = template_engine.content_overrides(contents[job["account"].id])
+            job["content_id"] = contents[job["account"].id].id
+
+    # 视频大小/时长等在启动浏览器之前检查（读取文件头，放到线程中执行）
+    problems = await asyncio.to_thread(lambda: sorted({
+        problem
+        for job in jobs
+        for problem in registry.get(job["platform"]).check_task(job_runner.job_task_data(job, task_data))
+    }))
+    if problems:
+        await asyncio.to_thread(content_controller.release_contents, [c.id for c in contents.values()])
+        raise ValueError("; ".join(problems))
+
+    # 登录健康的账号先执行；没有人可以完成人工登录，已失效的账号直接记为失败
+    jobs = session_keeper.sort_by_login_health(jobs)
+    session_keeper.flag_expired(jobs)
+    jobs = job_runner.build_jobs(jobs)
+    return engine.submit(jobs, task_data).snapshot()
+
+
+@mcp.tool()
+async def get_statistics(
+    group_by: str = "platform",
+    days: int | None = 7,
+    platform: str | None = None,
+    account_id: int | None = None,
+) -> list[dict]:
+    """
+    发布统计（成功率、日均发布数、平均/最长耗时），group_by 为 "platform"、"account" 或 "day"；days 为空表示全部时间。
+    """
+    if group_by not in ("platform", "account", "day"):
+        raise ValueError(f"不支持的汇总方式: {group_by}")
+    return await asyncio.to_thread(
+        stats_controller.get_statistics,
+        group_by=group_by,
+        since=stats_controller.days_back(days) if days else None,
+        platform=platform,
+        account_id=account_id,
+    )
+
+
+@mcp.tool()
+async def list_templates() -> list[dict]:
+    """列出发布模板。"""
+    templates = await asyncio.to_thread(template_controller.get_all_templates)
+    return [
+        {"id": t.id, "name": t.name, "title_template": t.title_template, "description_template": t.description_template}
+        for t in templates
+    ]
+
+
+@mcp.tool()
+async def generate_contents(
+    template_id: int,
+    batch: str,
+    manifest_path: str | None = None,
+    platform: str | None = None,
+) -> dict:
+    """
+    按模板为账号（可按平台过滤）批量渲染内容，存为批次 batch；manifest_path 为 JSON 变量清单。
+    """
+    template = await asyncio.to_thread(template_controller.get_template_by_id, template_id)
+    if template is None:
+        raise ValueError(f"模板不存在: {template_id}")
+    accounts = await asyncio.to_thread(account_controller.get_all_accounts)
+    accounts = [a for a in accounts if platform is None or a.platform == platform]
+    manifest = await asyncio.to_thread(template_engine.load_manifest, manifest_path) if manifest_path else None
+    total = await asyncio.to_thread(template_engine.generate_contents, template, accounts, batch, manifest)
+    return {"batch": batch, "contents": total}
+
+
+@mcp.tool()
+async def list_content_batches() -> list[dict]:
+    """列出已生成的内容批次及剩余待发布条数。"""
+    batches = await asyncio.to_thread(content_controller.get_batches)
+    return [{"batch": batch, "total": total, "pending": pending} for batch, total, pending in batches]
+
+
+@mcp.tool()
+async def list_jobs() -> list[dict]:
+    """列出当前服务进程中的发布任务及其状态。"""
+    return [job.snapshot() for job in engine.jobs.values()]
+
+
+@mcp.tool()
+async def get_job(job_id: str, since: int = 0, wait_seconds: float = 0) -> dict:
+    """
+    查询任务状态与序号 >= since 的事件；wait_seconds > 0 时在没有新事件的情况下长轮询等待。
+    """
+    job = engine.get(job_id)
+    if job is None:
+        raise ValueError(f"任务不存在: {job_id}")
+    events = await job.wait_events(since, timeout=min(wait_seconds, 60))
+    return {**job.snapshot(), "events": [job.describe_event(*e) for e in events]}
+
+
+@mcp.tool()
+async def watch_job(job_id: str, ctx: Context) -> dict:
+    """
+    持续推送任务进度（MCP progress / log 通知），直到任务结束后返回最终状态。
+    """
+    job = engine.get(job_id)
+    if job is None:
+        raise ValueError(f"任务不存在: {job_id}")
+
+    since = 0
+    while True:
+        events = await job.wait_events(since, timeout=30)
+        for event in events:
+            described = job.describe_event(*event)
+            if described["type"] == "log":
+                await ctx.info(f"[{described['account']}] {described['message']}")
+            elif described["type"] == "job_finished":
+                await ctx.report_progress(len(job.results), len(job.jobs))
+        since += len(events)
+        if job.status == "finished" and since >= len(job.events):
+            return job.snapshot()
+
+
+@mcp.tool()
+async def cancel_job(job_id: str, job_index: int | None = None) -> dict:
+    """
+    取消整批任务，或只取消其中第 job_index 个账号的任务（序号与 accounts 列表一致）。
+    """
+    if not engine.cancel(job_id, job_index):
+        raise ValueError(f"任务不存在或已结束: {job_id}")
+    return engine.get(job_id).snapshot()
+
+
+@mcp.tool()
+async def list_publication_records(
+    account_id: int | None = None,
+    status: str | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    """查询最近的发布记录，可按账号与状态（success / failed / cancelled）过滤。"""
+    records = await asyncio.to_thread(
+        publication_controller.get_publication_records, account_id=account_id, status=status, limit=limit
+    )
+    return [
+        {
+            "id": r.id,
+            "account_id": r.account_id,
+            "title": r.title,
+            "description": r.description,
+            "media_paths": r.media_paths.split(";") if r.media_paths else [],
+            "status": r.status,
+            "published_at": r.published_at.isoformat(),
+            "diagnostics_path": r.diagnostics_path,
+        }
+        for r in records
+    ]
+
+
+@mcp.tool()
+async def search_publication_records(
+    query: str,
+    account_id: int | None = None,
+    status: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    全文搜索发布记录的标题与内容（空格分隔的关键词需同时匹配），按相关度排序。
+    since / until 为 YYYY-MM-DD（含当天）。
+    """
+    rows = await asyncio.to_thread(
+        publication_controller.search_publication_records,
+        query,
+        account_id=account_id,
+        status=status,
+        since=date.fromisoformat(since) if since else None,
+        until=date.fromisoformat(until) if until else None,
+        limit=limit,
+    )
+    return [
+        {
+            "id": row["id"],
+            "account_id": row["account_id"],
+            "username": row["username"],
+            "title": row["title"],
+            "description": row["description"],
+            "status": row["status"],
+            "published_at": str(row["published_at"]),
+        }
+        for row in rows
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PubX MCP 服务")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processes", type=int, default=1, help="每批任务使用的工作进程数")
+    parser.add_argument("--concurrency", type=int, default=1, help="每个工作进程同时打开的浏览器数")
+    parser.add_argument(
+        "--diagnostics", choices=["off", "events", "trace"], default="events",
+        help="任务失败时保存的诊断信息：不保存 / 截图与页面事件 / 另加出错步骤的 Playwright trace",
+    )
+    parser.add_argument("--diagnostics-max-mb", type=int, default=500, help="诊断目录的总大小上限")
+    args = parser.parse_args()
+
+    engine.processes = args.processes
+    engine.concurrency = args.concurrency
+    if args.diagnostics != "off":
+        engine.diagnostics_options = {"trace": args.diagnostics == "trace", "max_total_mb": args.diagnostics_max_mb}
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+
+    # stdio 传输下 stdout 是协议通道，不能输出 SQL 日志
+    database.engine.echo = False
+    database.create_db_and_tables()
+    registry.load()
+    mcp.run(transport=args.transport)
+
+
+if __name__ == "__main__":
+    main()
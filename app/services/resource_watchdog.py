@@ -0,0 +1,222 @@
+import asyncio
+import os
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖，未安装时看门狗不生效
+    psutil = None
+
+
+MB = 1024 * 1024
+
+
+def profile_key(user_data_dir) -> str:
+    """
+    浏览器缓存目录的规范形式，用于在采样结果、回收请求与账号之间比较同一个目录。
+    """
+    return os.path.normcase(os.path.abspath(str(user_data_dir)))
+
+
+def _user_data_dir(process):
+    """
+    从 Chromium 主进程的命令行中取出 --user-data-dir，用来把进程树归属到账号的浏览器缓存目录。
+    """
+    try:
+        for arg in process.cmdline():
+            if arg.startswith("--user-data-dir="):
+                return profile_key(arg.split("=", 1)[1])
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        pass
+    return None
+
+
+def pid_alive(pid) -> bool:
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # 进程存在但无权发送信号，或当前平台不支持
+        return True
+    return True
+
+
+def kill_process_tree(pid, timeout=5.0) -> bool:
+    """
+    强制结束进程及其全部子孙进程（Playwright 驱动与 Chromium），并等待它们退出。
+
+    必须先收集子孙进程再结束父进程：父进程退出后子进程会被重新挂到 init 下，无法再找到。
+    没有安装 psutil 时返回 False，调用方只能结束进程本身。
+    """
+    if psutil is None:
+        return False
+    try:
+        parent = psutil.Process(pid)
+        processes = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return True
+    for process in processes:
+        try:
+            process.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    psutil.wait_procs(processes, timeout=timeout)
+    return True
+
+
+class ResourceLimits:
+    """
+    看门狗的决策：是否暂停放行新任务，以及哪些浏览器需要回收。
+
+    多进程执行时，工作进程使用本类接收协调进程（JobEngine）中唯一的 ResourceWatchdog 下发的决策；
+    进程内执行时直接使用 ResourceWatchdog。
+    """
+
+    def __init__(self):
+        self.recycle_requests = set()
+        self._admission_open = asyncio.Event()
+        self._admission_open.set()
+
+    @property
+    def throttled(self):
+        return not self._admission_open.is_set()
+
+    def update(self, throttled, recycle=()):
+        self.recycle_requests.update(recycle)
+        if throttled:
+            self._admission_open.clear()
+        else:
+            self._admission_open.set()
+
+    def should_recycle(self, user_data_dir) -> bool:
+        """
+        发布脚本在步骤之间调用；返回 True 表示应关闭并重新打开该账号的浏览器。
+        """
+        profile = profile_key(user_data_dir)
+        if profile in self.recycle_requests:
+            self.recycle_requests.discard(profile)
+            return True
+        return False
+
+    async def wait_for_admission(self):
+        await self._admission_open.wait()
+
+
+class ResourceWatchdog(ResourceLimits):
+    """
+    周期性采样当前 Python 进程、它启动的工作进程以及其中每个浏览器进程树的内存 (RSS) 和 CPU。
+
+    - 单个浏览器超过 max_context_rss_mb 时登记回收请求，发布脚本在下一个步骤边界关闭并重开该 context；
+    - 全部浏览器合计超过 max_total_rss_mb 时暂停放行新任务，直到回落到阈值以下。
+    """
+
+    def __init__(self, interval=5.0, max_context_rss_mb=1500, max_total_rss_mb=6000, on_sample=None):
+        super().__init__()
+        self.interval = interval
+        self.max_context_rss = max_context_rss_mb * MB
+        self.max_total_rss = max_total_rss_mb * MB
+        self.on_sample = on_sample
+        self._processes = {}  # pid -> psutil.Process，复用对象才能得到两次采样之间的 CPU 占用
+        self._requested = {}  # 缓存目录 -> 已请求回收的浏览器主进程 pid
+
+    @property
+    def available(self):
+        return psutil is not None
+
+    def _process(self, pid):
+        process = self._processes.get(pid)
+        if process is None:
+            process = self._processes[pid] = psutil.Process(pid)
+            process.cpu_percent(None)
+        return process
+
+    def _measure(self, processes):
+        rss, cpu, count = 0, 0.0, 0
+        for p in processes:
+            try:
+                process = self._process(p.pid)
+                rss += process.memory_info().rss
+                cpu += process.cpu_percent(None)
+                count += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                self._processes.pop(p.pid, None)
+        return {"rss": rss, "cpu": cpu, "processes": count}
+
+    def sample(self) -> dict:
+        current = psutil.Process()
+        children = current.children(recursive=True)
+        child_pids = {child.pid for child in children}
+
+        pythons = [current]
+        browsers = {}
+        for child in children:
+            profile = _user_data_dir(child)
+            if profile is None:
+                try:
+                    # 工作进程以 spawn 方式启动，与当前进程是同一个解释器
+                    if child.exe() == current.exe():
+                        pythons.append(child)
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+                continue
+            try:
+                parent_profile = _user_data_dir(child.parent()) if child.ppid() in child_pids else None
+                tree = [child] + child.children(recursive=True)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            # 只统计浏览器主进程，其子进程（渲染/GPU 等）都计入同一棵树
+            if parent_profile != profile:
+                browsers[profile] = {**self._measure(tree), "pid": child.pid}
+
+        alive = child_pids | {current.pid}
+        for pid in list(self._processes):
+            if pid not in alive:
+                del self._processes[pid]
+
+        return {
+            "pid": current.pid,
+            "python": self._measure(pythons),
+            "browsers": browsers,
+            "browser_rss": sum(b["rss"] for b in browsers.values()),
+            "browser_cpu": sum(b["cpu"] for b in browsers.values()),
+        }
+
+    def apply_limits(self, sample):
+        """
+        根据采样结果更新决策，并在 sample 中记录 throttled 与本次新增的回收请求（recycle）。
+        """
+        browsers = sample["browsers"]
+        # 已经关闭的浏览器不再需要回收
+        self.recycle_requests &= set(browsers)
+        self._requested = {
+            profile: pid for profile, pid in self._requested.items() if browsers.get(profile, {}).get("pid") == pid
+        }
+        recycle = []
+        for profile, usage in browsers.items():
+            # 同一个浏览器只请求一次；重开后是新的进程，仍然超限时再次请求
+            if usage["rss"] > self.max_context_rss and self._requested.get(profile) != usage["pid"]:
+                self._requested[profile] = usage["pid"]
+                recycle.append(profile)
+        self.update(sample["browser_rss"] > self.max_total_rss, recycle)
+        sample["throttled"] = self.throttled
+        sample["recycle"] = recycle
+
+    def reset(self):
+        """
+        停止采样时调用：清除回收请求并恢复放行，下次启动时从头判断。
+        """
+        self.recycle_requests.clear()
+        self._requested.clear()
+        self.update(False)
+
+    async def run(self):
+        if not self.available:
+            return
+        while True:
+            sample = await asyncio.to_thread(self.sample)
+            self.apply_limits(sample)
+            if self.on_sample is not None:
+                self.on_sample(sample)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,192 @@
+import asyncio
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.controllers import account_controller
+from publishers import registry
+
+
+HEALTHY = "healthy"  # 登录 Cookie 有效期充足
+EXPIRING = "expiring"  # 将在 refresh_window 内过期，空闲时续期
+EXPIRED = "expired"  # 登录 Cookie 已过期或已退出登录，需要人工登录
+UNKNOWN = "unknown"  # 无法从 Cookie 判断（从未打开过浏览器、平台未声明登录 Cookie，或只有会话级 Cookie）
+
+STATUS_LABELS = {HEALTHY: "🟢 正常", EXPIRING: "🟡 即将过期", EXPIRED: "🔴 已失效", UNKNOWN: "⚪ 未知"}
+
+# 派发顺序：健康的账号先执行，已失效的账号放到最后，避免占用前面的浏览器名额
+_DISPATCH_ORDER = {HEALTHY: 0, EXPIRING: 1, UNKNOWN: 2, None: 2, EXPIRED: 3}
+
+# Chromium 的 expires_utc 是自 1601-01-01 起的微秒数
+_CHROMIUM_EPOCH = datetime(1601, 1, 1)
+_COOKIE_DB_PATHS = ("Default/Network/Cookies", "Default/Cookies")
+# 最近写入的 Cookie 可能还在 WAL / 回滚日志中，需要和数据库一起复制
+_COOKIE_DB_SIDECARS = ("-wal", "-journal")
+
+
+def dispatch_rank(status) -> int:
+    return _DISPATCH_ORDER.get(status, _DISPATCH_ORDER[UNKNOWN])
+
+
+def sort_by_login_health(jobs) -> list[dict]:
+    """
+    按账号的登录健康状态对 {'account': Account, 'platform': str} 任务列表做稳定排序。
+    """
+    return sorted(jobs, key=lambda job: dispatch_rank(getattr(job["account"], "login_status", None)))
+
+
+def flag_expired(jobs) -> list[str]:
+    """
+    给登录已失效账号的任务加上 login_expired 标记（执行时直接记为失败，不打开浏览器），返回这些账号的用户名。
+    """
+    expired = []
+    for job in jobs:
+        if getattr(job["account"], "login_status", None) == EXPIRED:
+            job["login_expired"] = True
+            expired.append(job["account"].username)
+    return expired
+
+
+def _cookie_domain_matches(host_key, domain):
+    host, domain = host_key.lstrip("."), domain.lstrip(".")
+    return host == domain or host.endswith("." + domain)
+
+
+def read_cookie_expiry(profile_dir, domain, names) -> dict | None:
+    """
+    直接读取浏览器缓存目录中的 Cookie 数据库，返回 Cookie 名 -> 过期时间 (UTC，会话级 Cookie 为 None)。
+
+    不需要启动浏览器；数据库可能正被浏览器占用，因此连同 WAL / 日志文件一起复制一份再读。
+    缓存目录中没有 Cookie 数据库时返回 None。
+    """
+    for relative in _COOKIE_DB_PATHS:
+        path = Path(profile_dir) / relative
+        if path.exists():
+            break
+    else:
+        return None
+
+    with tempfile.TemporaryDirectory(prefix="pubx-cookies-") as tmp:
+        copy = Path(tmp) / "Cookies"
+        shutil.copy2(path, copy)
+        for suffix in _COOKIE_DB_SIDECARS:
+            sidecar = path.with_name(path.name + suffix)
+            if sidecar.exists():
+                shutil.copy2(sidecar, copy.with_name(copy.name + suffix))
+        connection = sqlite3.connect(copy)
+        try:
+            placeholders = ",".join("?" for _ in names)
+            rows = connection.execute(
+                f"SELECT name, host_key, expires_utc, has_expires FROM cookies WHERE name IN ({placeholders})",
+                list(names),
+            ).fetchall()
+        finally:
+            connection.close()
+
+    expiry = {}
+    for name, host_key, expires_utc, has_expires in rows:
+        if not _cookie_domain_matches(host_key, domain):
+            continue
+        expires_at = _CHROMIUM_EPOCH + timedelta(microseconds=expires_utc) if has_expires and expires_utc else None
+        # 同名 Cookie 可能出现在多个子域名下，取最早过期的一个
+        if name not in expiry or (expires_at is not None and (expiry[name] is None or expires_at < expiry[name])):
+            expiry[name] = expires_at
+    return expiry
+
+
+def check_login_health(account, refresh_window=timedelta(hours=24), now=None):
+    """
+    只根据 Cookie 判断账号的登录状态，返回 (status, expires_at)。
+    """
+    publisher_cls = registry.find(account.platform)
+    if publisher_cls is None or not publisher_cls.session_cookies:
+        return UNKNOWN, None
+
+    expiry = read_cookie_expiry(
+        publisher_cls.profile_dir_for(account), publisher_cls.session_cookie_domain, publisher_cls.session_cookies
+    )
+    if expiry is None:
+        # 还没有 Cookie 数据库：从未打开过浏览器，第一次发布时在登录步骤人工登录
+        return UNKNOWN, None
+    if not expiry:
+        # 没有任何登录 Cookie：已退出登录
+        return EXPIRED, None
+
+    known = [expires_at for expires_at in expiry.values() if expires_at is not None]
+    if not known:
+        return UNKNOWN, None
+    expires_at = min(known)
+    now = now or datetime.utcnow()
+    if expires_at <= now:
+        return EXPIRED, expires_at
+    if expires_at <= now + refresh_window:
+        return EXPIRING, expires_at
+    return HEALTHY, expires_at
+
+
+class SessionKeeper:
+    """
+    定期检查所有账号的登录状态并写回数据库；空闲时在无头浏览器中打开即将过期的账号，让平台续期登录。
+
+    - check_all() 只读 Cookie 数据库，不启动浏览器，可以随时调用；
+    - refresh() 会占用账号的浏览器缓存目录，只能在没有发布任务运行时调用。
+    """
+
+    def __init__(self, refresh_window_hours=24, on_update=None):
+        self.refresh_window = timedelta(hours=refresh_window_hours)
+        self.on_update = on_update  # on_update(account_id, status)，每个账号检查完后回调
+
+    def _save(self, account, status, expires_at):
+        account_controller.update_login_health(account.id, status, expires_at)
+        account.login_status = status
+        if self.on_update:
+            self.on_update(account.id, status)
+
+    def check_all(self) -> list:
+        accounts = account_controller.get_all_accounts()
+        for account in accounts:
+            try:
+                status, expires_at = check_login_health(account, self.refresh_window)
+            except (OSError, sqlite3.Error):
+                status, expires_at = UNKNOWN, None
+            self._save(account, status, expires_at)
+        return accounts
+
+    def needs_refresh(self, account) -> bool:
+        publisher_cls = registry.find(account.platform)
+        if publisher_cls is None or not publisher_cls.can_refresh_session():
+            return False
+        # 无法从 Cookie 判断的账号也在空闲时打开一次首页确认
+        return account.login_status in (EXPIRING, UNKNOWN)
+
+    async def refresh(self, account, playwright=None):
+        publisher_cls = registry.get(account.platform)
+        publisher = publisher_cls(account, {}, lambda message: None, playwright=playwright)
+        logged_in = await publisher.refresh_session()
+        if not logged_in:
+            await asyncio.to_thread(self._save, account, EXPIRED, None)
+            return
+        status, expires_at = await asyncio.to_thread(check_login_health, account, self.refresh_window)
+        # 只有会话级 Cookie 的账号以页面检查结果为准
+        await asyncio.to_thread(self._save, account, HEALTHY if status == UNKNOWN else status, expires_at)
+
+    async def run_once(self, refresh=True):
+        """
+        检查全部账号；refresh 为 True 时依次续期需要续期的账号（取消时当前浏览器会被关闭）。
+        """
+        accounts = await asyncio.to_thread(self.check_all)
+        targets = [account for account in accounts if self.needs_refresh(account)]
+        if not refresh or not targets:
+            return
+
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as playwright:
+            for account in targets:
+                try:
+                    await self.refresh(account, playwright)
+                except Exception:
+                    # 续期失败不改变 Cookie 判断的结果，下一轮再试
+                    continue
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+_started = time.perf_counter()
+_phases = []  # (name, duration in seconds)
+
+
+def enabled() -> bool:
+    """
+    Startup profiling is printed with `--profile-startup` or PUBX_PROFILE_STARTUP=1.
+    """
+    return "--profile-startup" in sys.argv or os.environ.get("PUBX_PROFILE_STARTUP") == "1"
+
+
+@contextmanager
+def phase(name):
+    """
+    Times one startup phase (an import, the schema check, building the window...).
+    """
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - begin))
+
+
+def mark(name):
+    """
+    Records a point in time measured from when this module was first imported.
+    """
+    _phases.append((name, time.perf_counter() - _started))
+
+
+def report() -> str:
+    width = max((len(name) for name, _ in _phases), default=0) + 2
+    lines = ["Startup profile (ms):"]
+    lines += [f"  {name:<{width}}{seconds * 1000:>9.1f}" for name, seconds in _phases]
+    return "\n".join(lines)
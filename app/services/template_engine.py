@@ -0,0 +1,266 @@
+"""
+发布内容模板引擎。
+
+语法：`{{ 变量 }}`，可以接过滤器 `{{ 变量|过滤器|过滤器:"参数" }}`（参数中不能包含 `|` 和 `}}`）。
+
+可用变量：账号字段 account_id / platform / username / remark，以及清单 (manifest) 中的变量。
+过滤器：default:"值"、hashtags、upper、lower、strip、url、truncate:"长度"。
+
+模板只编译一次（按源码缓存），渲染时只做列表拼接，10 万条变体在数秒内完成。
+"""
+import json
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from app.controllers import content_controller
+
+
+_PLACEHOLDER = re.compile(r"\{\{(.*?)\}\}", re.S)
+_VARIABLE = re.compile(r"^[A-Za-z_]\w*$")
+_FILTER = re.compile(r'^(\w+)(?:\s*:\s*"([^"]*)")?$')
+_TAG_SEPARATOR = re.compile(r"[,，\s#]+")
+
+# 生成内容时每次写入数据库的行数
+CHUNK_SIZE = 5000
+
+
+class TemplateError(ValueError):
+    """
+    模板语法错误，或渲染时缺少变量。
+    """
+
+
+def _hashtags(value):
+    return " ".join(f"#{tag}" for tag in _TAG_SEPARATOR.split(value) if tag)
+
+
+def _truncate(value, length):
+    length = int(length)
+    return value if len(value) <= length else value[:length]
+
+
+# 过滤器名 -> (函数, 是否需要参数)
+_FILTERS = {
+    "hashtags": (_hashtags, False),
+    "upper": (str.upper, False),
+    "lower": (str.lower, False),
+    "strip": (str.strip, False),
+    "url": (lambda value: quote(value, safe=""), False),
+    "truncate": (_truncate, True),
+}
+
+
+def _to_text(value):
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def _compile_placeholder(expression):
+    name, *filter_specs = [part.strip() for part in expression.split("|")]
+    if not _VARIABLE.match(name):
+        raise TemplateError(f"无效的变量名: {name!r}")
+
+    default = None
+    filters = []
+    for spec in filter_specs:
+        match = _FILTER.match(spec)
+        if not match:
+            raise TemplateError(f"无效的过滤器: {spec!r}")
+        filter_name, argument = match.groups()
+        if filter_name == "default":
+            default = argument or ""
+            continue
+        if filter_name not in _FILTERS:
+            raise TemplateError(f"未知的过滤器: {filter_name}")
+        func, needs_argument = _FILTERS[filter_name]
+        if needs_argument and argument is None:
+            raise TemplateError(f"过滤器 {filter_name} 需要参数")
+        if filter_name == "truncate" and not argument.isdigit():
+            raise TemplateError(f"过滤器 truncate 的参数必须是数字: {argument!r}")
+        filters.append((func, argument if needs_argument else None))
+
+    def get(context):
+        value = context.get(name)
+        if value is None or value == "":
+            if default is None:
+                raise TemplateError(f"缺少变量: {name}")
+            value = default
+        text = _to_text(value)
+        for func, argument in filters:
+            text = func(text) if argument is None else func(text, argument)
+        return text
+
+    return name, default is None, get
+
+
+class Template:
+    """
+    编译后的模板：字面文本与取值函数交替排列，渲染时直接拼接。
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.required = set()  # 没有 default 的变量，渲染前可以据此检查上下文
+        self._literals = []
+        self._getters = []
+
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            self._literals.append(source[position:match.start()])
+            name, required, getter = _compile_placeholder(match.group(1))
+            if required:
+                self.required.add(name)
+            self._getters.append(getter)
+            position = match.end()
+        tail = source[position:]
+        if "{{" in tail:
+            raise TemplateError("模板中有未闭合的 {{")
+        self._literals.append(tail)
+
+    def render(self, context) -> str:
+        literals = self._literals
+        if not self._getters:
+            return literals[0]
+        parts = [literals[0]]
+        for i, getter in enumerate(self._getters, 1):
+            parts.append(getter(context))
+            parts.append(literals[i])
+        return "".join(parts)
+
+
+@lru_cache(maxsize=256)
+def compile_template(source) -> Template:
+    return Template(source)
+
+
+def account_context(account) -> dict:
+    return {
+        "account_id": account.id,
+        "platform": account.platform,
+        "username": account.username,
+        "remark": account.remark or "",
+    }
+
+
+def load_manifest(path) -> dict:
+    """
+    读取 JSON 清单：
+
+        {
+          "variables": {"campaign": "双十一"},                     // 所有变体共用
+          "accounts": {"alice": {"link": "https://..."}},          // 按账号用户名或 ID 覆盖
+          "rows": [{"product": "A", "tags": "新品,好物"}, ...]       // 每行为每个账号生成一条变体；
+                                                                     // 行内 "account" 限定只用于某个账号，
+                                                                     // "media_paths" 为该变体单独指定媒体
+        }
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict):
+        raise TemplateError("清单必须是 JSON 对象")
+    return manifest
+
+
+def _media_paths(value) -> str:
+    """
+    清单中的 media_paths 可以是以 ; 分隔的字符串或路径列表，统一转为 ; 分隔的字符串。
+    """
+    if isinstance(value, str):
+        paths = value.split(";")
+    elif isinstance(value, list) and all(isinstance(path, str) for path in value):
+        paths = value
+    else:
+        raise TemplateError(f"media_paths 必须是字符串或字符串列表: {value!r}")
+    return ";".join(path.strip() for path in paths if path.strip())
+
+
+def render_variants(title_source, description_source, accounts, manifest=None):
+    """
+    逐条产生 {account_id, title, description, media_paths}；变量优先级：行 > 清单中的账号覆盖 > 账号字段 > 全局变量。
+    """
+    title_template = compile_template(title_source)
+    description_template = compile_template(description_source)
+    manifest = manifest or {}
+    variables = manifest.get("variables", {})
+    overrides = manifest.get("accounts", {})
+    rows = manifest.get("rows") or [{}]
+
+    shared_rows = [row for row in rows if "account" not in row]
+    targeted_rows = {}
+    for row in rows:
+        if "account" in row:
+            targeted_rows.setdefault(str(row["account"]), []).append(row)
+
+    for account in accounts:
+        base = {
+            **variables,
+            **account_context(account),
+            **overrides.get(account.username, {}),
+            **overrides.get(str(account.id), {}),
+        }
+        account_rows = shared_rows + targeted_rows.get(account.username, []) + targeted_rows.get(str(account.id), [])
+        for row in account_rows:
+            context = {**base, **row} if row else base
+            try:
+                title = title_template.render(context)
+                description = description_template.render(context)
+                media_paths = _media_paths(row.get("media_paths", []))
+            except TemplateError as e:
+                raise TemplateError(f"账号 {account.username}: {e}")
+            yield {
+                "account_id": account.id,
+                "title": title,
+                "description": description,
+                "media_paths": media_paths,
+            }
+
+
+def generate_contents(template, accounts, batch, manifest=None, on_progress=None) -> int:
+    """
+    按模板为账号批量渲染内容并分块写入 PublishContent，返回生成的条数。耗时较长，应在后台线程调用。
+
+    on_progress(已生成条数) 在每个分块写入后回调。
+    """
+    if content_controller.batch_exists(batch):
+        raise TemplateError(f"批次已存在: {batch}")
+
+    total = 0
+    chunk = []
+    try:
+        for variant in render_variants(template.title_template, template.description_template, accounts, manifest):
+            variant["batch"] = batch
+            variant["template_id"] = template.id
+            chunk.append(variant)
+            if len(chunk) >= CHUNK_SIZE:
+                total += content_controller.add_contents(chunk)
+                chunk = []
+                if on_progress:
+                    on_progress(total)
+        if chunk:
+            total += content_controller.add_contents(chunk)
+    except Exception:
+        # 不留下只生成了一部分的批次
+        content_controller.delete_batch(batch)
+        raise
+    if on_progress:
+        on_progress(total)
+    return total
+
+
+def preview(title_source, description_source, account, manifest=None) -> dict | None:
+    """
+    渲染 account 的第一条变体，用于编辑模板时预览。
+    """
+    return next(render_variants(title_source, description_source, [account], manifest), None)
+
+
+def content_overrides(content) -> dict:
+    """
+    把一条 PublishContent 转换为覆盖 task_data 的字段（见 job_runner.build_jobs 的 'content'）。
+    """
+    overrides = {"title": content.title, "description": content.description}
+    if content.media_paths:
+        overrides["media_paths"] = content.media_paths.split(";")
+    return overrides
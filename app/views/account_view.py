@@ -1,12 +1,22 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTableView, QHeaderView,
     QGroupBox, QFormLayout, QLineEdit, QPushButton, QMessageBox,
-    QSplitter
+    QSplitter, QStyledItemDelegate
 )
 from PySide6.QtSql import QSqlDatabase, QSqlTableModel
 from PySide6.QtCore import Qt
 
 from app.controllers import account_controller
+from app.services.session_keeper import STATUS_LABELS
+
+
+class LoginStatusDelegate(QStyledItemDelegate):
+    """
+    把 login_status 列中的状态码显示为带颜色标记的中文。
+    """
+
+    def displayText(self, value, locale):
+        return STATUS_LABELS.get(value, "")
 
 
 class AccountView(QWidget):
@@ -101,9 +111,13 @@ class AccountView(QWidget):
         self.model.setHeaderData(self.model.fieldIndex("username"), Qt.Horizontal, "用户名")
         self.model.setHeaderData(self.model.fieldIndex("password"), Qt.Horizontal, "密码")
         self.model.setHeaderData(self.model.fieldIndex("remark"), Qt.Horizontal, "备注")
+        self.model.setHeaderData(self.model.fieldIndex("login_status"), Qt.Horizontal, "登录状态")
+        self.model.setHeaderData(self.model.fieldIndex("session_expires_at"), Qt.Horizontal, "登录过期时间 (UTC)")
+        self.model.setHeaderData(self.model.fieldIndex("login_checked_at"), Qt.Horizontal, "最近检查 (UTC)")
 
         self.table_view.setModel(self.model)
         self.table_view.hideColumn(self.model.fieldIndex("id"))  # Hide ID column
+        self.table_view.setItemDelegateForColumn(self.model.fieldIndex("login_status"), LoginStatusDelegate(self))
 
         # ✅ 这里 model 已经设置好了，再获取 selectionModel 一定不是 None
         sel_model = self.table_view.selectionModel()
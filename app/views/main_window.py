@@ -1,69 +1,225 @@
 import asyncio
-import importlib
+import os
+import threading
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QTabWidget,
     QGroupBox, QFormLayout, QComboBox, QPushButton,
     QTextEdit, QProgressBar, QMessageBox, QFileDialog, QHBoxLayout,
-    QTreeWidget, QTreeWidgetItem, QLineEdit
+    QTreeWidget, QTreeWidgetItem, QLineEdit, QSpinBox, QLabel, QCheckBox
 )
-from PySide6.QtCore import Qt, Signal, Slot, QThread
+from PySide6.QtCore import Qt, Signal, Slot, QThread, QTimer
 
-from app.views.account_view import AccountView
-from app.views.publication_view import PublicationView
-from app.controllers import account_controller, publication_controller
+from app.controllers import account_controller, content_controller
+from app.services import job_runner, session_keeper, template_engine
+from publishers import registry
 
 
 class AsyncWorker(QThread):
     """
     A worker thread to run a queue of asyncio tasks and log the results.
+
+    The batch is executed by a JobEngine on this thread's event loop; with processes > 1
+    the engine shards the jobs across worker processes.
     """
     log_received = Signal(str)
+    job_status_changed = Signal(int, str)  # job index, status text
+    job_progress = Signal(int, int)  # finished jobs, total jobs
+    upload_progress = Signal(int, dict)  # job index, {"step", "sent", "total", "rate"}
+    resources_sampled = Signal(dict)  # ResourceWatchdog sample covering this process, the workers and their browsers
     task_finished = Signal(bool)  # Pass overall success status
 
-    def __init__(self, jobs, task_data):
+    def __init__(self, jobs, task_data, processes=1, concurrency=1, watchdog_options=None, diagnostics_options=None):
         super().__init__()
-        self.jobs = jobs
+        self.jobs = job_runner.build_jobs(jobs)
         self.task_data = task_data
+        self.processes = processes
+        self.concurrency = concurrency
+        self.watchdog_options = watchdog_options
+        self.diagnostics_options = diagnostics_options
+        self.finished_jobs = 0
+        self.loop = None
+        self.engine = None
+        self.job = None
+        self.pending_cancels = []  # cancel requests made before the batch was submitted
+        self.finished = False
+        self.cancel_lock = threading.Lock()
 
     def run(self):
-        overall_success = True
+        if self.processes > 1:
+            self.log_received.emit(f"使用 {self.processes} 个工作进程并行发布...")
+        self.task_finished.emit(asyncio.run(self.run_batch()))
+
+    async def run_batch(self):
+        from app.services.job_engine import JobEngine
+
+        self.engine = JobEngine(
+            processes=self.processes,
+            concurrency=self.concurrency,
+            watchdog_options=self.watchdog_options,
+            diagnostics_options=self.diagnostics_options,
+        )
+        self.job = self.engine.submit(self.jobs, self.task_data, on_event=self.handle_event)
+        with self.cancel_lock:
+            self.loop = asyncio.get_running_loop()
+            for job_index in self.pending_cancels:
+                self.engine.cancel(self.job.id, job_index)
+        try:
+            await self.job.wait()
+            return self.job.success
+        finally:
+            # asyncio.run closes the loop right after this returns; later cancels become no-ops
+            with self.cancel_lock:
+                self.loop = None
+                self.finished = True
+
+    def cancel(self, job_index=None):
+        """
+        Cancel the whole batch (job_index=None) or a single job. Safe to call from the UI thread.
+        """
+        with self.cancel_lock:
+            if self.finished:
+                return
+            if self.loop is None:
+                self.pending_cancels.append(job_index)
+                return
+            try:
+                self.loop.call_soon_threadsafe(self.engine.cancel, self.job.id, job_index)
+            except RuntimeError:
+                # The loop is already closed
+                pass
+
+    def handle_event(self, event):
+        kind, job_index = event[0], event[1]
+        if kind == "resources":
+            self.resources_sampled.emit(event[2])
+            return
+        job = self.jobs[job_index]
+        account = job["account"]
         total_jobs = len(self.jobs)
-        for i, job in enumerate(self.jobs):
-            account = job['account']
-            platform = job['platform']
-            publisher_module_name = f"publishers.{platform}_publisher"
-            
-            self.log_received.emit(f"--- 开始任务 {i+1}/{total_jobs}: 平台='{platform}', 账号='{account.username}' ---")
-            
-            success = False
+
+        if kind == "job_started":
+            self.job_status_changed.emit(job_index, "执行中")
+            self.log_received.emit(
+                f"--- 开始任务 {job_index+1}/{total_jobs}: 平台='{job['platform']}', 账号='{account['username']}' ---"
+            )
+        elif kind == "log":
+            self.log_received.emit(f"[{account['username']}] {event[2]}")
+        elif kind == "progress":
+            self.upload_progress.emit(job_index, event[2])
+        elif kind == "diagnostics":
+            self.log_received.emit(f"[{account['username']}] 失败诊断: {event[2]}")
+        elif kind == "job_finished":
+            success, error = event[2], event[3]
+            if not success:
+                self.log_received.emit(f"发生严重错误: {error}")
+            self.log_received.emit(f"--- 任务 {job_index+1}/{total_jobs} 结束 ---")
+            self.job_status_changed.emit(job_index, "成功" if success else "失败")
+            self.finished_jobs += 1
+            self.job_progress.emit(self.finished_jobs, total_jobs)
+        elif kind == "job_cancelled":
+            self.log_received.emit(f"--- 任务 {job_index+1}/{total_jobs} 已取消: 账号='{account['username']}' ---")
+            self.job_status_changed.emit(job_index, "已取消")
+            self.finished_jobs += 1
+            self.job_progress.emit(self.finished_jobs, total_jobs)
+        elif kind == "job_recorded":
+            status, saved = event[2], event[3]
+            result = {"success": "发布成功", "failed": "发布失败", "cancelled": "已取消"}.get(status, status)
+            self.log_received.emit(
+                f"[{account['username']}] {result}，已存入数据库。" if saved
+                else f"[{account['username']}] {result}，但写入数据库失败。"
+            )
+
+
+class SessionKeeperWorker(QThread):
+    """
+    Runs one SessionKeeper pass: check every account's login cookies, then (if refresh is True)
+    refresh the expiring sessions in headless browsers. Only started while no batch is running.
+    """
+    account_health_changed = Signal(int, str)  # account id, login status
+
+    def __init__(self, refresh_window_hours=24, refresh=True):
+        super().__init__()
+        self.keeper = session_keeper.SessionKeeper(
+            refresh_window_hours, on_update=lambda account_id, status: self.account_health_changed.emit(account_id, status)
+        )
+        self.refresh = refresh
+        self.loop = None
+        self.task = None
+        self.stopped = False
+        self.stop_lock = threading.Lock()
+
+    def run(self):
+        try:
+            asyncio.run(self.run_pass())
+        except asyncio.CancelledError:
+            pass
+
+    async def run_pass(self):
+        with self.stop_lock:
+            if self.stopped:
+                return
+            self.loop = asyncio.get_running_loop()
+            self.task = asyncio.current_task()
+        try:
+            await self.keeper.run_once(refresh=self.refresh)
+        finally:
+            # asyncio.run closes the loop right after this returns
+            with self.stop_lock:
+                self.loop = None
+
+    def stop(self):
+        """
+        Cancel the pass (closing any refresh browser) so a batch can use the profiles. Safe to call from the UI thread.
+        """
+        with self.stop_lock:
+            self.stopped = True
+            if self.loop is None or self.loop.is_closed():
+                return
             try:
-                publisher_module = importlib.import_module(publisher_module_name)
-                asyncio.run(publisher_module.publish(account, self.task_data, self.log_received.emit))
-                
-                success = True
-                publication_controller.add_publication_record(
-                    account_id=account.id,
-                    title=self.task_data["title"],
-                    description=self.task_data["description"],
-                    media_paths=self.task_data["media_paths"],
-                    status="success"
-                )
-                self.log_received.emit("发布成功，已存入数据库。")
-            except Exception as e:
-                overall_success = False
-                self.log_received.emit(f"发生严重错误: {e}")
-                publication_controller.add_publication_record(
-                    account_id=account.id,
-                    title=self.task_data["title"],
-                    description=self.task_data["description"],
-                    media_paths=self.task_data["media_paths"],
-                    status="failed"
-                )
-                self.log_received.emit("发布失败，已存入数据库。")
-            
-            self.log_received.emit(f"--- 任务 {i+1}/{total_jobs} 结束 ---")
-        
-        self.task_finished.emit(overall_success)
+                self.loop.call_soon_threadsafe(self.task.cancel)
+            except RuntimeError:
+                # The loop is already closed
+                pass
+
+
+class LazyTab(QWidget):
+    """
+    Placeholder tab that imports and builds its real view the first time it is shown,
+    so the QtSql views are not loaded before the first paint.
+    """
+
+    def __init__(self, factory):
+        super().__init__()
+        self.factory = factory
+        self.view = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def ensure_loaded(self):
+        if self.view is None:
+            self.view = self.factory()
+            self.layout().addWidget(self.view)
+        return self.view
+
+
+def create_account_view():
+    from app.views.account_view import AccountView
+    return AccountView()
+
+
+def create_publication_view():
+    from app.views.publication_view import PublicationView
+    return PublicationView()
+
+
+def create_statistics_view():
+    from app.views.statistics_view import StatisticsView
+    return StatisticsView()
+
+
+def create_template_view():
+    from app.views.template_view import TemplateView
+    return TemplateView()
 
 
 class MainWindow(QMainWindow):
@@ -84,8 +240,18 @@ class MainWindow(QMainWindow):
         self.setup_publisher_tab()
         self.setup_account_tab()
         self.setup_publication_history_tab()
+        self.setup_statistics_tab()
+        self.setup_template_tab()
         self.setup_settings_tab()
 
+        # 登录保活：定期检查账号登录状态，空闲时续期即将过期的登录
+        self.session_worker = None
+        self.closing = False  # 窗口已请求关闭，等待批次中的浏览器关闭
+        self.session_timer = QTimer(self)
+        self.session_timer.timeout.connect(self.run_session_keeper)
+        self.on_session_interval_changed(self.session_interval_input.value())
+        QTimer.singleShot(2000, self.run_session_keeper)
+
     def setup_publisher_tab(self):
         publisher_widget = QWidget()
         layout = QVBoxLayout(publisher_widget)
@@ -118,6 +284,10 @@ class MainWindow(QMainWindow):
         self.description_input = QTextEdit()
         self.description_input.setPlaceholderText("输入笔记内容...")
 
+        # 内容来源：表单内容（所有账号相同），或在“发布模板”中按账号批量生成的内容批次
+        self.content_batch_selector = QComboBox()
+
+        content_layout.addRow("内容来源:", self.content_batch_selector)
         content_layout.addRow("标题:", self.title_input)
         content_layout.addRow("内容类型:", self.post_type_selector)
         content_layout.addRow("选择媒体:", file_selection_layout)
@@ -132,10 +302,44 @@ class MainWindow(QMainWindow):
         self.progress_bar.setRange(0, 0) # Indeterminate
         self.progress_bar.hide()
         self.start_button = QPushButton("开始批量发布")
+        self.stop_button = QPushButton("停止全部")
+        self.stop_button.setEnabled(False)
+        self.cancel_job_button = QPushButton("取消选中任务")
+        self.cancel_job_button.setEnabled(False)
+
+        # 当前批次的任务列表，可以单独取消某个账号的任务
+        self.job_list = QTreeWidget()
+        self.job_list.setHeaderLabels(["账号", "状态", "上传"])
+        self.job_list.setRootIsDecorated(False)
+        self.job_list.setMaximumHeight(140)
+
+        # 并行进程数：1 表示在界面进程的后台线程中依次执行
+        self.process_count_input = QSpinBox()
+        self.process_count_input.setRange(1, os.cpu_count() or 1)
+        self.process_count_input.setValue(1)
+        # 每个进程同时打开的浏览器数；同一账号的任务始终依次执行
+        self.concurrency_input = QSpinBox()
+        self.concurrency_input.setRange(1, 8)
+        self.concurrency_input.setValue(1)
+        process_layout = QHBoxLayout()
+        process_layout.addWidget(QLabel("并行进程数:"))
+        process_layout.addWidget(self.process_count_input)
+        process_layout.addWidget(QLabel("每个进程的浏览器数:"))
+        process_layout.addWidget(self.concurrency_input)
+        process_layout.addStretch()
+
+        self.resource_label = QLabel()
 
         control_layout.addWidget(self.log_output)
+        control_layout.addWidget(self.resource_label)
+        control_layout.addLayout(process_layout)
+        control_layout.addWidget(self.job_list)
         control_layout.addWidget(self.progress_bar)
-        control_layout.addWidget(self.start_button)
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.start_button)
+        button_layout.addWidget(self.cancel_job_button)
+        button_layout.addWidget(self.stop_button)
+        control_layout.addLayout(button_layout)
 
         layout.addWidget(selection_group)
         layout.addWidget(content_group)
@@ -146,20 +350,102 @@ class MainWindow(QMainWindow):
         # Connect signals
         self.select_files_button.clicked.connect(self.open_file_dialog)
         self.start_button.clicked.connect(self.start_publishing_task)
+        self.stop_button.clicked.connect(self.stop_publishing_task)
+        self.cancel_job_button.clicked.connect(self.cancel_selected_job)
         self.platform_tree.itemChanged.connect(self.handle_tree_item_change)
         
         self.load_platform_tree()
+        self.load_content_batches()
+
+    def load_content_batches(self):
+        current = self.content_batch_selector.currentData()
+        self.content_batch_selector.clear()
+        self.content_batch_selector.addItem("使用下方表单内容", None)
+        for batch, total, pending in content_controller.get_batches():
+            self.content_batch_selector.addItem(f"模板批次: {batch}（待发布 {pending}/{total}）", batch)
+        index = self.content_batch_selector.findData(current)
+        self.content_batch_selector.setCurrentIndex(max(index, 0))
 
     def setup_account_tab(self):
-        self.account_view = AccountView()
-        self.tabs.addTab(self.account_view, "账号管理")
+        self.account_tab = LazyTab(create_account_view)
+        self.tabs.addTab(self.account_tab, "账号管理")
 
     def setup_publication_history_tab(self):
-        self.publication_view = PublicationView()
-        self.tabs.addTab(self.publication_view, "发布记录")
+        self.publication_tab = LazyTab(create_publication_view)
+        self.tabs.addTab(self.publication_tab, "发布记录")
+
+    def setup_statistics_tab(self):
+        self.statistics_tab = LazyTab(create_statistics_view)
+        self.tabs.addTab(self.statistics_tab, "发布统计")
+
+    def setup_template_tab(self):
+        self.template_tab = LazyTab(create_template_view)
+        self.tabs.addTab(self.template_tab, "发布模板")
 
     def setup_settings_tab(self):
         settings_widget = QWidget()
+        layout = QVBoxLayout(settings_widget)
+
+        # 资源看门狗：监控浏览器内存/CPU，超限时回收浏览器并暂停放行新任务
+        watchdog_group = QGroupBox("资源监控")
+        watchdog_layout = QFormLayout(watchdog_group)
+        self.watchdog_enabled_input = QCheckBox("启用资源监控（需要安装 psutil）")
+        self.watchdog_enabled_input.setChecked(True)
+        self.watchdog_interval_input = QSpinBox()
+        self.watchdog_interval_input.setRange(1, 60)
+        self.watchdog_interval_input.setValue(5)
+        self.watchdog_interval_input.setSuffix(" 秒")
+        self.context_rss_limit_input = QSpinBox()
+        self.context_rss_limit_input.setRange(200, 16000)
+        self.context_rss_limit_input.setValue(1500)
+        self.context_rss_limit_input.setSuffix(" MB")
+        self.total_rss_limit_input = QSpinBox()
+        self.total_rss_limit_input.setRange(500, 128000)
+        self.total_rss_limit_input.setValue(6000)
+        self.total_rss_limit_input.setSuffix(" MB")
+        self.total_rss_limit_input.setToolTip("全部工作进程中的浏览器合计；超过后暂停启动新任务")
+        watchdog_layout.addRow(self.watchdog_enabled_input)
+        watchdog_layout.addRow("采样间隔:", self.watchdog_interval_input)
+        watchdog_layout.addRow("单个浏览器内存上限:", self.context_rss_limit_input)
+        watchdog_layout.addRow("浏览器总内存上限:", self.total_rss_limit_input)
+
+        session_group = QGroupBox("登录保活")
+        session_layout = QFormLayout(session_group)
+        self.session_keeper_enabled_input = QCheckBox("空闲时检查并续期账号登录")
+        self.session_keeper_enabled_input.setChecked(True)
+        self.session_interval_input = QSpinBox()
+        self.session_interval_input.setRange(5, 24 * 60)
+        self.session_interval_input.setValue(30)
+        self.session_interval_input.setSuffix(" 分钟")
+        self.session_refresh_window_input = QSpinBox()
+        self.session_refresh_window_input.setRange(1, 24 * 30)
+        self.session_refresh_window_input.setValue(24)
+        self.session_refresh_window_input.setSuffix(" 小时")
+        session_layout.addRow(self.session_keeper_enabled_input)
+        session_layout.addRow("检查间隔:", self.session_interval_input)
+        session_layout.addRow("提前续期:", self.session_refresh_window_input)
+        self.session_interval_input.valueChanged.connect(self.on_session_interval_changed)
+
+        # 失败诊断：只在任务失败时保存截图、页面事件与（可选的）出错步骤 trace
+        diagnostics_group = QGroupBox("失败诊断")
+        diagnostics_layout = QFormLayout(diagnostics_group)
+        self.diagnostics_enabled_input = QCheckBox("任务失败时保存截图与页面事件")
+        self.diagnostics_enabled_input.setChecked(True)
+        self.diagnostics_trace_input = QCheckBox("同时录制 Playwright trace（只保留出错步骤，会增加少量开销）")
+        self.diagnostics_size_input = QSpinBox()
+        self.diagnostics_size_input.setRange(50, 100000)
+        self.diagnostics_size_input.setValue(500)
+        self.diagnostics_size_input.setSuffix(" MB")
+        diagnostics_layout.addRow(self.diagnostics_enabled_input)
+        diagnostics_layout.addRow(self.diagnostics_trace_input)
+        diagnostics_layout.addRow("诊断目录上限:", self.diagnostics_size_input)
+        self.diagnostics_enabled_input.toggled.connect(self.diagnostics_trace_input.setEnabled)
+        self.diagnostics_enabled_input.toggled.connect(self.diagnostics_size_input.setEnabled)
+
+        layout.addWidget(watchdog_group)
+        layout.addWidget(session_group)
+        layout.addWidget(diagnostics_group)
+        layout.addStretch()
         self.tabs.addTab(settings_widget, "设置")
         self.tabs.currentChanged.connect(self.on_tab_changed)
 
@@ -179,10 +465,17 @@ class MainWindow(QMainWindow):
             platform_item.setCheckState(0, Qt.Unchecked)
             
             for acc in acc_list:
-                acc_item = QTreeWidgetItem(platform_item, [f"{acc.username} ({acc.remark})"])
+                label = f"{acc.username} ({acc.remark})"
+                acc_item = QTreeWidgetItem(platform_item, [self.account_label(label, acc.login_status)])
                 acc_item.setFlags(acc_item.flags() | Qt.ItemIsUserCheckable)
                 acc_item.setCheckState(0, Qt.Unchecked)
                 acc_item.setData(0, Qt.UserRole, acc.id) # Store account ID
+                acc_item.setData(0, Qt.UserRole + 1, label)
+
+    @staticmethod
+    def account_label(label, login_status):
+        status = session_keeper.STATUS_LABELS.get(login_status)
+        return f"{label}  {status}" if status else label
 
     def handle_tree_item_change(self, item, column):
         self.platform_tree.blockSignals(True)
@@ -218,10 +511,115 @@ class MainWindow(QMainWindow):
     def append_log(self, message):
         self.log_output.append(message)
 
+    @Slot(int, int)
+    def on_job_progress(self, finished, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(finished)
+
+    def watchdog_options(self):
+        if not self.watchdog_enabled_input.isChecked():
+            return None
+        return {
+            "interval": self.watchdog_interval_input.value(),
+            "max_context_rss_mb": self.context_rss_limit_input.value(),
+            "max_total_rss_mb": self.total_rss_limit_input.value(),
+        }
+
+    def diagnostics_options(self):
+        if not self.diagnostics_enabled_input.isChecked():
+            return None
+        return {
+            "trace": self.diagnostics_trace_input.isChecked(),
+            "max_total_mb": self.diagnostics_size_input.value(),
+        }
+
+    @Slot(dict)
+    def on_resources_sampled(self, sample):
+        # 引擎中只有一个看门狗，采样已包含全部工作进程及其浏览器
+        mb = 1024 * 1024
+        self.resource_label.setText(
+            f"Python 内存 {sample['python']['rss'] / mb:.0f} MB（{sample['python']['processes']} 个进程） | "
+            f"浏览器 {len(sample['browsers'])} 个, 内存 {sample['browser_rss'] / mb:.0f} MB, "
+            f"CPU {sample['browser_cpu']:.0f}%"
+            + (" | ⚠️ 内存超限，暂停新任务" if sample.get("throttled") else "")
+        )
+
+    @Slot(int, str)
+    def on_job_status_changed(self, job_index, status):
+        self.job_list.topLevelItem(job_index).setText(1, status)
+
+    @Slot(int, dict)
+    def on_upload_progress(self, job_index, progress):
+        mb = 1024 * 1024
+        percent = progress["sent"] * 100 / progress["total"] if progress["total"] else 0
+        self.job_list.topLevelItem(job_index).setText(
+            2, f"{percent:.0f}% ({progress['sent'] / mb:.1f}/{progress['total'] / mb:.1f} MB) {progress['rate'] / mb:.2f} MB/s"
+        )
+
+    def is_publishing(self):
+        return hasattr(self, 'worker') and self.worker.isRunning()
+
+    def on_session_interval_changed(self, minutes):
+        self.session_timer.start(minutes * 60 * 1000)
+
+    def run_session_keeper(self):
+        if not self.session_keeper_enabled_input.isChecked():
+            return
+        if self.session_worker is not None and self.session_worker.isRunning():
+            return
+        # 发布期间只读 Cookie，不打开浏览器，以免和任务争用账号的缓存目录
+        self.session_worker = SessionKeeperWorker(
+            self.session_refresh_window_input.value(), refresh=not self.is_publishing()
+        )
+        self.session_worker.account_health_changed.connect(self.on_account_health_changed)
+        self.session_worker.finished.connect(self.on_session_keeper_finished)
+        self.session_worker.start()
+
+    def stop_session_keeper(self):
+        if self.session_worker is not None and self.session_worker.isRunning():
+            self.session_worker.stop()
+            self.session_worker.wait(15000)
+
+    @Slot(int, str)
+    def on_account_health_changed(self, account_id, status):
+        root = self.platform_tree.invisibleRootItem()
+        self.platform_tree.blockSignals(True)
+        for i in range(root.childCount()):
+            platform_item = root.child(i)
+            for j in range(platform_item.childCount()):
+                item = platform_item.child(j)
+                if item.data(0, Qt.UserRole) == account_id:
+                    item.setText(0, self.account_label(item.data(0, Qt.UserRole + 1), status))
+        self.platform_tree.blockSignals(False)
+
+    def on_session_keeper_finished(self):
+        if self.account_tab.view is not None:
+            self.account_tab.view.model.select()
+
+    def stop_publishing_task(self):
+        if hasattr(self, 'worker') and self.worker.isRunning():
+            self.append_log("正在取消全部任务，等待浏览器关闭...")
+            self.stop_button.setEnabled(False)
+            self.worker.cancel()
+
+    def cancel_selected_job(self):
+        item = self.job_list.currentItem()
+        if item is None or not (hasattr(self, 'worker') and self.worker.isRunning()):
+            return
+        job_index = self.job_list.indexOfTopLevelItem(item)
+        item.setText(1, "取消中...")
+        self.worker.cancel(job_index)
+
     @Slot(bool)
     def on_task_finished(self, success):
         self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.cancel_job_button.setEnabled(False)
         self.progress_bar.hide()
+        if self.closing:
+            return
+        # 批次结束后立即更新登录状态（任务中可能刚完成人工登录）
+        self.run_session_keeper()
         if success:
             QMessageBox.information(self, "完成", "所有发布任务已执行完毕。")
         else:
@@ -250,27 +648,102 @@ class MainWindow(QMainWindow):
         if not jobs:
             QMessageBox.warning(self, "错误", "请至少选择一个要发布的账号。")
             return
-        
-        if not all([title, media_paths_str, description]):
+
+        unsupported = sorted({job['platform'] for job in jobs if registry.find(job['platform']) is None})
+        if unsupported:
+            QMessageBox.warning(
+                self, "错误",
+                f"以下平台暂不支持自动发布: {', '.join(unsupported)}\n"
+                f"已支持: {', '.join(registry.platforms())}"
+            )
+            return
+
+        # 选择了模板批次时，每个账号使用批次中下一条待发布的内容
+        batch = self.content_batch_selector.currentData()
+        if batch is None and not all([title, media_paths_str, description]):
             QMessageBox.warning(self, "错误", "请填写所有发布内容：标题、媒体文件和笔记内容。")
             return
+        contents = {}
+        if batch is not None:
+            # 认领后的内容在任务记录结果时才标记为已使用（失败或取消则退回批次）
+            contents = content_controller.claim_contents(batch, [job['account'].id for job in jobs])
+            missing = [job['account'].username for job in jobs if job['account'].id not in contents]
+            if missing:
+                content_controller.release_contents([content.id for content in contents.values()])
+                QMessageBox.warning(self, "错误", f"批次 {batch} 中以下账号没有待发布的内容: {', '.join(missing)}")
+                return
+            for job in jobs:
+                job['content'] = template_engine.content_overrides(contents[job['account'].id])
+                job['content_id'] = contents[job['account'].id].id
+
+        # 登录健康的账号先执行；已失效的账号默认直接记为失败，不占用浏览器
+        jobs = session_keeper.sort_by_login_health(jobs)
+        expired = [job['account'].username for job in jobs if job['account'].login_status == session_keeper.EXPIRED]
+        wait_for_login = False
+        if expired:
+            reply = QMessageBox.question(
+                self,
+                "登录已失效",
+                f"以下账号的登录已失效: {', '.join(expired)}\n\n"
+                "是否仍然执行这些账号，并在浏览器中等待人工登录？\n选择“否”将直接把它们记为失败，不打开浏览器。",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            wait_for_login = reply == QMessageBox.Yes
+            if not wait_for_login:
+                session_keeper.flag_expired(jobs)
 
         # 3. Structure common task data
         post_type = self.post_type_selector.currentText()
         task_data = {
             "title": title,
             "post_type": "image" if post_type == "图文笔记" else "video",
-            "media_paths": media_paths_str.split(";") if post_type == "图文笔记" else [media_paths_str],
+            "media_paths": [path for path in media_paths_str.split(";") if path],
             "description": description
         }
-        
-        # 4. Start the worker
+
+        # 视频大小/时长等在启动浏览器之前检查；相同的平台与媒体只检查一次
+        checked = {}
+        for job in jobs:
+            job_data = job_runner.job_task_data(job, task_data)
+            key = (job['platform'], job_data['post_type'], tuple(job_data['media_paths']))
+            if key not in checked:
+                checked[key] = registry.get(job['platform']).check_task(job_data)
+        problems = sorted({problem for found in checked.values() for problem in found})
+        if problems:
+            content_controller.release_contents([content.id for content in contents.values()])
+            QMessageBox.warning(self, "错误", "\n".join(problems))
+            return
+
+        # 4. Start the worker; a running keeper pass is stopped first so its browsers release the profiles
+        self.stop_session_keeper()
         self.log_output.clear()
+        if expired:
+            self.append_log(
+                f"⚠️ 以下账号登录已失效，将在最后执行并等待人工登录: {', '.join(expired)}" if wait_for_login
+                else f"⚠️ 以下账号登录已失效，已跳过（记为失败）: {', '.join(expired)}"
+            )
         self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.cancel_job_button.setEnabled(True)
+        self.job_list.clear()
+        for job in jobs:
+            QTreeWidgetItem(self.job_list, [job['account'].username, "等待中", ""])
+        self.progress_bar.setRange(0, 0)
         self.progress_bar.show()
 
-        self.worker = AsyncWorker(jobs, task_data)
+        self.worker = AsyncWorker(
+            jobs, task_data,
+            processes=self.process_count_input.value(),
+            concurrency=self.concurrency_input.value(),
+            watchdog_options=self.watchdog_options(),
+            diagnostics_options=self.diagnostics_options(),
+        )
         self.worker.log_received.connect(self.append_log)
+        self.worker.job_progress.connect(self.on_job_progress)
+        self.worker.job_status_changed.connect(self.on_job_status_changed)
+        self.worker.upload_progress.connect(self.on_upload_progress)
+        self.worker.resources_sampled.connect(self.on_resources_sampled)
         self.worker.task_finished.connect(self.on_task_finished)
         self.worker.start()
 
@@ -278,16 +751,39 @@ class MainWindow(QMainWindow):
         tab_text = self.tabs.tabText(index)
         if tab_text == "自动化发布":
             self.load_platform_tree()
+            self.load_content_batches()
         elif tab_text == "发布记录":
-            self.publication_view.refresh()
+            self.publication_tab.ensure_loaded().refresh()
+        elif tab_text == "发布统计":
+            self.statistics_tab.ensure_loaded().refresh()
+        elif tab_text == "发布模板":
+            self.template_tab.ensure_loaded().refresh()
         elif tab_text == "账号管理":
-            self.account_view.model.select()
+            self.account_tab.ensure_loaded().model.select()
 
     def closeEvent(self, event):
-        # Ensure worker thread is properly terminated
-        if hasattr(self, 'worker') and self.worker.isRunning():
-            self.worker.quit()
-            self.worker.wait()
+        # AsyncWorker has no Qt event loop, so quit() would do nothing: cancel the batch
+        # cooperatively and close the window once its thread has finished. Qt must not
+        # destroy a QThread that is still running.
+        self.session_timer.stop()
+        self.stop_session_keeper()
+        running = [
+            worker for worker in (getattr(self, 'worker', None), self.session_worker)
+            if worker is not None and worker.isRunning()
+        ]
+        if running:
+            if not self.closing:
+                self.closing = True
+                if getattr(self, 'worker', None) in running:
+                    self.worker.cancel()
+                    self.append_log("正在取消任务并关闭浏览器，完成后窗口将自动关闭...")
+                for worker in running:
+                    worker.finished.connect(self.close)
+                self.start_button.setEnabled(False)
+                self.stop_button.setEnabled(False)
+                self.cancel_job_button.setEnabled(False)
+            event.ignore()
+            return
         event.accept()
 
 
@@ -1,8 +1,44 @@
+import os
+import time
+
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QTableView, QHeaderView, QMessageBox, QGroupBox
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QHeaderView, QMessageBox, QGroupBox,
+    QLineEdit, QComboBox, QCheckBox, QDateEdit, QLabel, QStackedWidget, QTableWidget,
+    QTableWidgetItem, QStyledItemDelegate, QStyle, QStyleOptionViewItem
 )
 from PySide6.QtSql import QSqlDatabase, QSqlTableModel
-from PySide6.QtCore import Qt
+from PySide6.QtGui import QTextDocument, QDesktopServices
+from PySide6.QtCore import Qt, QDate, QTimer, QUrl
+
+from app.controllers import account_controller, publication_controller
+
+
+# 搜索框停止输入多久后再查询（毫秒）
+SEARCH_DEBOUNCE_MS = 200
+STATUSES = [("全部", None), ("成功", "success"), ("失败", "failed"), ("取消", "cancelled")]
+
+
+class HtmlDelegate(QStyledItemDelegate):
+    """
+    把单元格文本当作 HTML 绘制，用于显示搜索结果中加粗的匹配片段。
+    """
+
+    def paint(self, painter, option, index):
+        options = QStyleOptionViewItem(option)
+        self.initStyleOption(options, index)
+        document = QTextDocument()
+        document.setDefaultFont(options.font)
+        document.setHtml(options.text)
+        options.text = ""
+        style = options.widget.style() if options.widget else QStyle()
+        style.drawControl(QStyle.CE_ItemViewItem, options, painter, options.widget)
+
+        text_rect = style.subElementRect(QStyle.SE_ItemViewItemText, options, options.widget)
+        painter.save()
+        painter.translate(text_rect.topLeft())
+        painter.setClipRect(text_rect.translated(-text_rect.topLeft()))
+        document.drawContents(painter)
+        painter.restore()
 
 
 class PublicationView(QWidget):
@@ -16,11 +52,43 @@ class PublicationView(QWidget):
             QMessageBox.critical(self, "Database Error", self.db.lastError().text())
             return
 
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+
         self.setup_ui()
         self.load_records()
+        self.load_accounts()
 
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
+
+        # Search bar
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索标题和内容（空格分隔多个关键词）")
+        self.search_input.setClearButtonEnabled(True)
+        self.account_selector = QComboBox()
+        self.status_selector = QComboBox()
+        for label, status in STATUSES:
+            self.status_selector.addItem(label, status)
+        self.date_filter_checkbox = QCheckBox("按日期筛选")
+        self.since_input = QDateEdit(QDate.currentDate().addDays(-30))
+        self.until_input = QDateEdit(QDate.currentDate())
+        for date_input in (self.since_input, self.until_input):
+            date_input.setCalendarPopup(True)
+            date_input.setDisplayFormat("yyyy-MM-dd")
+            date_input.setEnabled(False)
+        search_layout.addWidget(self.search_input, 1)
+        search_layout.addWidget(QLabel("账号:"))
+        search_layout.addWidget(self.account_selector)
+        search_layout.addWidget(QLabel("状态:"))
+        search_layout.addWidget(self.status_selector)
+        search_layout.addWidget(self.date_filter_checkbox)
+        search_layout.addWidget(self.since_input)
+        search_layout.addWidget(QLabel("至"))
+        search_layout.addWidget(self.until_input)
+
         group_box = QGroupBox("发布历史记录")
         layout = QVBoxLayout(group_box)
         
@@ -29,10 +97,41 @@ class PublicationView(QWidget):
         self.table_view.setSelectionBehavior(QTableView.SelectRows)
         self.table_view.setEditTriggers(QTableView.NoEditTriggers) # Read-only
         self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        
-        layout.addWidget(self.table_view)
+        self.table_view.setToolTip("双击失败记录可打开诊断目录")
+
+        # Search results: ranked by relevance, matches highlighted
+        self.results_table = QTableWidget()
+        self.results_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.results_table.setColumnCount(5)
+        self.results_table.setHorizontalHeaderLabels(["标题", "内容摘要", "账号", "状态", "发布时间"])
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        html_delegate = HtmlDelegate(self.results_table)
+        self.results_table.setItemDelegateForColumn(0, html_delegate)
+        self.results_table.setItemDelegateForColumn(1, html_delegate)
+
+        self.stack = QStackedWidget()
+        self.stack.addWidget(self.table_view)
+        self.stack.addWidget(self.results_table)
+        self.search_status = QLabel()
+
+        layout.addWidget(self.stack)
+        layout.addWidget(self.search_status)
+        main_layout.addLayout(search_layout)
         main_layout.addWidget(group_box)
 
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_input.returnPressed.connect(self.search)
+        self.search_timer.timeout.connect(self.search)
+        self.account_selector.currentIndexChanged.connect(self.search)
+        self.status_selector.currentIndexChanged.connect(self.search)
+        self.date_filter_checkbox.toggled.connect(self.since_input.setEnabled)
+        self.date_filter_checkbox.toggled.connect(self.until_input.setEnabled)
+        self.date_filter_checkbox.toggled.connect(self.search)
+        self.since_input.dateChanged.connect(self.search)
+        self.until_input.dateChanged.connect(self.search)
+        self.table_view.doubleClicked.connect(self.open_diagnostics)
+
     def load_records(self):
         self.model = QSqlTableModel(self, self.db)
         self.model.setTable("publicationrecord")
@@ -43,6 +142,7 @@ class PublicationView(QWidget):
         self.model.setHeaderData(self.model.fieldIndex("published_at"), Qt.Horizontal, "发布时间")
         self.model.setHeaderData(self.model.fieldIndex("account_id"), Qt.Horizontal, "账号ID")
         self.model.setHeaderData(self.model.fieldIndex("description"), Qt.Horizontal, "内容摘要")
+        self.model.setHeaderData(self.model.fieldIndex("diagnostics_path"), Qt.Horizontal, "诊断目录")
         
         self.model.select()
         self.table_view.setModel(self.model)
@@ -50,13 +150,69 @@ class PublicationView(QWidget):
         # Hide columns we don't want to see
         self.table_view.hideColumn(self.model.fieldIndex("id"))
         self.table_view.hideColumn(self.model.fieldIndex("media_paths"))
+        self.table_view.hideColumn(self.model.fieldIndex("search_grams"))
 
         # Sort by date by default
         self.table_view.sortByColumn(self.model.fieldIndex("published_at"), Qt.DescendingOrder)
 
+    def load_accounts(self):
+        current = self.account_selector.currentData()
+        self.account_selector.blockSignals(True)
+        self.account_selector.clear()
+        self.account_selector.addItem("全部", None)
+        for account in account_controller.get_all_accounts():
+            self.account_selector.addItem(f"{account.username} ({account.platform})", account.id)
+        self.account_selector.setCurrentIndex(max(self.account_selector.findData(current), 0))
+        self.account_selector.blockSignals(False)
+
+    def search(self):
+        self.search_timer.stop()
+        query = self.search_input.text().strip()
+        if not query:
+            self.search_status.clear()
+            self.stack.setCurrentWidget(self.table_view)
+            return
+
+        filter_dates = self.date_filter_checkbox.isChecked()
+        started = time.perf_counter()
+        results = publication_controller.search_publication_records(
+            query,
+            account_id=self.account_selector.currentData(),
+            status=self.status_selector.currentData(),
+            since=self.since_input.date().toPython() if filter_dates else None,
+            until=self.until_input.date().toPython() if filter_dates else None,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.results_table.setRowCount(len(results))
+        for i, row in enumerate(results):
+            account = f"{row['username']} ({row['platform']})" if row["username"] else f"#{row['account_id']}"
+            values = [
+                row["title_html"], row["description_html"], account, row["status"], str(row["published_at"])[:19],
+            ]
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if j < 2:
+                    item.setToolTip(row["title"] if j == 0 else row["description"])
+                self.results_table.setItem(i, j, item)
+        self.stack.setCurrentWidget(self.results_table)
+        self.search_status.setText(f"找到 {len(results)} 条记录，用时 {elapsed_ms:.0f} ms")
+
+    def open_diagnostics(self, index):
+        path = self.model.record(index.row()).value("diagnostics_path")
+        if not path:
+            return
+        if not os.path.isdir(path):
+            QMessageBox.information(self, "诊断信息", f"诊断目录已被清理: {path}")
+            return
+        QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.abspath(path)))
+
     def refresh(self):
         """Public method to refresh the view."""
         self.model.select()
+        self.load_accounts()
+        if self.search_input.text().strip():
+            self.search()
 
     def closeEvent(self, event):
         self.db.close()
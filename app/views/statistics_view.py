@@ -0,0 +1,131 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QHeaderView, QGroupBox, QComboBox, QLabel, QPushButton
+)
+from PySide6.QtCore import Qt
+
+from app.controllers import account_controller, stats_controller
+
+
+# 时间范围（天数，None 表示全部）
+RANGES = [("今天", 1), ("近 7 天", 7), ("近 30 天", 30), ("近 90 天", 90), ("全部", None)]
+GROUPS = [("按平台", "platform"), ("按账号", "account"), ("按日期", "day")]
+
+
+def format_duration(ms):
+    if ms is None:
+        return "-"
+    return f"{ms / 1000:.1f}s"
+
+
+class StatisticsView(QWidget):
+    """
+    发布统计：成功率、吞吐量（日均发布数）与耗时，按平台 / 账号 / 日期汇总。
+
+    数据来自 publicationdailystat 汇总表，与发布记录的数量无关，切换筛选条件时即时刷新。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        main_layout = QVBoxLayout(self)
+
+        filter_layout = QHBoxLayout()
+        self.range_selector = QComboBox()
+        for label, days in RANGES:
+            self.range_selector.addItem(label, days)
+        self.range_selector.setCurrentIndex(1)
+        self.group_selector = QComboBox()
+        for label, group_by in GROUPS:
+            self.group_selector.addItem(label, group_by)
+        self.platform_selector = QComboBox()
+        self.account_selector = QComboBox()
+        self.refresh_button = QPushButton("刷新")
+        filter_layout.addWidget(QLabel("时间 (UTC):"))
+        filter_layout.addWidget(self.range_selector)
+        filter_layout.addWidget(QLabel("汇总:"))
+        filter_layout.addWidget(self.group_selector)
+        filter_layout.addWidget(QLabel("平台:"))
+        filter_layout.addWidget(self.platform_selector)
+        filter_layout.addWidget(QLabel("账号:"))
+        filter_layout.addWidget(self.account_selector)
+        filter_layout.addStretch()
+        filter_layout.addWidget(self.refresh_button)
+
+        group_box = QGroupBox("发布统计")
+        layout = QVBoxLayout(group_box)
+        self.summary_label = QLabel()
+        self.table = QTableWidget()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.table)
+
+        main_layout.addLayout(filter_layout)
+        main_layout.addWidget(group_box)
+
+        self.range_selector.currentIndexChanged.connect(self.load_statistics)
+        self.group_selector.currentIndexChanged.connect(self.load_statistics)
+        self.platform_selector.currentIndexChanged.connect(self.load_statistics)
+        self.account_selector.currentIndexChanged.connect(self.load_statistics)
+        self.refresh_button.clicked.connect(self.refresh)
+
+    def refresh(self):
+        """Reload the filter choices and the statistics."""
+        accounts = account_controller.get_all_accounts()
+        for selector, items in (
+            (self.platform_selector, [(p, p) for p in sorted({a.platform for a in accounts})]),
+            (self.account_selector, [(f"{a.username} ({a.platform})", a.id) for a in accounts]),
+        ):
+            current = selector.currentData()
+            selector.blockSignals(True)
+            selector.clear()
+            selector.addItem("全部", None)
+            for label, value in items:
+                selector.addItem(label, value)
+            selector.setCurrentIndex(max(selector.findData(current), 0))
+            selector.blockSignals(False)
+        self.load_statistics()
+
+    def load_statistics(self):
+        days = self.range_selector.currentData()
+        group_by = self.group_selector.currentData()
+        rows = stats_controller.get_statistics(
+            group_by=group_by,
+            since=stats_controller.days_back(days) if days else None,
+            platform=self.platform_selector.currentData(),
+            account_id=self.account_selector.currentData(),
+        )
+
+        key_headers = {"platform": ["平台"], "account": ["平台", "账号"], "day": ["日期"]}[group_by]
+        headers = key_headers + ["总数", "成功", "失败", "取消", "成功率", "日均发布", "平均耗时", "最长耗时"]
+        self.table.clear()
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            keys = {
+                "platform": [row.get("platform")],
+                "account": [row.get("platform"), row.get("username") or f"#{row.get('account_id')}"],
+                "day": [row.get("day")],
+            }[group_by]
+            values = keys + [
+                row["total"], row["succeeded"], row["failed"], row["cancelled"],
+                f"{row['success_rate']:.1%}", f"{row['per_day']:.1f}",
+                format_duration(row["avg_duration_ms"]), format_duration(row["max_duration_ms"]),
+            ]
+            for j, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                self.table.setItem(i, j, item)
+
+        total = sum(row["total"] for row in rows)
+        succeeded = sum(row["succeeded"] for row in rows)
+        failed = sum(row["failed"] for row in rows)
+        self.summary_label.setText(
+            f"共 {total} 次发布，成功 {succeeded}，失败 {failed}，成功率 {succeeded / total:.1%}" if total else "暂无数据"
+        )
@@ -0,0 +1,334 @@
+import time
+
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QHeaderView,
+    QGroupBox, QFormLayout, QLineEdit, QPushButton, QMessageBox,
+    QSplitter, QTextEdit, QComboBox, QFileDialog, QLabel
+)
+from PySide6.QtSql import QSqlDatabase, QSqlTableModel
+from PySide6.QtCore import Qt, Signal, QThread
+from sqlalchemy.exc import IntegrityError
+
+from app.controllers import account_controller, template_controller
+from app.services import template_engine
+
+
+class ContentRenderWorker(QThread):
+    """
+    Renders a template for many accounts and writes the content rows off the UI thread.
+    """
+    progress = Signal(int)  # contents generated so far
+    succeeded = Signal(int, float)  # total contents, seconds
+    failed = Signal(str)
+
+    def __init__(self, template, accounts, batch, manifest_path=None):
+        super().__init__()
+        self.template = template
+        self.accounts = accounts
+        self.batch = batch
+        self.manifest_path = manifest_path
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            manifest = template_engine.load_manifest(self.manifest_path) if self.manifest_path else None
+            total = template_engine.generate_contents(
+                self.template, self.accounts, self.batch, manifest, on_progress=self.progress.emit
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.succeeded.emit(total, time.perf_counter() - started)
+
+
+class TemplateView(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.current_template_id = None
+        self.worker = None
+
+        conn_name = "template_view_conn"
+        if QSqlDatabase.contains(conn_name):
+            self.db = QSqlDatabase.database(conn_name)
+        else:
+            self.db = QSqlDatabase.addDatabase("QSQLITE", conn_name)
+            self.db.setDatabaseName("database.db")
+
+        if not self.db.open():
+            QMessageBox.critical(self, "Database Error", self.db.lastError().text())
+            return
+
+        self.model: QSqlTableModel | None = None
+
+        self.setup_ui()
+        self.load_templates()
+        self.refresh()
+
+    def setup_ui(self):
+        main_layout = QHBoxLayout(self)
+        splitter = QSplitter(Qt.Horizontal)
+
+        # Left side: Table view
+        table_group = QGroupBox("模板列表")
+        table_layout = QVBoxLayout(table_group)
+        self.table_view = QTableView()
+        self.table_view.setSelectionBehavior(QTableView.SelectRows)
+        self.table_view.setSelectionMode(QTableView.SingleSelection)
+        self.table_view.setEditTriggers(QTableView.NoEditTriggers)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table_layout.addWidget(self.table_view)
+
+        # Right side: Template form
+        form_group = QGroupBox("模板内容")
+        form_layout = QFormLayout(form_group)
+        self.name_input = QLineEdit()
+        self.title_template_input = QLineEdit()
+        self.title_template_input.setPlaceholderText("例如: {{ username }} 推荐 {{ product }}")
+        self.description_template_input = QTextEdit()
+        self.description_template_input.setPlaceholderText(
+            '例如: {{ product }} 购买链接 {{ link|default:"https://..." }} {{ tags|hashtags }}'
+        )
+        form_layout.addRow("名称:", self.name_input)
+        form_layout.addRow("标题模板:", self.title_template_input)
+        form_layout.addRow("正文模板:", self.description_template_input)
+
+        button_layout = QHBoxLayout()
+        self.add_button = QPushButton("新增")
+        self.save_button = QPushButton("保存")
+        self.delete_button = QPushButton("删除")
+        self.preview_button = QPushButton("预览")
+        self.clear_button = QPushButton("清空")
+        button_layout.addWidget(self.add_button)
+        button_layout.addWidget(self.save_button)
+        button_layout.addWidget(self.delete_button)
+        button_layout.addWidget(self.preview_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.clear_button)
+
+        # Bulk generation
+        generate_group = QGroupBox("批量生成内容")
+        generate_layout = QFormLayout(generate_group)
+        self.batch_input = QLineEdit()
+        self.batch_input.setPlaceholderText("批次名称，发布时按批次选择内容")
+        self.platform_selector = QComboBox()
+        self.manifest_input = QLineEdit()
+        self.manifest_input.setReadOnly(True)
+        self.manifest_button = QPushButton("选择清单")
+        manifest_layout = QHBoxLayout()
+        manifest_layout.addWidget(self.manifest_input)
+        manifest_layout.addWidget(self.manifest_button)
+        self.generate_button = QPushButton("生成")
+        self.generate_status = QLabel()
+        generate_layout.addRow("批次:", self.batch_input)
+        generate_layout.addRow("账号平台:", self.platform_selector)
+        generate_layout.addRow("变量清单 (JSON):", manifest_layout)
+        generate_layout.addRow(self.generate_button)
+        generate_layout.addRow(self.generate_status)
+
+        right_layout = QVBoxLayout()
+        right_layout.addWidget(form_group)
+        right_layout.addLayout(button_layout)
+        right_layout.addWidget(generate_group)
+        right_layout.addStretch()
+
+        right_widget = QWidget()
+        right_widget.setLayout(right_layout)
+
+        splitter.addWidget(table_group)
+        splitter.addWidget(right_widget)
+        splitter.setSizes([500, 500])
+
+        main_layout.addWidget(splitter)
+
+        # Connect signals
+        self.add_button.clicked.connect(self.add_template)
+        self.save_button.clicked.connect(self.save_template)
+        self.delete_button.clicked.connect(self.delete_template)
+        self.preview_button.clicked.connect(self.preview_template)
+        self.clear_button.clicked.connect(self.clear_form)
+        self.manifest_button.clicked.connect(self.choose_manifest)
+        self.generate_button.clicked.connect(self.generate_contents)
+
+    def load_templates(self):
+        self.model = QSqlTableModel(self, self.db)
+        self.model.setTable("publishtemplate")
+        self.model.select()
+
+        self.model.setHeaderData(self.model.fieldIndex("name"), Qt.Horizontal, "名称")
+        self.model.setHeaderData(self.model.fieldIndex("title_template"), Qt.Horizontal, "标题模板")
+        self.model.setHeaderData(self.model.fieldIndex("description_template"), Qt.Horizontal, "正文模板")
+        self.model.setHeaderData(self.model.fieldIndex("created_at"), Qt.Horizontal, "创建时间")
+
+        self.table_view.setModel(self.model)
+        self.table_view.hideColumn(self.model.fieldIndex("id"))
+
+        sel_model = self.table_view.selectionModel()
+        if sel_model is not None:
+            sel_model.selectionChanged.connect(self.on_selection_changed)
+
+    def refresh(self):
+        self.model.select()
+        platforms = sorted({account.platform for account in account_controller.get_all_accounts()})
+        current = self.platform_selector.currentText()
+        self.platform_selector.clear()
+        self.platform_selector.addItem("全部账号")
+        self.platform_selector.addItems(platforms)
+        self.platform_selector.setCurrentText(current)
+
+    def on_selection_changed(self, selected, deselected):
+        if not selected.indexes():
+            self.current_template_id = None
+            return
+
+        row = selected.indexes()[0].row()
+        self.current_template_id = self.model.record(row).value("id")
+
+        template = template_controller.get_template_by_id(self.current_template_id)
+        if template:
+            self.name_input.setText(template.name)
+            self.title_template_input.setText(template.title_template)
+            self.description_template_input.setPlainText(template.description_template)
+
+    def form_data(self):
+        data = {
+            "name": self.name_input.text().strip(),
+            "title_template": self.title_template_input.text(),
+            "description_template": self.description_template_input.toPlainText(),
+        }
+        if not all(data.values()):
+            QMessageBox.warning(self, "输入错误", "名称、标题模板和正文模板不能为空。")
+            return None
+        try:
+            template_engine.compile_template(data["title_template"])
+            template_engine.compile_template(data["description_template"])
+        except template_engine.TemplateError as e:
+            QMessageBox.warning(self, "模板错误", str(e))
+            return None
+        return data
+
+    def add_template(self):
+        data = self.form_data()
+        if data is None:
+            return
+        try:
+            template_controller.add_template(**data)
+        except IntegrityError:
+            QMessageBox.warning(self, "模板错误", f"模板名称已存在: {data['name']}")
+            return
+        self.model.select()
+        self.clear_form()
+
+    def save_template(self):
+        if self.current_template_id is None:
+            QMessageBox.warning(self, "操作错误", "请先选择一个要编辑的模板。")
+            return
+        data = self.form_data()
+        if data is None:
+            return
+        try:
+            template_controller.update_template(self.current_template_id, data)
+        except IntegrityError:
+            QMessageBox.warning(self, "模板错误", f"模板名称已存在: {data['name']}")
+            return
+        self.model.select()
+        QMessageBox.information(self, "成功", "模板已更新。")
+
+    def delete_template(self):
+        if self.current_template_id is None:
+            QMessageBox.warning(self, "操作错误", "请先选择一个要删除的模板。")
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "确认删除",
+            "确定要删除这个模板吗？已生成的内容不会被删除。",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            template_controller.delete_template(self.current_template_id)
+            self.model.select()
+            self.clear_form()
+
+    def preview_template(self):
+        data = self.form_data()
+        if data is None:
+            return
+        accounts = self.selected_accounts()
+        if not accounts:
+            QMessageBox.warning(self, "预览", "没有可用于预览的账号。")
+            return
+        try:
+            manifest = self.load_manifest()
+            variant = template_engine.preview(
+                data["title_template"], data["description_template"], accounts[0], manifest
+            )
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "模板错误", str(e))
+            return
+        if variant is None:
+            QMessageBox.information(self, "预览", f"清单中没有账号 {accounts[0].username} 可用的行。")
+            return
+        QMessageBox.information(
+            self, f"预览: {accounts[0].username}", f"标题: {variant['title']}\n\n{variant['description']}"
+        )
+
+    def selected_accounts(self):
+        platform = self.platform_selector.currentText()
+        accounts = account_controller.get_all_accounts()
+        if self.platform_selector.currentIndex() <= 0:
+            return accounts
+        return [account for account in accounts if account.platform == platform]
+
+    def load_manifest(self):
+        path = self.manifest_input.text()
+        return template_engine.load_manifest(path) if path else None
+
+    def choose_manifest(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择变量清单", "", "JSON Files (*.json)")
+        if path:
+            self.manifest_input.setText(path)
+
+    def generate_contents(self):
+        if self.current_template_id is None:
+            QMessageBox.warning(self, "操作错误", "请先选择一个模板。")
+            return
+        batch = self.batch_input.text().strip()
+        if not batch:
+            QMessageBox.warning(self, "输入错误", "请填写批次名称。")
+            return
+        accounts = self.selected_accounts()
+        if not accounts:
+            QMessageBox.warning(self, "输入错误", "没有符合条件的账号。")
+            return
+
+        template = template_controller.get_template_by_id(self.current_template_id)
+        self.generate_button.setEnabled(False)
+        self.generate_status.setText("正在生成...")
+        self.worker = ContentRenderWorker(template, accounts, batch, self.manifest_input.text() or None)
+        self.worker.progress.connect(lambda total: self.generate_status.setText(f"已生成 {total} 条..."))
+        self.worker.succeeded.connect(self.on_generate_succeeded)
+        self.worker.failed.connect(self.on_generate_failed)
+        self.worker.start()
+
+    def on_generate_succeeded(self, total, seconds):
+        self.generate_button.setEnabled(True)
+        self.generate_status.setText(f"批次 {self.worker.batch}: 已生成 {total} 条内容，用时 {seconds:.1f}s")
+
+    def on_generate_failed(self, error):
+        self.generate_button.setEnabled(True)
+        self.generate_status.setText("")
+        QMessageBox.warning(self, "生成失败", error)
+
+    def clear_form(self):
+        self.current_template_id = None
+        self.name_input.clear()
+        self.title_template_input.clear()
+        self.description_template_input.clear()
+        self.table_view.clearSelection()
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.wait()
+        self.db.close()
+        super().closeEvent(event)
@@ -1,24 +1,51 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from app.views.main_window import MainWindow
-from app.services.database import create_db_and_tables
+from app.services import startup_profile
 
 
 def main():
     """
     Main function to launch the application.
+
+    Heavy modules are imported inside the startup phases so `--profile-startup`
+    can show where the time to first paint goes.
     """
+    with startup_profile.phase("import PySide6"):
+        from PySide6.QtWidgets import QApplication
+        from PySide6.QtCore import QTimer
+
     # 1. Initialize database and tables
     print("Initializing database...")
-    create_db_and_tables()
+    with startup_profile.phase("import database"):
+        from app.services.database import create_db_and_tables
+    with startup_profile.phase("database schema check"):
+        create_db_and_tables()
     print("Database initialized.")
 
+    # Discover and validate the publisher plugins once; Playwright itself is still loaded lazily
+    with startup_profile.phase("load publisher registry"):
+        from publishers import registry
+        registry.load()
+    for plugin, problems in registry.problems().items():
+        print(f"Publisher plugin {plugin} disabled: {'; '.join(problems)}")
+
     # 2. Create and run the Qt application
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    with startup_profile.phase("create QApplication"):
+        app = QApplication(sys.argv)
+    with startup_profile.phase("import main window"):
+        from app.views.main_window import MainWindow
+    with startup_profile.phase("build main window"):
+        window = MainWindow()
     window.show()
+
+    if startup_profile.enabled():
+        def report_first_paint():
+            startup_profile.mark("total until first paint")
+            print(startup_profile.report())
+        # Runs on the first event loop iteration, right after the window is first painted
+        QTimer.singleShot(0, report_first_paint)
+
     sys.exit(app.exec())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
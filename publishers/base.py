@@ -0,0 +1,391 @@
+import asyncio
+import contextlib
+import inspect
+import os
+import time
+from pathlib import Path
+
+from publishers import media_probe
+from publishers.page_helpers import PageHelper, RoundTripCounter, unwrap
+
+
+# 迁移旧版本共用缓存目录时在平台目录下创建的锁
+LEGACY_MIGRATION_LOCK = ".legacy.migrating"
+
+
+class ContextRecycleRequested(Exception):
+    """
+    资源看门狗要求关闭并重新打开当前浏览器 context。
+    """
+
+
+class BasePublisher:
+    """
+    各平台发布脚本的基类。
+
+    子类只需要声明平台信息、步骤（steps）、选择器（selectors）与超时（timeouts），并实现每个步骤
+    对应的协程方法 `async def <step>(self, page)`；浏览器启动、共享 Playwright 驱动、录制/回放、
+    资源回收、按步骤重试与计时、失败诊断和取消处理都由基类完成。
+    """
+    # 注册表使用的平台标识，对应 Account.platform（不区分大小写），aliases 为其他可接受的写法
+    platform = ""
+    aliases = ()
+    display_name = ""
+    home_url = ""
+
+    # 表示登录状态的 Cookie：SessionKeeper 直接读取缓存目录中的 Cookie 数据库判断是否即将过期，无需打开页面
+    session_cookie_domain = ""
+    session_cookies = ()
+
+    # 按顺序执行的步骤名，每个名字对应一个 async 方法
+    steps = ()
+    # 元素选择器与超时（毫秒），在子类中集中声明，便于页面改版时统一修改；
+    # 值为字符串（Playwright 选择器）或 page_helpers.Target（可在页面内一次性批量解析）
+    selectors = {}
+    timeouts = {}
+    # 每个步骤失败后的重试次数；只应给可以安全重复执行的步骤（例如登录检查）配置
+    step_retries = {}
+    retry_backoff = 2
+
+    # 为 False 的插件（例如直接调用开放接口的平台）不需要浏览器，工作进程不会为其启动 Playwright
+    uses_browser = True
+
+    # 浏览器缓存根目录；为 None 时使用 userdata/<platform>
+    profile_root = None
+    launch_args = ("--start-maximized",)
+
+    # 视频限制（字节 / 秒），None 表示不限制；在启动浏览器之前由 check_task() 检查
+    video_max_bytes = None
+    video_min_duration = None
+    video_max_duration = None
+
+    # 因内存超限而重开浏览器的最大次数；超过后忽略回收请求，继续完成本次任务
+    max_recycles = 1
+    # 关闭浏览器的最长等待时间（秒），取消任务时保证尽快释放缓存目录
+    close_timeout = 10
+
+    def __init__(
+        self, account, task_data, logger_callback, recorder=None, playwright=None, watchdog=None,
+        progress_callback=None, diagnostics=None,
+    ):
+        self.account = account
+        self.task_data = task_data
+        self.logger = logger_callback  # A function to emit logs to the UI
+        self.diagnostics = diagnostics  # 可选的 FailureDiagnostics，失败时保存截图、事件与 trace
+        if diagnostics is not None:
+            self.logger = diagnostics.wrap_logger(logger_callback)
+        self.progress_callback = progress_callback  # 可选，接收上传进度 {"step", "sent", "total", "rate"}
+        self.recorder = recorder  # 可选的 SessionRecorder，用于录制/回放网络流量
+        self.playwright = playwright  # 可选的共享 Playwright 实例，由工作进程统一启动
+        self.watchdog = watchdog  # 可选的 ResourceLimits / ResourceWatchdog，内存超限时在步骤之间回收 context
+        self.step_timings = {}
+        self.step_round_trips = {}
+        self.round_trips = RoundTripCounter()
+        self.dom = None  # PageHelper，在浏览器打开后创建
+
+    @classmethod
+    def validate(cls) -> list[str]:
+        """
+        检查插件声明是否完整，返回问题列表（为空表示通过）。注册表在启动时调用一次。
+        """
+        problems = []
+        if not cls.platform:
+            problems.append("未声明 platform")
+        if not cls.steps:
+            problems.append("未声明 steps")
+        for name in cls.steps:
+            if not inspect.iscoroutinefunction(getattr(cls, name, None)):
+                problems.append(f"步骤 {name} 不是 async 方法")
+        for name in cls.step_retries:
+            if name not in cls.steps:
+                problems.append(f"step_retries 中的 {name} 不是已声明的步骤")
+        for name, selector in cls.selectors.items():
+            if not selector:
+                problems.append(f"选择器 {name} 为空")
+        return problems
+
+    @classmethod
+    def check_task(cls, task_data) -> list[str]:
+        """
+        在启动浏览器之前检查任务数据（媒体文件是否存在、视频大小与时长），返回问题列表（为空表示通过）。
+        """
+        media_paths = task_data.get("media_paths") or []
+        if not media_paths:
+            return ["媒体文件路径不能为空。"]
+        problems = [f"文件不存在: {path}" for path in media_paths if not os.path.isfile(path)]
+        if problems or task_data.get("post_type") != "video":
+            return problems
+
+        if len(media_paths) != 1:
+            return ["视频笔记只能上传一个视频文件。"]
+        path = media_paths[0]
+        if not path.lower().endswith(media_probe.VIDEO_EXTENSIONS):
+            return [f"不支持的视频格式: {path}（支持 {', '.join(media_probe.VIDEO_EXTENSIONS)}）"]
+        info = media_probe.probe_video(path)
+        mb = 1024 * 1024
+        if cls.video_max_bytes is not None and info["size"] > cls.video_max_bytes:
+            problems.append(f"视频过大: {info['size'] / mb:.0f} MB，上限 {cls.video_max_bytes / mb:.0f} MB")
+        duration = info["duration"]
+        if duration is None:
+            if cls.video_min_duration is not None or cls.video_max_duration is not None:
+                problems.append(f"无法读取视频时长: {path}")
+        elif cls.video_min_duration is not None and duration < cls.video_min_duration:
+            problems.append(f"视频过短: {duration:.1f}s，至少 {cls.video_min_duration}s")
+        elif cls.video_max_duration is not None and duration > cls.video_max_duration:
+            problems.append(f"视频过长: {duration:.0f}s，上限 {cls.video_max_duration}s")
+        return problems
+
+    @classmethod
+    def profile_dir_for(cls, account):
+        """
+        每个账号使用独立的浏览器缓存目录，多个账号才能同时打开各自的持久化 context。
+        """
+        root = Path(cls.profile_root) if cls.profile_root else Path("userdata") / cls.platform
+        key = account.id if account.id is not None else account.username
+        return root / str(key)
+
+    @staticmethod
+    def migrate_legacy_profile(profile_dir) -> bool:
+        """
+        旧版本中所有账号共用 profile_root 本身作为缓存目录。升级后第一个打开浏览器的账号接管这份登录状态
+        （把旧目录中的内容移入该账号的目录），其余账号需要重新登录一次。返回是否做了迁移。
+        """
+        profile_dir = Path(profile_dir)
+        root = profile_dir.parent
+        if profile_dir.exists() or not (root / "Local State").exists():
+            return False
+        # 整个平台目录只有一把锁：目录创建是原子的，同时打开的其他账号（或其他进程）只有一个能迁移
+        lock = root / LEGACY_MIGRATION_LOCK
+        try:
+            lock.mkdir()
+        except FileExistsError:
+            return False
+        try:
+            # 拿到锁之前可能已经有别的账号迁移完成
+            if profile_dir.exists() or not (root / "Local State").exists():
+                return False
+            staging = lock / "profile"
+            staging.mkdir()
+            for entry in list(root.iterdir()):
+                if entry == lock or entry.name.endswith(".migrating"):
+                    continue
+                # 已经拆分出来的账号目录
+                if entry.is_dir() and (entry.name.isdigit() or (entry / "Local State").exists()):
+                    continue
+                entry.rename(staging / entry.name)
+            staging.rename(profile_dir)
+            return True
+        finally:
+            # 只删除空的锁目录：迁移中途出错时，已移动的文件留在锁目录中，不会丢失
+            with contextlib.suppress(OSError):
+                lock.rmdir()
+
+    @classmethod
+    def can_refresh_session(cls) -> bool:
+        """
+        refresh_session() 需要首页地址、login_indicator 选择器以及 goto / login_check 超时。
+        """
+        return bool(cls.home_url and cls.selectors.get("login_indicator")) and {"goto", "login_check"} <= cls.timeouts.keys()
+
+    def profile_dir(self):
+        return self.profile_dir_for(self.account)
+
+    def prepare_profile_dir(self):
+        """
+        返回要打开的缓存目录；需要时先接管旧版本的共用目录。
+        """
+        profile_dir = self.profile_dir()
+        if self.migrate_legacy_profile(profile_dir):
+            self.logger(f"已把旧版本共用的浏览器缓存迁移到 {profile_dir}")
+        return profile_dir
+
+    def selector(self, name):
+        return self.selectors[name]
+
+    def timeout(self, name):
+        return self.timeouts[name]
+
+    async def sleep(self, seconds):
+        """
+        固定等待；回放模式下响应来自本地 HAR，直接跳过。
+        """
+        if self.recorder and self.recorder.is_replay:
+            return
+        await asyncio.sleep(seconds)
+
+    def typing_delay(self, delay_ms):
+        """
+        模拟输入的按键间隔；回放模式下不需要模拟人工输入。
+        """
+        if self.recorder and self.recorder.is_replay:
+            return 0
+        return delay_ms
+
+    def report_progress(self, step, payload):
+        if self.progress_callback:
+            self.progress_callback({"step": step, **payload})
+
+    async def publish(self):
+        # 检查文件并读取视频头是同步 I/O，放到线程中执行，不阻塞同一进程中其他任务的浏览器
+        problems = await asyncio.to_thread(self.check_task, self.task_data)
+        if problems:
+            raise ValueError("; ".join(problems))
+        if self.playwright is not None:
+            # 复用调用方（工作进程）的 Playwright 驱动连接
+            await self.run_in_browser(self.playwright)
+            return
+        # Playwright 只在真正执行任务时才加载，注册表扫描插件时不需要它
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as p:
+            await self.run_in_browser(p)
+
+    async def run_in_browser(self, p):
+        for attempt in range(self.max_recycles + 1):
+            try:
+                await self.run_steps(p, allow_recycle=attempt < self.max_recycles)
+                return
+            except ContextRecycleRequested:
+                # 尚未执行最后一步（提交），重开浏览器后从头执行是安全的；登录状态保存在缓存目录中
+                self.logger("浏览器内存占用过高，关闭后重新打开并从头执行...")
+
+    def check_recycle(self, user_data_dir, allow_recycle):
+        if allow_recycle and self.watchdog and self.watchdog.should_recycle(user_data_dir):
+            raise ContextRecycleRequested()
+
+    async def refresh_session(self):
+        """
+        在无头浏览器中打开首页并检查登录状态，平台借此续期登录 Cookie；返回是否仍处于登录状态。
+
+        会占用账号的浏览器缓存目录，只能在没有发布任务使用该账号时调用。
+        """
+        if self.playwright is None:
+            from playwright.async_api import async_playwright
+
+            async with async_playwright() as p:
+                return await self._refresh_session(p)
+        return await self._refresh_session(self.playwright)
+
+    async def _refresh_session(self, p):
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        context = await p.chromium.launch_persistent_context(
+            user_data_dir=str(self.prepare_profile_dir()), headless=True
+        )
+        try:
+            page = context.pages[0] if context.pages else await context.new_page()
+            await page.goto(self.home_url, timeout=self.timeout("goto"))
+            await page.wait_for_selector(self.selector("login_indicator"), timeout=self.timeout("login_check"))
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        finally:
+            try:
+                await asyncio.wait_for(context.close(), timeout=self.close_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def launch_options(self):
+        return {
+            "headless": False,
+            "args": list(self.launch_args),
+        }
+
+    async def run_steps(self, p, allow_recycle=False):
+        launch_options = self.launch_options()
+        if self.recorder and self.recorder.is_replay:
+            user_data_dir = self.recorder.user_data_dir(self.profile_dir())
+        else:
+            user_data_dir = self.prepare_profile_dir()
+        if self.recorder:
+            launch_options.update(self.recorder.launch_options())
+
+        # ✅ 使用 launch_persistent_context，并用 user_data_dir 参数，而不是 args 传 --user-data-dir
+        context = await p.chromium.launch_persistent_context(
+            user_data_dir=str(user_data_dir),
+            **launch_options,
+        )
+        if self.recorder:
+            await self.recorder.attach(context)
+
+        page = context.pages[0] if context.pages else await context.new_page()
+        if self.diagnostics:
+            self.diagnostics.attach(context, page)
+        # 之后对 page 及其 locator 的每次 await 都计入驱动往返次数
+        page = self.round_trips.wrap(page)
+        self.dom = PageHelper(page, self.platform)
+
+        error = None
+        try:
+            for i, name in enumerate(self.steps):
+                if i > 0:
+                    self.check_recycle(user_data_dir, allow_recycle)
+                await self.run_step(name, page)
+            self.logger("发布成功！")
+        except ContextRecycleRequested:
+            raise
+        except asyncio.CancelledError:
+            self.logger("任务已取消，正在关闭浏览器...")
+            raise
+        except Exception as e:
+            error = e
+            self.logger(f"发生错误: {e}")
+            if self.diagnostics:
+                # 截图与 trace 必须在关闭浏览器之前取得，压缩写入放到关闭之后
+                await self.diagnostics.capture(unwrap(page))
+            raise
+        finally:
+            try:
+                await asyncio.wait_for(context.close(), timeout=self.close_timeout)
+            except asyncio.TimeoutError:
+                self.logger("关闭浏览器超时。")
+            if error is not None and self.diagnostics:
+                path = await self.diagnostics.save(f"{type(error).__name__}: {error}")
+                self.logger(f"诊断信息已保存到 {path}" if path else "保存诊断信息失败。")
+            if self.step_timings:
+                self.logger("步骤耗时: " + ", ".join(f"{k} {v:.1f}s" for k, v in self.step_timings.items()))
+            self.logger(
+                f"浏览器往返次数: {self.round_trips.count} ("
+                + ", ".join(f"{k} {v}" for k, v in self.step_round_trips.items()) + ")"
+            )
+            self.logger("任务结束。")
+
+    async def run_step(self, name, page):
+        """
+        执行一个步骤并计时；失败时按 step_retries 的配置退避重试。
+        """
+        step = getattr(self, name)
+        attempts = self.step_retries.get(name, 0) + 1
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            round_trips = self.round_trips.count
+            await self.trace_step(name)
+            try:
+                await step(page)
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                wait = self.retry_backoff * attempt
+                self.logger(f"步骤 {name} 第 {attempt} 次失败: {e}，{wait}s 后重试...")
+                await self.sleep(wait)
+                continue
+            await self.trace_step()
+            self.step_timings[name] = time.perf_counter() - started
+            self.step_round_trips[name] = self.round_trips.count - round_trips
+            return
+
+    async def trace_step(self, name=None):
+        """
+        开始（传入 name）或丢弃当前步骤的 trace 分段。trace 只是诊断手段：出错时记日志并停止录制，
+        不让步骤失败，也不触发重试。
+        """
+        if not self.diagnostics:
+            return
+        try:
+            if name is None:
+                await self.diagnostics.end_step()
+            else:
+                await self.diagnostics.start_step(name)
+        except Exception as e:
+            self.logger(f"诊断 trace 出错，本任务停止录制: {e}")
+            self.diagnostics.stop_trace(e)
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import shutil
+import time
+import zipfile
+from collections import deque
+from pathlib import Path
+
+
+DIAGNOSTICS_ROOT = "diagnostics"
+ARCHIVE_NAME = "failure.zip"
+TRACE_NAME = "trace.zip"
+
+# 单条事件文本的最大长度，避免页面刷屏的 console 输出占满内存
+MAX_MESSAGE_LENGTH = 500
+
+
+class FailureDiagnostics:
+    """
+    任务失败时的现场诊断，成功的任务不写任何文件。
+
+    - 事件缓冲：发布日志、步骤边界，以及页面的 console / pageerror / 失败请求 / 导航，追加到固定长度的
+      环形缓冲（只在内存中追加，开销可以忽略）；
+    - 滚动 trace（可选，trace=True）：每个步骤录制一个 Playwright trace 分段，步骤成功后丢弃，失败时
+      只导出出错步骤的分段（含 DOM 快照与截图，用 `playwright show-trace` 打开）。
+
+    失败时截图与 trace 在关闭浏览器之前收集（capture），事件与截图的压缩写入在线程中完成（save），
+    统一保存到 <root>/<job_key>/；根目录总大小超过 max_total_mb 时从最旧的任务目录开始删除。
+    """
+
+    def __init__(self, job_key, root=DIAGNOSTICS_ROOT, trace=False, max_events=300, max_total_mb=500):
+        self.job_key = job_key
+        self.root = Path(root)
+        self.trace = trace
+        self.max_total_bytes = max_total_mb * 1024 * 1024
+        self.events = deque(maxlen=max_events)
+        self.context = None
+        self.screenshot = None
+        self.saved_path = None  # 保存成功后的任务目录
+        self._trace_started = False
+        self._recording_chunk = False
+
+    @property
+    def job_dir(self):
+        return self.root / self.job_key
+
+    def record(self, kind, message):
+        self.events.append((time.time(), kind, str(message)[:MAX_MESSAGE_LENGTH]))
+
+    def wrap_logger(self, logger):
+        """
+        返回同时把日志写入事件缓冲的 logger。
+        """
+        def log(message):
+            self.record("log", message)
+            logger(message)
+        return log
+
+    def attach(self, context, page):
+        """
+        浏览器打开后调用（传入未包装的 page）；因内存超限重开浏览器时需要重新调用。
+        """
+        self.context = context
+        self._trace_started = False
+        self._recording_chunk = False
+        page.on("console", lambda message: self.record(f"console.{message.type}", message.text))
+        page.on("pageerror", lambda error: self.record("pageerror", error))
+        page.on("requestfailed", self._on_request_failed)
+        page.on("framenavigated", self._on_frame_navigated)
+
+    def _on_request_failed(self, request):
+        self.record("requestfailed", f"{request.method} {request.url} {request.failure}")
+
+    def _on_frame_navigated(self, frame):
+        if frame.parent_frame is None:
+            self.record("navigated", frame.url)
+
+    async def start_step(self, name):
+        self.record("step", name)
+        if not self.trace:
+            return
+        # 重试同一步骤时，上一次失败的分段直接丢弃
+        await self.end_step()
+        if not self._trace_started:
+            await self.context.tracing.start(title=name, screenshots=True, snapshots=True)
+            self._trace_started = True
+        else:
+            await self.context.tracing.start_chunk(title=name)
+        self._recording_chunk = True
+
+    async def end_step(self):
+        """
+        丢弃当前步骤的 trace 分段（不写文件）。
+        """
+        if self._recording_chunk:
+            self._recording_chunk = False
+            await self.context.tracing.stop_chunk()
+
+    def stop_trace(self, reason):
+        """
+        录制 trace 出错后调用：本任务不再录制，失败时仍保存事件与截图。
+        """
+        self.trace = False
+        self._recording_chunk = False
+        self.record("diagnostics", f"trace 已停止: {reason}")
+
+    async def capture(self, page):
+        """
+        失败后、关闭浏览器之前调用：截图并导出出错步骤的 trace 分段。
+        """
+        try:
+            self.screenshot = await page.screenshot(timeout=5000)
+        except Exception as e:
+            self.record("diagnostics", f"截图失败: {e}")
+        if self._recording_chunk:
+            self._recording_chunk = False
+            try:
+                self.job_dir.mkdir(parents=True, exist_ok=True)
+                await self.context.tracing.stop_chunk(path=self.job_dir / TRACE_NAME)
+            except Exception as e:
+                self.record("diagnostics", f"导出 trace 失败: {e}")
+
+    async def save(self, error) -> str | None:
+        """
+        把事件与截图压缩写入任务目录并执行保留策略，返回目录路径；写入失败时返回 None。
+        """
+        try:
+            await asyncio.to_thread(self._write, error)
+        except OSError:
+            return None
+        self.saved_path = str(self.job_dir)
+        return self.saved_path
+
+    def _write(self, error):
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        events = [
+            {"time": timestamp, "type": kind, "message": message} for timestamp, kind, message in self.events
+        ]
+        with zipfile.ZipFile(self.job_dir / ARCHIVE_NAME, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("error.txt", error)
+            archive.writestr("events.json", json.dumps(events, ensure_ascii=False, indent=1))
+            if self.screenshot is not None:
+                # PNG 本身已压缩，直接存储
+                archive.writestr("screenshot.png", self.screenshot, compress_type=zipfile.ZIP_STORED)
+        prune_diagnostics(self.root, self.max_total_bytes, keep=self.job_key)
+
+
+def prune_diagnostics(root, max_total_bytes, keep=None):
+    """
+    保留策略：根目录下各任务目录的总大小超过 max_total_bytes 时，按修改时间从旧到新删除（keep 除外）。
+    """
+    root = Path(root)
+    if not root.is_dir():
+        return
+    entries = []
+    for job_dir in root.iterdir():
+        if not job_dir.is_dir():
+            continue
+        try:
+            size = sum(f.stat().st_size for f in job_dir.rglob("*") if f.is_file())
+            entries.append((job_dir.stat().st_mtime, job_dir, size))
+        except OSError:
+            # 其他进程正在删除该目录
+            continue
+    total = sum(size for _, _, size in entries)
+    for _, job_dir, size in sorted(entries):
+        if total <= max_total_bytes:
+            break
+        if job_dir.name == keep:
+            continue
+        shutil.rmtree(job_dir, ignore_errors=True)
+        total -= size
@@ -0,0 +1,81 @@
+import os
+import struct
+
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi")
+
+# MP4/MOV 中可能包含 mvhd 的容器 box
+_CONTAINER_BOXES = {b"moov"}
+
+
+def _iter_boxes(f, start, end):
+    """
+    遍历 ISO BMFF (MP4/MOV) 在 [start, end) 范围内的 box，产生 (类型, 内容起点, box 终点)。
+    """
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        content = offset + 8
+        if size == 1:  # 64 位长度
+            size = struct.unpack(">Q", f.read(8))[0]
+            content += 8
+        elif size == 0:  # 延伸到文件末尾
+            size = end - offset
+        if size < content - offset:
+            return
+        yield box_type, content, offset + size
+        offset += size
+
+
+def _mp4_duration(f, file_size):
+    for box_type, content, box_end in _iter_boxes(f, 0, file_size):
+        if box_type not in _CONTAINER_BOXES:
+            continue
+        for child_type, child_content, _ in _iter_boxes(f, content, box_end):
+            if child_type != b"mvhd":
+                continue
+            f.seek(child_content)
+            version = f.read(4)[0]
+            if version == 1:
+                _, _, timescale, duration = struct.unpack(">QQIQ", f.read(28))
+            else:
+                _, _, timescale, duration = struct.unpack(">IIII", f.read(16))
+            return duration / timescale if timescale else None
+    return None
+
+
+def _avi_duration(f):
+    # RIFF 'AVI ' -> LIST 'hdrl' -> 'avih'（主头：每帧微秒数与总帧数）
+    f.seek(12)
+    header = f.read(12)
+    if len(header) < 12 or header[0:4] != b"LIST" or header[8:12] != b"hdrl":
+        return None
+    chunk = f.read(8)
+    if len(chunk) < 8 or chunk[0:4] != b"avih":
+        return None
+    micro_sec_per_frame, _, _, _, total_frames = struct.unpack("<IIIII", f.read(20))
+    return micro_sec_per_frame * total_frames / 1_000_000 or None
+
+
+def probe_video(path) -> dict:
+    """
+    不依赖 ffmpeg，直接读取容器头部得到视频的大小（字节）与时长（秒）。
+
+    支持 MP4/MOV（mvhd）与 AVI（avih）；无法识别时 duration 为 None。
+    """
+    size = os.path.getsize(path)
+    duration = None
+    with open(path, "rb") as f:
+        head = f.read(12)
+        try:
+            if head[0:4] == b"RIFF" and head[8:12] == b"AVI ":
+                duration = _avi_duration(f)
+            elif head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip"):
+                duration = _mp4_duration(f, size)
+        except (struct.error, IndexError):
+            duration = None
+    return {"size": size, "duration": duration}
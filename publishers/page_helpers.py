@@ -0,0 +1,238 @@
+import asyncio
+import inspect
+import time
+from urllib.parse import urlsplit
+
+
+class Target:
+    """
+    可以在页面内直接解析的元素：CSS 选择器 + 可选的文本过滤（与 Playwright 的 has_text 含义一致）。
+
+    Playwright 专用语法（text=、:has-text() 等）无法在页面内用 querySelectorAll 解析，
+    这类选择器继续以字符串形式写在 selectors 中。
+    """
+
+    def __init__(self, css, text=None, enabled=False, in_viewport=False):
+        self.css = css
+        self.text = text
+        self.enabled = enabled  # 解析时是否还要求元素可用（未 disabled）
+        # 是否还要求元素左上角在可视区域内；默认与 Playwright 的可见性一致（只看尺寸与样式）
+        self.in_viewport = in_viewport
+
+    def __bool__(self):
+        return bool(self.css)
+
+    def __repr__(self):
+        return f"Target({self.css!r}, text={self.text!r})"
+
+    def locator(self, page):
+        if self.text:
+            return page.locator(self.css, has_text=self.text)
+        return page.locator(self.css)
+
+    def to_js(self):
+        return {"css": self.css, "text": self.text, "enabled": self.enabled, "in_viewport": self.in_viewport}
+
+
+# 在页面内轮询，直到所有目标都满足状态或超时；一次 evaluate 只产生一次驱动往返
+_RESOLVE_SCRIPT = """
+async ({targets, state, timeout}) => {
+    const normalize = s => (s || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const isVisible = (el, inViewport) => {
+        const rect = el.getBoundingClientRect();
+        const style = getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0
+            && style.visibility !== 'hidden' && style.display !== 'none'
+            && (!inViewport || (rect.x >= 0 && rect.y >= 0));
+    };
+    const isEnabled = el => !el.disabled && el.getAttribute('aria-disabled') !== 'true';
+    const pageVersion = () => {
+        const assets = [...document.scripts].map(s => s.src).filter(Boolean).sort().join('|');
+        let hash = 5381;
+        for (let i = 0; i < assets.length; i++) hash = ((hash << 5) + hash + assets.charCodeAt(i)) | 0;
+        return (hash >>> 0).toString(16);
+    };
+    const resolveOne = target => {
+        const text = normalize(target.text);
+        const matches = [...document.querySelectorAll(target.css)]
+            .filter(el => !text || normalize(el.textContent).includes(text));
+        for (let i = 0; i < matches.length; i++) {
+            const el = matches[i];
+            if (state === 'attached' || isVisible(el, target.in_viewport)) {
+                return {
+                    index: i, count: matches.length, enabled: isEnabled(el),
+                    text: (el.textContent || '').trim().slice(0, 200),
+                };
+            }
+        }
+        return null;
+    };
+    const deadline = performance.now() + timeout;
+    while (true) {
+        const resolved = {};
+        let done = true;
+        for (const [name, target] of Object.entries(targets)) {
+            const found = resolveOne(target);
+            resolved[name] = found;
+            if (!found || (target.enabled && !found.enabled)) done = false;
+        }
+        if (done || performance.now() >= deadline) {
+            return {done, resolved, version: pageVersion()};
+        }
+        await new Promise(r => setTimeout(r, 100));
+    }
+}
+"""
+
+# 轮询期间页面跳转会销毁 evaluate 所在的执行上下文，这类错误在剩余时间内重试
+_NAVIGATION_ERRORS = ("Execution context was destroyed", "Cannot find context with specified id")
+
+
+def _is_navigation_error(error):
+    return any(message in str(error) for message in _NAVIGATION_ERRORS)
+
+
+# (platform, 页面路径, 页面版本, 目标名) -> 上次成功使用的匹配序号；同一进程内的所有任务共享
+_resolution_cache = {}
+# (platform, 页面路径) -> 最近一次看到的页面版本（由页面脚本资源计算）
+_page_versions = {}
+
+
+class RoundTripCounter:
+    """
+    统计通过 Playwright 驱动的往返次数：包装 page 后，对它及其派生对象（locator、keyboard 等）
+    的每一次 await 调用计数一次。
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def wrap(self, value):
+        if inspect.isawaitable(value):
+            return self._counted(value)
+        if type(value).__module__.startswith("playwright."):
+            return _CountingProxy(value, self)
+        return value
+
+    async def _counted(self, awaitable):
+        self.count += 1
+        return self.wrap(await awaitable)
+
+
+def unwrap(value):
+    """
+    取出被计数代理包装的原始 Playwright 对象（传给 expect() 等需要原始对象的 API 时使用）。
+    """
+    return value._target if isinstance(value, _CountingProxy) else value
+
+
+class _CountingProxy:
+    __slots__ = ("_target", "_counter")
+
+    def __init__(self, target, counter):
+        self._target = target
+        self._counter = counter
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return self._counter.wrap(value)
+
+        def call(*args, **kwargs):
+            args = [unwrap(a) for a in args]
+            kwargs = {k: unwrap(v) for k, v in kwargs.items()}
+            return self._counter.wrap(value(*args, **kwargs))
+        return call
+
+    async def __aenter__(self):
+        self._counter.count += 1
+        return self._counter.wrap(await self._target.__aenter__())
+
+    async def __aexit__(self, *exc_info):
+        return await self._target.__aexit__(*exc_info)
+
+    def __repr__(self):
+        return f"Counted({self._target!r})"
+
+
+class PageHelper:
+    """
+    把多次 locator 等待/检查合并为一次页面内 evaluate，并缓存成功的解析结果。
+    """
+
+    def __init__(self, page, platform):
+        self.page = page
+        self.platform = platform
+
+    def _path(self):
+        return urlsplit(self.page.url).path
+
+    def _cache_key(self, name):
+        version = _page_versions.get((self.platform, self._path()))
+        if version is None:
+            return None
+        return self.platform, self._path(), version, name
+
+    async def _evaluate(self, targets, state, timeout):
+        js_targets = {name: t.to_js() for name, t in targets.items()}
+        deadline = time.monotonic() + timeout / 1000
+        while True:
+            remaining = max(0, int((deadline - time.monotonic()) * 1000))
+            try:
+                return await self.page.evaluate(
+                    _RESOLVE_SCRIPT, {"targets": js_targets, "state": state, "timeout": remaining}
+                )
+            except Exception as e:
+                if not _is_navigation_error(e) or time.monotonic() >= deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    async def resolve(self, targets, state="visible", timeout=30000):
+        """
+        等待 targets（名字 -> Target）全部出现（且满足 enabled 要求），返回名字 -> {index, count, enabled, text}。
+        """
+        result = await self._evaluate(targets, state, timeout)
+        _page_versions[(self.platform, self._path())] = result["version"]
+        if not result["done"]:
+            missing = [name for name, found in result["resolved"].items() if not found]
+            raise TimeoutError(f"等待元素超时 ({timeout}ms): {', '.join(missing) or ', '.join(targets)}")
+        for name, found in result["resolved"].items():
+            _resolution_cache[self._cache_key(name)] = found["index"]
+        return result["resolved"]
+
+    async def snapshot(self, targets, state="visible"):
+        """
+        不等待，一次读取 targets 的当前状态：名字 -> {index, count, enabled, text}，未找到为 None。适合轮询。
+        """
+        try:
+            result = await self.page.evaluate(
+                _RESOLVE_SCRIPT,
+                {"targets": {name: t.to_js() for name, t in targets.items()}, "state": state, "timeout": 0},
+            )
+        except Exception as e:
+            # 页面正在跳转：视为暂时都未找到，由调用方下一轮再读
+            if not _is_navigation_error(e):
+                raise
+            return {name: None for name in targets}
+        return result["resolved"]
+
+    def locator(self, name, target, index=None):
+        if index is None:
+            index = _resolution_cache.get(self._cache_key(name), 0)
+        return target.locator(self.page).nth(index)
+
+    async def click(self, name, target, timeout=30000, cached_timeout=2000):
+        """
+        点击第一个可见的匹配元素。页面版本未变时直接使用缓存的序号（一次往返），失败再重新解析。
+        """
+        key = self._cache_key(name)
+        index = _resolution_cache.get(key) if key else None
+        if index is not None:
+            try:
+                await target.locator(self.page).nth(index).click(timeout=cached_timeout)
+                return
+            except Exception:
+                _resolution_cache.pop(key, None)
+
+        resolved = await self.resolve({name: target}, timeout=timeout)
+        await target.locator(self.page).nth(resolved[name]["index"]).click()
@@ -0,0 +1,83 @@
+import importlib
+import inspect
+import logging
+import os
+import pkgutil
+
+import publishers
+from publishers.base import BasePublisher
+
+
+logger = logging.getLogger(__name__)
+
+# 额外加载的插件模块（逗号分隔的模块名）；工作进程继承环境变量，因此会加载同样的插件
+EXTRA_MODULES_ENV = "PUBX_PUBLISHER_MODULES"
+
+_publishers = None  # 规范化的平台名/别名 -> 发布器类
+_problems = {}  # 模块名 -> 校验失败的原因
+
+
+def normalize(platform) -> str:
+    return (platform or "").strip().lower()
+
+
+def load():
+    """
+    扫描 publishers 包中所有 *_publisher 模块（以及 PUBX_PUBLISHER_MODULES 指定的模块）
+    并注册其中的 BasePublisher 子类；每个进程只执行一次。
+
+    声明不完整的插件不会被注册，原因记录在 problems() 中。
+    """
+    global _publishers
+    if _publishers is not None:
+        return _publishers
+
+    module_names = [
+        f"publishers.{module_info.name}"
+        for module_info in pkgutil.iter_modules(publishers.__path__)
+        if module_info.name.endswith("_publisher")
+    ]
+    module_names += [name.strip() for name in os.environ.get(EXTRA_MODULES_ENV, "").split(",") if name.strip()]
+
+    found = {}
+    for module_name in module_names:
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            _problems[module_name] = [f"导入失败: {e}"]
+            logger.warning("发布插件 %s 导入失败: %s", module_name, e)
+            continue
+
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if not issubclass(cls, BasePublisher) or cls is BasePublisher or cls.__module__ != module_name:
+                continue
+            problems = cls.validate()
+            if problems:
+                _problems[f"{module_name}.{cls.__name__}"] = problems
+                logger.warning("发布插件 %s 校验失败: %s", cls.__name__, "; ".join(problems))
+                continue
+            for name in (cls.platform, *cls.aliases):
+                found[normalize(name)] = cls
+
+    _publishers = found
+    return _publishers
+
+
+def find(platform) -> type[BasePublisher] | None:
+    return load().get(normalize(platform))
+
+
+def get(platform) -> type[BasePublisher]:
+    publisher_cls = find(platform)
+    if publisher_cls is None:
+        raise ValueError(f"不支持的平台: {platform}")
+    return publisher_cls
+
+
+def platforms() -> list[str]:
+    return sorted({cls.platform for cls in load().values()})
+
+
+def problems() -> dict[str, list[str]]:
+    load()
+    return dict(_problems)
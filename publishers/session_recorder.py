@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from publishers import registry
+
+
+HAR_FILE_NAME = "session.har.zip"
+META_FILE_NAME = "session.json"
+MEDIA_DIR_NAME = "media"
+
+
+class SessionRecorder:
+    """
+    录制 / 回放一次发布会话的网络流量。
+
+    - record: 正常访问真实平台，同时把所有请求/响应写入 HAR（zip 格式，内容单独存放）。
+    - replay: 通过 Playwright 路由从 HAR 返回响应，不访问网络，跳过固定等待，并使用无头模式。
+    """
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, mode, session_dir, profile_dir=None):
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"不支持的会话模式: {mode}")
+        self.mode = mode
+        self.session_dir = Path(session_dir)
+        # 回放时使用独立的临时浏览器目录，避免真实登录缓存干扰回放结果
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+
+    @property
+    def is_replay(self):
+        return self.mode == self.REPLAY
+
+    @property
+    def har_path(self):
+        return self.session_dir / HAR_FILE_NAME
+
+    def user_data_dir(self, default_dir):
+        if self.is_replay and self.profile_dir is not None:
+            return self.profile_dir
+        return default_dir
+
+    def launch_options(self):
+        """
+        返回需要合并进 launch_persistent_context 的参数。
+        """
+        if self.is_replay:
+            return {"headless": True}
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        return {
+            "record_har_path": str(self.har_path),
+            "record_har_content": "attach",
+            "record_har_mode": "full",
+        }
+
+    async def attach(self, context):
+        """
+        在 context 创建后调用；回放模式下所有请求都由 HAR 提供，未命中的请求直接中止。
+        """
+        if self.is_replay:
+            await context.route_from_har(self.har_path, not_found="abort")
+
+    def save_metadata(self, platform, account, task_data):
+        """
+        保存回放所需的账号与任务数据，并把媒体文件复制到会话目录，使录制结果可以单独拷贝/归档。
+        """
+        media_dir = self.session_dir / MEDIA_DIR_NAME
+        media_dir.mkdir(parents=True, exist_ok=True)
+        media_names = []
+        for path in task_data.get("media_paths", []):
+            source = Path(path)
+            shutil.copy2(source, media_dir / source.name)
+            media_names.append(source.name)
+
+        meta = {
+            "platform": platform,
+            "account": {
+                "id": getattr(account, "id", None),
+                "platform": getattr(account, "platform", platform),
+                "username": account.username,
+                "remark": getattr(account, "remark", ""),
+            },
+            "task_data": {**task_data, "media_paths": media_names},
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with open(self.session_dir / META_FILE_NAME, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def load_metadata(self):
+        with open(self.session_dir / META_FILE_NAME, encoding="utf-8") as f:
+            meta = json.load(f)
+        media_dir = self.session_dir / MEDIA_DIR_NAME
+        task_data = meta["task_data"]
+        task_data["media_paths"] = [str(media_dir / name) for name in task_data.get("media_paths", [])]
+        account = SimpleNamespace(password="", **meta["account"])
+        return meta["platform"], account, task_data
+
+
+def find_sessions(root_dir):
+    """
+    查找 root_dir 下所有录制好的会话目录（包含 HAR 与元数据）。
+    """
+    root = Path(root_dir)
+    return sorted(
+        meta.parent for meta in root.rglob(META_FILE_NAME)
+        if (meta.parent / HAR_FILE_NAME).exists()
+    )
+
+
+async def record_session(session_dir, platform, account, task_data, logger_callback):
+    """
+    对真实平台执行一次发布并录制全部网络流量。
+    """
+    recorder = SessionRecorder(SessionRecorder.RECORD, session_dir)
+    publisher_cls = registry.get(platform)
+    recorder.save_metadata(publisher_cls.platform, account, task_data)
+    await publisher_cls(account, task_data, logger_callback, recorder=recorder).publish()
+
+
+async def replay_session(session_dir, logger_callback):
+    """
+    离线回放一个录制好的会话，返回 (是否成功, 耗时秒数, 错误信息)。
+
+    录制文件缺失或损坏、平台插件不存在时同样返回失败，不影响同一轮中其他会话的回放。
+    """
+    with tempfile.TemporaryDirectory(prefix="pubx-replay-") as profile_dir:
+        recorder = SessionRecorder(SessionRecorder.REPLAY, session_dir, profile_dir=profile_dir)
+        started = time.perf_counter()
+        try:
+            if not recorder.har_path.exists():
+                raise FileNotFoundError(f"录制文件不存在: {recorder.har_path}")
+            platform, account, task_data = recorder.load_metadata()
+            publisher_cls = registry.get(platform)
+            await publisher_cls(account, task_data, logger_callback, recorder=recorder).publish()
+            return True, time.perf_counter() - started, ""
+        except Exception as e:
+            return False, time.perf_counter() - started, str(e)
+
+
+async def replay_all(root_dir, logger_callback, concurrency=4):
+    """
+    并发回放 root_dir 下的全部会话，作为发布脚本的离线回归测试。
+    """
+    sessions = find_sessions(root_dir)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(session_dir):
+        async with semaphore:
+            def session_logger(message):
+                logger_callback(f"[{session_dir.name}] {message}")
+            return session_dir, await replay_session(session_dir, session_logger)
+
+    return await asyncio.gather(*(run_one(s) for s in sessions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制 / 回放发布会话")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="录制一次真实的发布会话")
+    record_parser.add_argument("session_dir")
+    record_parser.add_argument("--platform", default="xiaohongshu")
+    record_parser.add_argument("--username", required=True)
+    record_parser.add_argument("--title", required=True)
+    record_parser.add_argument("--description", required=True)
+    record_parser.add_argument("--post-type", choices=["image", "video"], default="image")
+    record_parser.add_argument("--media", nargs="+", required=True)
+
+    replay_parser = subparsers.add_parser("replay", help="离线回放录制好的会话")
+    replay_parser.add_argument("root_dir")
+    replay_parser.add_argument("--concurrency", type=int, default=4)
+    replay_parser.add_argument("--verbose", action="store_true")
+
+    args = parser.parse_args()
+
+    def console_logger(message):
+        print(f"[LOG] {message}")
+
+    if args.command == "record":
+        account = SimpleNamespace(id=None, platform=args.platform, username=args.username, password="", remark="")
+        task_data = {
+            "title": args.title,
+            "post_type": args.post_type,
+            "media_paths": args.media,
+            "description": args.description,
+        }
+        asyncio.run(record_session(args.session_dir, args.platform, account, task_data, console_logger))
+        print(f"已录制会话: {args.session_dir}")
+        return
+
+    started = time.perf_counter()
+    results = asyncio.run(replay_all(
+        args.root_dir,
+        console_logger if args.verbose else (lambda message: None),
+        concurrency=args.concurrency,
+    ))
+    failed = 0
+    for session_dir, (success, elapsed, error) in results:
+        failed += 0 if success else 1
+        print(f"{'PASS' if success else 'FAIL'} {session_dir} ({elapsed:.2f}s) {error}")
+    print(f"共 {len(results)} 个会话，失败 {failed} 个，总耗时 {time.perf_counter() - started:.2f}s")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import deque
+from fnmatch import fnmatch
+from urllib.parse import urlsplit
+
+
+class UploadStalled(Exception):
+    """
+    上传进度在 stall_timeout 秒内没有任何推进。
+    """
+
+
+class UploadProgress:
+    """
+    跟踪一次文件上传的进度与速率。
+
+    进度来自两个来源，取较大者：
+    - 网络：发往 upload_hosts（主机名，支持 * 通配）的上传请求完成时，累加其请求体大小（分片上传时按分片推进）；
+    - 页面：发布脚本轮询页面上的百分比，通过 update(percent=...) 传入。
+
+    只要还有上传请求在进行中就不算停滞：单个大请求只有在完成时才能得到字节数，期间页面上也可能读不到百分比。
+    """
+
+    def __init__(self, total, on_progress=None, stall_timeout=60.0, upload_hosts=(), rate_window=5.0):
+        self.total = total
+        self.on_progress = on_progress  # on_progress(payload dict)
+        self.stall_timeout = stall_timeout
+        self.upload_hosts = upload_hosts
+        self.rate_window = rate_window
+        self.network_bytes = 0
+        self.sent = 0
+        self.started = time.monotonic()
+        self.last_advance = self.started
+        self._samples = deque([(self.started, 0)])
+        self._pending = set()
+        self._in_flight = set()  # 已发出、尚未结束的上传请求
+
+    def is_upload(self, request) -> bool:
+        if request.method not in ("POST", "PUT"):
+            return False
+        host = urlsplit(request.url).hostname or ""
+        return any(fnmatch(host, pattern) for pattern in self.upload_hosts)
+
+    def attach(self, page):
+        page.on("request", self.on_request)
+        page.on("requestfinished", self.on_request_finished)
+        page.on("requestfailed", self.on_request_failed)
+
+    def detach(self, page):
+        page.remove_listener("request", self.on_request)
+        page.remove_listener("requestfinished", self.on_request_finished)
+        page.remove_listener("requestfailed", self.on_request_failed)
+
+    def on_request(self, request):
+        if self.is_upload(request):
+            self._in_flight.add(request)
+            self.last_advance = time.monotonic()
+
+    def on_request_failed(self, request):
+        self._in_flight.discard(request)
+
+    def on_request_finished(self, request):
+        """
+        page.on("requestfinished") 的回调；请求体大小需要再查询一次驱动，放到后台任务中完成。
+        """
+        if not self.is_upload(request):
+            return
+        self._in_flight.discard(request)
+        self.last_advance = time.monotonic()
+        task = asyncio.create_task(self._add_request(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _add_request(self, request):
+        sizes = await request.sizes()
+        self.network_bytes += sizes["requestBodySize"]
+        self.update()
+
+    @property
+    def rate(self) -> float:
+        """
+        最近 rate_window 秒内的平均速率（字节/秒）。
+        """
+        (first_time, first_sent), (last_time, last_sent) = self._samples[0], self._samples[-1]
+        elapsed = time.monotonic() - first_time
+        return (last_sent - first_sent) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def average_rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def update(self, percent=None, done=False):
+        now = time.monotonic()
+        sent = self.network_bytes
+        if percent is not None:
+            sent = max(sent, int(self.total * percent / 100))
+        if done:
+            sent = self.total
+        sent = min(sent, self.total)
+        if sent > self.sent:
+            self.sent = sent
+            self.last_advance = now
+        self._samples.append((now, self.sent))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.rate_window:
+            self._samples.popleft()
+        if self.on_progress:
+            self.on_progress({"sent": self.sent, "total": self.total, "rate": self.rate})
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def check_stall(self):
+        if self._in_flight:
+            return
+        stalled_for = time.monotonic() - self.last_advance
+        if stalled_for > self.stall_timeout:
+            raise UploadStalled(
+                f"上传已停滞 {stalled_for:.0f}s（{self.sent}/{self.total} 字节）"
+            )
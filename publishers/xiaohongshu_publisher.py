@@ -1,74 +1,92 @@
 import asyncio
-from playwright.async_api import async_playwright, expect
 import logging
-from pathlib import Path
-from retrying import retry
+import os
+import re
+from publishers.base import BasePublisher
+from publishers.page_helpers import Target
+from publishers.upload_progress import UploadProgress, UploadStalled
 # Configure logger
 # In a real app, you'd likely pass a logger object or use a more robust logging setup
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-class XiaohongshuPublisher:
-    def __init__(self, account, task_data, logger_callback):
-        self.account = account
-        self.task_data = task_data
-        self.logger = logger_callback  # A function to emit logs to the UI
-
-    async def publish(self):
-        # 建议把 user_data_dir 变成实例属性，便于复用/配置
-        user_data_dir = Path("userdata/xhs")  # 或者用 self.user_data_dir
-
-        async with async_playwright() as p:
-            # ✅ 使用 launch_persistent_context，并用 user_data_dir 参数，而不是 args 传 --user-data-dir
-            context = await p.chromium.launch_persistent_context(
-                user_data_dir=str(user_data_dir),
-                headless=False,
-                args=[
-                    "--start-maximized",
-                ],
-            )
-
-            page = context.pages[0] if context.pages else await context.new_page()
-
-            try:
-                await self.login(page)
-                await self.navigate_to_publish_page(page)
-                await self.fill_publish_form(page)
-                await self.submit(page)
-                self.logger("发布成功！")
-            except Exception as e:
-                self.logger(f"发生错误: {e}")
-                # 可选：在发生错误时截图
-                try:
-                    await page.screenshot(path=f"error_{self.account.username}.png")
-                except Exception as shot_err:
-                    self.logger(f"截图失败: {shot_err}")
-            finally:
-                await context.close()
-                self.logger("任务结束。")
+class XiaohongshuPublisher(BasePublisher):
+    platform = "xiaohongshu"
+    aliases = ("xhs", "小红书", "rednote")
+    display_name = "小红书"
+    home_url = "https://creator.xiaohongshu.com/"
+    # 创作中心的登录凭证
+    session_cookie_domain = "xiaohongshu.com"
+    session_cookies = ("galaxy_creator_session_id", "access-token-creator.xiaohongshu.com", "customer-sso-sid")
+
+    steps = ("login", "navigate_to_publish_page", "upload_media", "fill_publish_form", "submit")
+    # 登录检查失败时会等待人工登录，之后再检查一次
+    step_retries = {"login": 1}
+    # 沿用原有的缓存目录位置
+    profile_root = "userdata/xhs"
+
+    # 创作中心的视频限制
+    video_max_bytes = 20 * 1024 * 1024 * 1024
+    video_min_duration = 1
+    video_max_duration = 4 * 60 * 60
+    # 视频停滞后重新上传的次数（只重做上传，不重做前面的步骤）
+    upload_retries = 2
+    upload_poll_interval = 1.0
+    # 视频上传请求的主机名（创作中心把文件直传到 ROS 对象存储），用于按网络请求统计已上传字节数
+    upload_hosts = ("ros-upload*.xiaohongshu.com", "ros-upload*.xhscdn.com")
+
+    selectors = {
+        "login_indicator": 'text="发布笔记"',
+        "publish_entry": 'text="发布笔记"',
+        "video_tab": 'text="上传视频"',
+        # 页面上有多个同名 tab（部分在可视区域外），解析时只取第一个可见的
+        "image_tab": Target('.header-tabs .creator-tab', text="上传图文", in_viewport=True),
+        # <input class="upload-input" type="file">
+        "file_input": 'input.upload-input[type="file"]',
+        "image_preview": 'img',
+        # 视频上传中的进度文字（例如 "上传中 45%"）；上传完成后出现【重新上传】
+        "video_progress": Target('[class*="progress"]'),
+        "video_reupload": Target("button, span", text="重新上传"),
+        # <input class="d-text" placeholder="填写标题会有更多赞哦～">
+        "title_input": Target('input.d-text[type="text"][placeholder*="填写标题"]'),
+        # <div contenteditable="true" class="tiptap ProseMirror" ...>
+        "editor": Target('div.tiptap.ProseMirror[contenteditable="true"]'),
+        # <button class="... publishBtn" ...>发布</button>
+        "publish_button": Target("button.publishBtn", text="发布", enabled=True),
+    }
+    timeouts = {
+        "goto": 60000,
+        "login_check": 10000,
+        "video_tab": 60000,
+        "image_tab": 30000,
+        "upload_input": 30000,
+        "image_preview": 30000,
+        "upload_stall": 60000,
+        "form_field": 30000,
+        "publish_button": 30000,
+    }
 
-    @retry(stop_max_attempt_number=2, wait_exponential_multiplier=1000)
     async def login(self, page):
         """
         访问小红书网站并检查登录状态。
         """
         self.logger("正在访问小红书创作中心...")
         # 小红书的创作者平台 URL
-        await page.goto("https://creator.xiaohongshu.com/", timeout=60000)
+        await page.goto(self.home_url, timeout=self.timeout("goto"))
         
         # 浏览器缓存 (user_data_dir) 应能保持登录状态。
         # 此处可以添加检查，判断页面上是否存在“登录”按钮或用户头像。
         self.logger("检查登录状态...")
         # 示例检查逻辑:
         try:
-            await page.wait_for_selector('text="发布笔记"', timeout=10000)
+            await page.wait_for_selector(self.selector("login_indicator"), timeout=self.timeout("login_check"))
             self.logger("已检测到登录状态。")
         except Exception:
             self.logger("未登录，等待60s后重试。")
-            await asyncio.sleep(60)
-            raise Exception("...")
-        await asyncio.sleep(2) # 等待页面加载，观察登录状态
+            await self.sleep(60)
+            raise RuntimeError("未检测到登录状态。")
+        await self.sleep(2) # 等待页面加载，观察登录状态
 
     async def navigate_to_publish_page_video(self, page):
         """
@@ -76,41 +94,21 @@ class XiaohongshuPublisher:
         """
         self.logger("导航到发布视频页面...")
         await page.click(
-            'text="上传视频"', timeout=60000
+            self.selector("video_tab"), timeout=self.timeout("video_tab")
         )
-        await asyncio.sleep(1)
+        await self.sleep(1)
 
     async def navigate_to_publish_page_picture(self, page):
         try:
             self.logger("确保进入【上传图文】页面")
 
-            tabs = page.locator(
-                '.header-tabs .creator-tab',
-                has=page.locator('span.title', has_text='上传图文')
-            )
-
-            count = await tabs.count()
-            clicked = False
-
-            for i in range(count):
-                tab = tabs.nth(i)
-                box = await tab.bounding_box()
-                if box and box["x"] >= 0 and box["y"] >= 0:
-                    await tab.click()
-                    clicked = True
-                    break
-
-            if not clicked:
+            try:
+                # 在页面内一次找出可视区域内的 tab，而不是逐个读取 bounding_box
+                await self.dom.click("image_tab", self.selector("image_tab"), timeout=self.timeout("image_tab"))
+            except TimeoutError:
                 raise RuntimeError("未能点击可视区域内的【上传图文】Tab")
 
             self.logger("成功进入【上传图文】页面")
-
-            media_paths = self.task_data.get("media_paths", [])
-            self.logger(f"准备上传 {len(media_paths)} 个媒体文件...")
-            if not media_paths:
-                raise ValueError("媒体文件路径不能为空。")
-
-            await self.upload_images(page, media_paths)
         except Exception as e:
             self.logger(f"导航到发布图片页面失败: {e}")
             raise
@@ -121,10 +119,10 @@ class XiaohongshuPublisher:
             self.logger("等待图片上传控件加载...")
 
             file_input = page.locator(
-                'input.upload-input[type="file"]'
+                self.selector("file_input")
             )
 
-            await file_input.wait_for(state="attached", timeout=30000)
+            await file_input.wait_for(state="attached", timeout=self.timeout("upload_input"))
 
             self.logger(f"开始上传图片: {image_paths}")
 
@@ -132,22 +130,89 @@ class XiaohongshuPublisher:
 
             # 等待至少一张图片预览出现
             await page.wait_for_selector(
-                'img',
-                timeout=30000
+                self.selector("image_preview"),
+                timeout=self.timeout("image_preview")
             )
             self.logger("图片上传完成")
         except Exception as e:
             self.logger(f"图片上传失败: {e}")
             raise
 
+    async def upload_video(self, page, video_path):
+        """
+        上传视频并实时上报进度与速率；进度停滞超过 upload_stall 时重新上传，最多 upload_retries 次。
+        """
+        total = os.path.getsize(video_path)
+        for attempt in range(1, self.upload_retries + 2):
+            progress = UploadProgress(
+                total,
+                on_progress=lambda payload: self.report_progress("upload_media", payload),
+                stall_timeout=self.timeout("upload_stall") / 1000,
+                upload_hosts=self.upload_hosts,
+            )
+            progress.attach(page)
+            try:
+                file_input = page.locator(self.selector("file_input"))
+                if attempt == 1 or await file_input.count():
+                    await file_input.wait_for(state="attached", timeout=self.timeout("upload_input"))
+                    await file_input.set_input_files(video_path)
+                else:
+                    # 上传控件已被替换为视频预览，通过【重新上传】重新选择文件
+                    async with page.expect_file_chooser(timeout=self.timeout("upload_input")) as chooser_info:
+                        await self.dom.click("video_reupload", self.selector("video_reupload"),
+                                             timeout=self.timeout("upload_input"))
+                    chooser = await chooser_info.value
+                    await chooser.set_files(video_path)
+                self.logger(f"开始上传视频: {video_path}（{total / 1024 / 1024:.1f} MB）")
+                await self.wait_for_video_upload(progress)
+                self.logger(
+                    f"视频上传完成，用时 {progress.elapsed:.0f}s，平均 {progress.average_rate / 1024 / 1024:.2f} MB/s"
+                )
+                return
+            except UploadStalled as e:
+                if attempt > self.upload_retries:
+                    raise
+                self.logger(f"{e}，重新上传（第 {attempt} 次重试）...")
+            finally:
+                progress.detach(page)
+
+    async def wait_for_video_upload(self, progress):
+        targets = {name: self.selector(name) for name in ("video_progress", "video_reupload")}
+        while True:
+            # 每次轮询只有一次页面内查询
+            state = await self.dom.snapshot(targets)
+            if state["video_reupload"]:
+                progress.update(done=True)
+                return
+            percent = None
+            if state["video_progress"]:
+                match = re.search(r"(\d+(?:\.\d+)?)\s*%", state["video_progress"]["text"])
+                percent = float(match.group(1)) if match else None
+            progress.update(percent=percent)
+            progress.check_stall()
+            await asyncio.sleep(self.upload_poll_interval)
+
+    async def upload_media(self, page):
+        """
+        上传图片或视频；在独立的步骤中执行，便于单独计时与统计往返次数。
+        """
+        media_paths = self.task_data.get("media_paths", [])
+        self.logger(f"准备上传 {len(media_paths)} 个媒体文件...")
+        if not media_paths:
+            raise ValueError("媒体文件路径不能为空。")
+        if self.task_data.get("post_type", "image") == "video":
+            await self.upload_video(page, media_paths[0])
+        else:
+            await self.upload_images(page, media_paths)
+
     async def navigate_to_publish_page(self, page):
         """
         导航到发布笔记的页面。
         """
         self.logger("导航到发布页面...")
         # 通常登录后就在主页，可以直接点击“发布笔记”
-        await page.click('text="发布笔记"')
-        await asyncio.sleep(1)
+        await page.click(self.selector("publish_entry"))
+        await self.sleep(1)
         task_type = self.task_data.get("post_type", "image")
         if task_type == "video":
             await self.navigate_to_publish_page_video(page)
@@ -155,7 +220,7 @@ class XiaohongshuPublisher:
             await self.navigate_to_publish_page_picture(page)
         else:
             raise ValueError(f"不支持的任务类型: {task_type}")
-        await asyncio.sleep(3) # 等待页面跳转
+        await self.sleep(3) # 等待页面跳转
 
     async def fill_publish_form(self, page):
         """
@@ -171,21 +236,25 @@ class XiaohongshuPublisher:
         if not description:
             self.logger("⚠️ 正文为空，将继续发布（不推荐）。")
 
-        # 1) 标题：<input class="d-text" placeholder="填写标题会有更多赞哦～">
-        title_input = page.locator('input.d-text[type="text"][placeholder*="填写标题"]')
-        await title_input.wait_for(state="visible", timeout=30000)
+        # 标题与正文编辑器在同一次页面内查询中等待
+        resolved = await self.dom.resolve(
+            {name: self.selector(name) for name in ("title_input", "editor")},
+            timeout=self.timeout("form_field"),
+        )
+
+        # 1) 标题
+        title_input = self.dom.locator("title_input", self.selector("title_input"), resolved["title_input"]["index"])
 
         # 清空并输入
         await title_input.click()
         await title_input.fill("")          # 确保清空
         if title:
-            await title_input.type(title, delay=30)
+            await title_input.type(title, delay=self.typing_delay(30))
 
         self.logger(f"已填写标题: {title}")
 
-        # 2) 正文：<div contenteditable="true" class="tiptap ProseMirror" ...>
-        editor = page.locator('div.tiptap.ProseMirror[contenteditable="true"]')
-        await editor.wait_for(state="visible", timeout=30000)
+        # 2) 正文
+        editor = self.dom.locator("editor", self.selector("editor"), resolved["editor"]["index"])
 
         # 让焦点进入编辑器 -> 全选 -> 删除 -> 输入
         await editor.click()
@@ -193,11 +262,11 @@ class XiaohongshuPublisher:
         await page.keyboard.press("Control+A")
         await page.keyboard.press("Backspace")
         if description:
-            await page.keyboard.type(description, delay=10)
+            await page.keyboard.type(description, delay=self.typing_delay(10))
 
         self.logger(f"已填写笔记内容: {description[:20]}...")
 
-        # 这里不再重复上传，因为你在 navigate_to_publish_page_picture 里已经 upload_images 了
+        # 媒体文件已在 upload_media 步骤中上传完成
         self.logger("表单填写完成。")
 
     async def submit(self, page):
@@ -206,35 +275,20 @@ class XiaohongshuPublisher:
         """
         self.logger("正在提交表单...")
 
-        # 3) 发布按钮：<button class="... publishBtn" ...>发布</button>
-        publish_btn = page.locator("button.publishBtn:has-text('发布')")
-        await publish_btn.wait_for(state="visible", timeout=30000)
-
-        # 等按钮可用（有些站会先 disabled 或被遮罩）
-        await expect(publish_btn).to_be_enabled(timeout=30000)
+        # 3) 发布按钮：可见与可用（有些站会先 disabled）在一次页面内查询中等待
+        target = self.selector("publish_button")
+        resolved = await self.dom.resolve({"publish_button": target}, timeout=self.timeout("publish_button"))
 
         # 点击发布
-        await publish_btn.click()
+        await self.dom.locator("publish_button", target, resolved["publish_button"]["index"]).click()
 
         # 可选：等待“发布成功/审核中/发布中”等提示或跳转（这里给一个通用等待）
         # 你可以根据页面实际提示替换 selector
-        await asyncio.sleep(2)
+        await self.sleep(2)
 
         self.logger("已点击【发布】按钮。")
 
 
-# 标准化入口函数
-async def publish(account, task_data, logger_callback):
-    """
-    运行发布脚本的标准化接口。
-    
-    :param account: 包含用户凭据的 Account 对象。
-    :param task_data: 包含任务数据的字典 (例如笔记内容、图片路径等)。
-    :param logger_callback: 用于将日志消息发送回 UI 的函数。
-    """
-    publisher = XiaohongshuPublisher(account, task_data, logger_callback)
-    await publisher.publish()
-
 async def main():
     # 用于直接测试此脚本
     class MockAccount:
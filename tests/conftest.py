@@ -0,0 +1,40 @@
+import pytest
+from sqlmodel import create_engine
+
+from app.controllers import (
+    account_controller, content_controller, publication_controller, stats_controller, template_controller
+)
+from app.services import database
+from publishers import registry
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    Points the application (and every controller that imported the engine) at a fresh database.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    for module in (
+        database, account_controller, content_controller, publication_controller, stats_controller, template_controller
+    ):
+        monkeypatch.setattr(module, "engine", engine)
+    database.create_db_and_tables()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def accounts(db):
+    return [
+        account_controller.add_account("xiaohongshu", "alice", "secret", "北京"),
+        account_controller.add_account("douyin", "bob", "secret"),
+    ]
+
+
+@pytest.fixture
+def mock_platform(monkeypatch):
+    """
+    Registers tests/mock_publisher.py as platform "mock"; worker processes inherit the environment.
+    """
+    monkeypatch.setenv(registry.EXTRA_MODULES_ENV, "mock_publisher")
+    monkeypatch.setattr(registry, "_publishers", None)
@@ -0,0 +1,63 @@
+"""
+A publisher plugin for tests: no browser, behaviour driven by the task data.
+
+Loaded through registry.EXTRA_MODULES_ENV, so worker processes started with spawn pick it up too.
+
+    delay    seconds to sleep while "publishing"
+    fail     error message to raise
+    crash    exit the worker process immediately
+    wait_recycle  wait (up to 10s) until the watchdog asks to recycle this account's browser
+    spawn_child   start a long-running child process and write its pid to this file
+    block    seconds to block the event loop, ignoring cancellation
+    log_path file to append "start <username>" / "end <username>" lines to
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from publishers.base import BasePublisher
+
+
+class MockPublisher(BasePublisher):
+    platform = "mock"
+    display_name = "Mock"
+    steps = ("post",)
+    uses_browser = False
+
+    async def publish(self):
+        await self.post(None)
+
+    async def post(self, page):
+        self.trace("start")
+        try:
+            if self.task_data.get("crash"):
+                os._exit(3)
+            if self.task_data.get("spawn_child"):
+                child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+                with open(self.task_data["spawn_child"], "w", encoding="utf-8") as f:
+                    f.write(str(child.pid))
+            time.sleep(self.task_data.get("block", 0))
+            if self.task_data.get("wait_recycle"):
+                await self.wait_for_recycle()
+            await asyncio.sleep(self.task_data.get("delay", 0))
+            if self.task_data.get("fail"):
+                raise RuntimeError(self.task_data["fail"])
+            self.logger(f"已发布: {self.task_data.get('title', '')}")
+        finally:
+            self.trace("end")
+
+    async def wait_for_recycle(self):
+        deadline = time.monotonic() + 10
+        while not self.watchdog.should_recycle(self.profile_dir()):
+            if time.monotonic() > deadline:
+                raise RuntimeError("未收到回收请求")
+            await asyncio.sleep(0.02)
+        self.logger("收到回收请求")
+
+    def trace(self, what):
+        log_path = self.task_data.get("log_path")
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(f"{time.monotonic():.6f} {what} {self.account.username}\n")
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import zipfile
+
+from publishers.base import BasePublisher
+from publishers.diagnostics import ARCHIVE_NAME, MAX_MESSAGE_LENGTH, FailureDiagnostics, prune_diagnostics
+
+
+def make_job_dir(root, name, size, mtime):
+    job_dir = root / name
+    (job_dir / "nested").mkdir(parents=True)
+    (job_dir / "nested" / "data.bin").write_bytes(bytes(size))
+    os.utime(job_dir, (mtime, mtime))
+    return job_dir
+
+
+def test_prune_deletes_oldest_first(tmp_path):
+    old = make_job_dir(tmp_path, "old", 400, 1000)
+    middle = make_job_dir(tmp_path, "middle", 400, 2000)
+    new = make_job_dir(tmp_path, "new", 400, 3000)
+    (tmp_path / "stray.txt").write_text("not a job directory")
+
+    prune_diagnostics(tmp_path, 900)
+
+    assert not old.exists()
+    assert middle.exists() and new.exists()
+    assert (tmp_path / "stray.txt").exists()
+
+
+def test_prune_keeps_the_current_job(tmp_path):
+    current = make_job_dir(tmp_path, "current", 1000, 1000)
+    other = make_job_dir(tmp_path, "other", 100, 2000)
+
+    prune_diagnostics(tmp_path, 500, keep="current")
+
+    assert current.exists()
+    assert not other.exists()
+
+
+def test_prune_within_budget_and_missing_root(tmp_path):
+    job_dir = make_job_dir(tmp_path, "job", 100, 1000)
+    prune_diagnostics(tmp_path, 100)
+    assert job_dir.exists()
+    prune_diagnostics(tmp_path / "missing", 0)
+
+
+def test_save_writes_events_and_screenshot(tmp_path):
+    diagnostics = FailureDiagnostics("job-1", root=tmp_path, max_events=3)
+    log = diagnostics.wrap_logger(lambda message: None)
+    for i in range(5):
+        log(f"第 {i} 步")
+    diagnostics.record("console.error", "x" * (MAX_MESSAGE_LENGTH + 10))
+    diagnostics.screenshot = b"\x89PNG"
+
+    path = asyncio.run(diagnostics.save("发生错误: boom"))
+
+    assert path == str(tmp_path / "job-1") == diagnostics.saved_path
+    with zipfile.ZipFile(tmp_path / "job-1" / ARCHIVE_NAME) as archive:
+        assert archive.read("error.txt").decode() == "发生错误: boom"
+        assert archive.read("screenshot.png") == b"\x89PNG"
+        events = json.loads(archive.read("events.json"))
+    # Only the newest max_events events are kept, each message capped
+    assert [event["message"] for event in events[:2]] == ["第 3 步", "第 4 步"]
+    assert len(events[2]["message"]) == MAX_MESSAGE_LENGTH
+
+
+def test_save_prunes_older_jobs(tmp_path):
+    make_job_dir(tmp_path, "older", 2 * 1024 * 1024, 1000)
+    diagnostics = FailureDiagnostics("job-1", root=tmp_path, max_total_mb=1)
+    asyncio.run(diagnostics.save("boom"))
+    assert not (tmp_path / "older").exists()
+    assert (tmp_path / "job-1" / ARCHIVE_NAME).exists()
+
+
+class BrokenTracing:
+    def __init__(self):
+        self.starts = 0
+
+    async def start(self, **kwargs):
+        self.starts += 1
+        raise RuntimeError("tracing broke")
+
+    async def start_chunk(self, **kwargs):
+        pass
+
+    async def stop_chunk(self, **kwargs):
+        pass
+
+
+class Context:
+    def __init__(self, tracing):
+        self.tracing = tracing
+
+
+class StepPublisher(BasePublisher):
+    platform = "test"
+    steps = ["upload"]
+    step_retries = {"upload": 2}
+    retry_backoff = 0
+
+    def __init__(self, diagnostics, failures=0):
+        self.logs = []
+        super().__init__(None, {}, self.logs.append, diagnostics=diagnostics)
+        self.failures = failures
+        self.calls = 0
+
+    async def upload(self, page):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("upload failed")
+
+
+def test_tracing_errors_do_not_fail_or_retry_steps(tmp_path):
+    tracing = BrokenTracing()
+    diagnostics = FailureDiagnostics("job-1", root=tmp_path, trace=True)
+    diagnostics.context = Context(tracing)
+    publisher = StepPublisher(diagnostics)
+
+    asyncio.run(publisher.run_step("upload", None))
+    asyncio.run(publisher.run_step("upload", None))
+
+    assert publisher.calls == 2
+    assert "upload" in publisher.step_timings
+    assert publisher.logs == ["诊断 trace 出错，本任务停止录制: tracing broke"]
+    # Tracing stays off for the rest of the job; the step boundaries are still recorded
+    assert tracing.starts == 1
+    assert not diagnostics.trace
+    assert [message for _, kind, message in diagnostics.events if kind == "step"] == ["upload", "upload"]
+
+
+def test_step_failures_are_still_retried(tmp_path):
+    publisher = StepPublisher(FailureDiagnostics("job-1", root=tmp_path), failures=2)
+    asyncio.run(publisher.run_step("upload", None))
+    assert publisher.calls == 3
+    assert len(publisher.logs) == 2
@@ -0,0 +1,241 @@
+import asyncio
+import time
+
+import pytest
+from sqlmodel import Session, select
+
+from app.controllers import account_controller, content_controller, publication_controller
+from app.models.account_model import Account
+from app.models.publish_content_model import PublishContent
+from app.services import job_runner
+from app.services.job_engine import JobEngine, PublishJob
+
+pytestmark = pytest.mark.usefixtures("mock_platform")
+
+
+@pytest.fixture
+def mock_accounts(db):
+    return [account_controller.add_account("mock", name, "secret") for name in ("carol", "dave")]
+
+
+def submit_and_wait(engine, jobs, task_data, before_wait=None):
+    async def main():
+        job = engine.submit(jobs, task_data)
+        if before_wait is not None:
+            await before_wait(engine, job)
+        await job.wait()
+        return job
+
+    return asyncio.run(main())
+
+
+def batch(accounts, *contents):
+    return job_runner.build_jobs([
+        {"account": account, "platform": account.platform, "content": content}
+        for account, content in zip(accounts, contents)
+    ])
+
+
+TASK_DATA = {"title": "标题", "description": "正文", "media_paths": []}
+
+
+def statuses(publication_records):
+    return sorted((record.account_id, record.status) for record in publication_records)
+
+
+def test_submit_records_every_result(mock_accounts):
+    carol, dave = mock_accounts
+
+    job = submit_and_wait(JobEngine(), batch(mock_accounts, {}, {"fail": "发布按钮不可用"}), TASK_DATA)
+
+    assert job.status == "finished"
+    assert not job.success
+    assert job.results == {0: (True, ""), 1: (False, "发布按钮不可用")}
+    assert job.snapshot()["succeeded"] == 1
+    assert statuses(publication_controller.get_publication_records()) == [(carol.id, "success"), (dave.id, "failed")]
+    recorded = [event for _, _, event in job.events if event[0] == "job_recorded"]
+    assert sorted(recorded) == [("job_recorded", 0, "success", True), ("job_recorded", 1, "failed", True)]
+    # Every job gets a unique, time-sortable key for its diagnostics directory
+    assert job.jobs[0]["key"].endswith(f"-{job.id}-0")
+
+
+def test_cancel_one_job(mock_accounts):
+    async def cancel_first(engine, job):
+        while 0 not in job.started_at:
+            await asyncio.sleep(0.01)
+        assert engine.cancel(job.id, 0)
+
+    engine = JobEngine()
+    job = submit_and_wait(engine, batch(mock_accounts, {"delay": 5}, {"delay": 0.1}), TASK_DATA, cancel_first)
+
+    assert job.statuses == {0: "cancelled", 1: "success"}
+    assert job.snapshot()["cancelled"] == 1
+    assert not engine.cancel(job.id)
+    assert not engine.cancel("missing")
+
+
+def test_cancel_whole_batch_while_queued(mock_accounts):
+    async def cancel_all(engine, job):
+        assert engine.cancel(job.id)
+
+    job = submit_and_wait(JobEngine(), batch(mock_accounts, {}, {}), TASK_DATA, cancel_all)
+
+    assert job.statuses == {0: "cancelled", 1: "cancelled"}
+    # Never started, so no duration is recorded
+    assert [record.duration_ms for record in publication_controller.get_publication_records()] == [None, None]
+
+
+def test_settles_claimed_contents(db, mock_accounts):
+    carol, dave = mock_accounts
+    content_controller.add_contents([
+        {"batch": "b", "account_id": account.id, "title": account.username, "description": "d"}
+        for account in mock_accounts
+    ])
+    contents = content_controller.claim_contents("b", [carol.id, dave.id])
+    jobs = job_runner.build_jobs([
+        {"account": carol, "platform": "mock", "content_id": contents[carol.id].id},
+        {"account": dave, "platform": "mock", "content_id": contents[dave.id].id, "content": {"fail": "失败"}},
+    ])
+
+    submit_and_wait(JobEngine(), jobs, TASK_DATA)
+
+    with Session(db) as session:
+        assert {c.account_id: c.status for c in session.exec(select(PublishContent))} == {
+            carol.id: "used", dave.id: "pending",
+        }
+
+
+def test_long_poll_returns_as_soon_as_an_event_arrives(mock_accounts):
+    async def main():
+        engine = JobEngine()
+        job = engine.submit(batch(mock_accounts[:1], {"delay": 0.3}), TASK_DATA)
+        await asyncio.sleep(0.05)
+        since = len(job.events)
+
+        # No new events within the timeout
+        started = time.monotonic()
+        assert await job.wait_events(since, timeout=0.05) == []
+        assert time.monotonic() - started >= 0.05
+
+        # Woken up by the next event, well before the timeout
+        started = time.monotonic()
+        events = await job.wait_events(since, timeout=10)
+        assert events and events[0][0] == since
+        assert time.monotonic() - started < 5
+
+        await job.wait()
+        # A finished job never blocks
+        assert await job.wait_events(len(job.events), timeout=10) == []
+        return job
+
+    job = asyncio.run(main())
+    assert [event[0] for _, _, event in job.events] == ["job_started", "log", "job_finished", "job_recorded"]
+
+
+def test_describe_event():
+    carol = Account(id=1, platform="mock", username="carol", password="")
+    job = PublishJob(job_runner.build_jobs([{"account": carol, "platform": "mock"}]), TASK_DATA)
+
+    assert job.describe_event(0, 1.5, ("log", 0, "打开页面")) == {
+        "seq": 0, "time": 1.5, "type": "log", "account": "carol", "message": "打开页面",
+    }
+    assert job.describe_event(1, 2.0, ("progress", 0, {"step": "upload", "sent": 5, "total": 10, "rate": 1.0})) == {
+        "seq": 1, "time": 2.0, "type": "progress", "account": "carol",
+        "step": "upload", "sent": 5, "total": 10, "rate": 1.0,
+    }
+    assert job.describe_event(2, 3.0, ("job_finished", 0, False, "超时"))["error"] == "超时"
+    assert job.describe_event(3, 3.0, ("job_recorded", 0, "failed", True))["saved"] is True
+    assert job.describe_event(4, 3.0, ("diagnostics", 0, "/tmp/d"))["path"] == "/tmp/d"
+    sample = {"total_rss_mb": 100}
+    assert job.describe_event(5, 4.0, ("resources", None, sample)) == {
+        "seq": 5, "time": 4.0, "type": "resources", "sample": sample,
+    }
+
+
+class Context:
+    def __init__(self):
+        self.messages = []
+        self.progress = []
+
+    async def info(self, message):
+        self.messages.append(message)
+
+    async def report_progress(self, progress, total):
+        self.progress.append((progress, total))
+
+
+@pytest.fixture
+def mcp_server(monkeypatch, db):
+    pytest.importorskip("mcp")
+    from app.services import mcp_server
+
+    monkeypatch.setattr(mcp_server, "engine", JobEngine())
+    return mcp_server
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"jpg")
+    return [str(path)]
+
+
+def test_mcp_enqueue_and_follow_a_job(mcp_server, mock_accounts, media):
+    carol, dave = mock_accounts
+
+    async def main():
+        snapshot = await mcp_server.enqueue_publish([carol.id, dave.id], media, "标题", "正文")
+        assert snapshot["accounts"] == ["carol", "dave"]
+        ctx = Context()
+        final = await mcp_server.watch_job(snapshot["job_id"], ctx)
+        polled = await mcp_server.get_job(snapshot["job_id"], since=1, wait_seconds=1)
+        return final, ctx, polled
+
+    final, ctx, polled = asyncio.run(main())
+
+    assert final["status"] == "finished"
+    assert final["succeeded"] == 2
+    assert sorted(ctx.messages) == ["[carol] 已发布: 标题", "[dave] 已发布: 标题"]
+    assert ctx.progress[-1] == (2, 2)
+    assert polled["events"][0]["seq"] == 1
+    assert {event["type"] for event in polled["events"]} >= {"job_finished", "job_recorded"}
+
+
+def test_mcp_enqueue_claims_batch_contents(db, mcp_server, mock_accounts, media):
+    carol, dave = mock_accounts
+    content_controller.add_contents([
+        {"batch": "b", "account_id": carol.id, "title": "第一条", "description": "d"},
+        {"batch": "b", "account_id": carol.id, "title": "第二条", "description": "d"},
+        {"batch": "b", "account_id": dave.id, "title": "dave 的内容", "description": "d"},
+    ])
+
+    async def main():
+        snapshot = await mcp_server.enqueue_publish([carol.id], media, content_batch="b")
+        await mcp_server.engine.get(snapshot["job_id"]).wait()
+
+    asyncio.run(main())
+
+    assert [record.title for record in publication_controller.get_publication_records()] == ["第一条"]
+    assert asyncio.run(mcp_server.list_content_batches()) == [{"batch": "b", "total": 3, "pending": 2}]
+
+
+def test_mcp_enqueue_releases_claims_when_rejected(db, mcp_server, mock_accounts, media):
+    carol, dave = mock_accounts
+    content_controller.add_contents([{"batch": "b", "account_id": carol.id, "title": "t", "description": "d"}])
+
+    # dave has nothing left in the batch: carol's claim is handed back
+    with pytest.raises(ValueError, match="dave"):
+        asyncio.run(mcp_server.enqueue_publish([carol.id, dave.id], media, content_batch="b"))
+    # The media check fails after claiming
+    with pytest.raises(ValueError, match="文件不存在"):
+        asyncio.run(mcp_server.enqueue_publish([carol.id], ["missing.jpg"], content_batch="b"))
+
+    with Session(db) as session:
+        assert [c.status for c in session.exec(select(PublishContent))] == ["pending"]
+    assert mcp_server.engine.jobs == {}
+
+
+def test_mcp_rejects_unknown_jobs(mcp_server):
+    for call in (mcp_server.get_job("missing"), mcp_server.watch_job("missing", Context())):
+        with pytest.raises(ValueError, match="任务不存在"):
+            asyncio.run(call)
@@ -0,0 +1,263 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+
+from app.services import job_runner
+from app.services.resource_watchdog import pid_alive
+from publishers.base import LEGACY_MIGRATION_LOCK, BasePublisher
+
+
+pytestmark = pytest.mark.usefixtures("mock_platform")
+
+
+def make_jobs(*specs):
+    """
+    specs: (account_id, content) pairs; the username is derived from the account id.
+    """
+    return [
+        {
+            "index": i,
+            "platform": "mock",
+            "account": {"id": account_id, "platform": "mock", "username": f"user{account_id}", "password": "", "remark": ""},
+            "content": content,
+            "content_id": None,
+            "login_expired": False,
+        }
+        for i, (account_id, content) in enumerate(specs)
+    ]
+
+
+TASK_DATA = {"title": "标题", "description": "正文", "media_paths": []}
+
+
+def run_coordinator(jobs, processes, concurrency=1):
+    events = []
+    coordinator = job_runner.JobCoordinator(jobs, TASK_DATA, processes, concurrency)
+    coordinator.run(events.append)
+    return events
+
+
+def finished(events):
+    return {event[1]: (event[2], event[3]) for event in events if event[0] == "job_finished"}
+
+
+def intervals(log_path):
+    """
+    username -> list of (start, end) from the mock publisher's log.
+    """
+    starts, result = {}, defaultdict(list)
+    for line in log_path.read_text(encoding="utf-8").splitlines():
+        at, what, username = line.split()
+        if what == "start":
+            starts[username] = float(at)
+        else:
+            result[username].append((starts.pop(username), float(at)))
+    return result
+
+
+def overlaps(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def test_shards_keep_accounts_together_and_balance():
+    jobs = make_jobs((1, {}), (2, {}), (1, {}), (3, {}), (1, {}), (2, {}))
+    shards = job_runner.JobCoordinator(jobs, TASK_DATA, processes=2).shards()
+
+    assert [[job["index"] for job in shard] for shard in shards] == [[0, 2, 4], [1, 3, 5]]
+    # Never more processes than jobs
+    assert len(job_runner.JobCoordinator(jobs[:1], TASK_DATA, processes=4).shards()) == 1
+
+
+def test_coordinator_runs_every_job():
+    jobs = make_jobs((1, {}), (2, {"fail": "发布按钮不可用"}), (3, {}))
+
+    events = run_coordinator(jobs, processes=2)
+
+    assert finished(events) == {0: (True, ""), 1: (False, "发布按钮不可用"), 2: (True, "")}
+    assert ("log", 0, "已发布: 标题") in events
+    assert not [event for event in events if event[0] == "worker_exited"]
+
+
+def test_crashed_worker_only_fails_its_own_jobs():
+    # Account 1 goes to the first worker, which dies on its second job
+    jobs = make_jobs((1, {}), (1, {"crash": True}), (1, {}), (2, {}))
+
+    events = run_coordinator(jobs, processes=2)
+
+    assert finished(events) == {
+        0: (True, ""),
+        1: (False, "工作进程异常退出 (exitcode=3)"),
+        2: (False, "工作进程异常退出 (exitcode=3)"),
+        3: (True, ""),
+    }
+
+
+def test_jobs_of_one_account_run_one_at_a_time(tmp_path):
+    log_path = tmp_path / "mock.log"
+    content = {"delay": 0.3, "log_path": str(log_path)}
+    jobs = make_jobs((1, content), (1, content), (2, content), (1, content))
+
+    events = run_coordinator(jobs, processes=2, concurrency=3)
+
+    assert all(success for success, _ in finished(events).values())
+    runs = intervals(log_path)
+    assert len(runs["user1"]) == 3
+    assert not any(overlaps(a, b) for i, a in enumerate(runs["user1"]) for b in runs["user1"][i + 1:])
+
+
+def test_in_process_shard_respects_concurrency_and_account_locks(tmp_path):
+    log_path = tmp_path / "mock.log"
+    content = {"delay": 0.2, "log_path": str(log_path)}
+    jobs = make_jobs((1, content), (2, content), (1, content), (3, content))
+    events = []
+
+    asyncio.run(job_runner.run_shard(jobs, TASK_DATA, events.append, concurrency=2, locks=defaultdict(asyncio.Lock)))
+
+    assert len(finished(events)) == 4
+    runs = intervals(log_path)
+    assert not overlaps(*runs["user1"])
+    # Different accounts do run side by side
+    assert overlaps(runs["user1"][0], runs["user2"][0])
+
+
+def test_expired_accounts_do_not_start_a_browser():
+    # Playwright is not installed here: run_shard must not load it when no job needs a browser
+    jobs = [{**job, "platform": "xiaohongshu", "login_expired": True} for job in make_jobs((1, {}), (2, {}))]
+    events = []
+
+    asyncio.run(job_runner.run_shard(jobs, TASK_DATA, events.append))
+
+    assert finished(events) == {
+        0: (False, "账号登录已失效，请先重新登录（未打开浏览器）"),
+        1: (False, "账号登录已失效，请先重新登录（未打开浏览器）"),
+    }
+
+
+def test_legacy_profile_is_migrated_by_exactly_one_account(tmp_path):
+    root = tmp_path / "xiaohongshu"
+    (root / "Default").mkdir(parents=True)
+    (root / "Local State").write_text("{}")
+    (root / "Default" / "Cookies").write_text("cookies")
+    (root / "7").mkdir()  # an account that already has its own directory
+
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def migrate(account_id):
+        barrier.wait()
+        results[account_id] = BasePublisher.migrate_legacy_profile(root / str(account_id))
+
+    threads = [threading.Thread(target=migrate, args=(account_id,)) for account_id in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    [winner] = [account_id for account_id, migrated in results.items() if migrated]
+    assert (root / str(winner) / "Local State").exists()
+    assert (root / str(winner) / "Default" / "Cookies").read_text() == "cookies"
+    assert not (root / "Local State").exists()
+    assert not (root / LEGACY_MIGRATION_LOCK).exists()
+    assert sorted(entry.name for entry in root.iterdir()) == sorted({str(winner), "7"})
+    # Nothing left to migrate afterwards
+    assert not BasePublisher.migrate_legacy_profile(root / "9")
+
+
+def test_shard_control_cancels_registered_and_future_tasks():
+    async def main():
+        control = job_runner.ShardControl()
+        control.cancel(1)  # before the task exists
+        first = asyncio.create_task(asyncio.sleep(10))
+        second = asyncio.create_task(asyncio.sleep(10))
+        control.register(0, first)
+        control.register(1, second)
+        await asyncio.sleep(0)
+        assert not first.cancelled() and second.cancelled()
+
+        control.cancel()
+        late = asyncio.create_task(asyncio.sleep(10))
+        control.register(2, late)
+        await asyncio.gather(first, late, return_exceptions=True)
+        assert first.cancelled() and late.cancelled()
+
+    asyncio.run(main())
+
+
+def test_cancel_one_job_of_a_shard():
+    jobs = make_jobs((1, {"delay": 10}), (2, {"delay": 0.2}))
+    control = job_runner.ShardControl()
+    events = []
+
+    def emit(event):
+        events.append(event)
+        if event == ("job_started", 0):
+            control.cancel(0)
+
+    started = time.monotonic()
+    asyncio.run(job_runner.run_shard(jobs, TASK_DATA, emit, concurrency=2, control=control))
+
+    assert time.monotonic() - started < 5
+    assert ("job_cancelled", 0) in events
+    assert finished(events) == {1: (True, "")}
+
+
+def test_cancelled_shard_does_not_start():
+    control = job_runner.ShardControl()
+    control.cancel()
+    events = []
+
+    asyncio.run(job_runner.run_shard(make_jobs((1, {}), (2, {})), TASK_DATA, events.append, control=control))
+
+    assert events == [("job_cancelled", 0), ("job_cancelled", 1)]
+
+
+def test_cancel_reaches_the_owning_worker():
+    jobs = make_jobs((1, {"delay": 10}), (2, {"delay": 0.5}))
+    coordinator = job_runner.JobCoordinator(jobs, TASK_DATA, processes=2)
+    events = []
+
+    def on_event(event):
+        events.append(event)
+        if event == ("job_started", 0):
+            coordinator.cancel(0)
+
+    coordinator.run(on_event)
+
+    assert ("job_cancelled", 0) in events
+    assert finished(events) == {1: (True, "")}
+
+
+@pytest.mark.parametrize("tree_kill", [True, False])
+def test_unresponsive_workers_are_killed_after_the_grace_period(tmp_path, monkeypatch, tree_kill):
+    monkeypatch.chdir(tmp_path)
+    if not tree_kill:
+        # Without psutil only the worker process itself can be killed
+        monkeypatch.setattr(job_runner, "kill_process_tree", lambda pid: False)
+    child_pid_path = tmp_path / "child.pid"
+    # Account 1's worker blocks its event loop and never sees the cancel request
+    jobs = make_jobs((1, {"spawn_child": str(child_pid_path), "block": 30}), (1, {}), (2, {"delay": 30}))
+    coordinator = job_runner.JobCoordinator(jobs, TASK_DATA, processes=2)
+    coordinator.cancel_grace = 0.5
+    events = []
+
+    def on_event(event):
+        events.append(event)
+        if event[0] == "job_started" and len([e for e in events if e[0] == "job_started"]) == 2:
+            coordinator.cancel()
+
+    started = time.monotonic()
+    coordinator.run(on_event)
+
+    assert time.monotonic() - started < 15
+    assert sorted(event[1] for event in events if event[0] == "job_cancelled") == [0, 1, 2]
+    assert not finished(events)
+    child_pid = int(child_pid_path.read_text())
+    if tree_kill:
+        assert not pid_alive(child_pid)
+    else:
+        os.kill(child_pid, signal.SIGTERM)
@@ -0,0 +1,170 @@
+import asyncio
+import struct
+import threading
+
+import pytest
+
+from publishers import media_probe
+from publishers.base import BasePublisher
+from publishers.upload_progress import UploadProgress, UploadStalled
+
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def mvhd(timescale, duration, version=0):
+    if version == 1:
+        return box(b"mvhd", bytes([1, 0, 0, 0]) + struct.pack(">QQIQ", 0, 0, timescale, duration))
+    return box(b"mvhd", bytes(4) + struct.pack(">IIII", 0, 0, timescale, duration))
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def avi(micro_sec_per_frame, total_frames):
+    avih = b"avih" + struct.pack("<I", 56) + struct.pack("<IIIII", micro_sec_per_frame, 0, 0, 0, total_frames)
+    hdrl = b"LIST" + struct.pack("<I", 4 + len(avih)) + b"hdrl" + avih
+    return b"RIFF" + struct.pack("<I", 4 + len(hdrl)) + b"AVI " + hdrl
+
+
+def test_mp4_duration(tmp_path):
+    data = box(b"ftyp", b"isom" + bytes(4)) + box(b"mdat", bytes(100)) + box(b"moov", mvhd(1000, 12_500))
+    path = write(tmp_path, "a.mp4", data)
+    assert media_probe.probe_video(path) == {"size": len(data), "duration": 12.5}
+
+
+def test_mp4_version_1_header_and_64_bit_box(tmp_path):
+    mdat = struct.pack(">I4sQ", 1, b"mdat", 16 + 10) + bytes(10)
+    data = box(b"ftyp", b"qt  ") + mdat + box(b"moov", box(b"trak") + mvhd(600, 600 * 90, version=1))
+    assert media_probe.probe_video(write(tmp_path, "a.mov", data))["duration"] == 90
+
+
+def test_mp4_without_mvhd(tmp_path):
+    data = box(b"ftyp", b"isom") + box(b"moov", box(b"trak"))
+    assert media_probe.probe_video(write(tmp_path, "a.mp4", data))["duration"] is None
+
+
+def test_truncated_mp4(tmp_path):
+    data = box(b"ftyp", b"isom") + box(b"moov", mvhd(1000, 5000))[:20]
+    assert media_probe.probe_video(write(tmp_path, "a.mp4", data))["duration"] is None
+
+
+def test_avi_duration(tmp_path):
+    data = avi(40_000, 250)
+    assert media_probe.probe_video(write(tmp_path, "a.avi", data)) == {"size": len(data), "duration": 10}
+
+
+def test_unknown_format(tmp_path):
+    assert media_probe.probe_video(write(tmp_path, "a.mp4", b"not a video"))["duration"] is None
+
+
+class VideoPublisher(BasePublisher):
+    video_max_bytes = 1024
+    video_min_duration = 5
+    video_max_duration = 60
+
+
+def video_task(path):
+    return {"post_type": "video", "media_paths": [path]}
+
+
+def test_check_task(tmp_path):
+    ok = write(tmp_path, "ok.mp4", box(b"ftyp", b"isom") + box(b"moov", mvhd(1, 30)))
+    short = write(tmp_path, "short.mp4", box(b"ftyp", b"isom") + box(b"moov", mvhd(1, 2)))
+    long = write(tmp_path, "long.avi", avi(1_000_000, 61))
+    large = write(tmp_path, "large.mp4", box(b"ftyp", b"isom") + box(b"mdat", bytes(2048)) + box(b"moov", mvhd(1, 30)))
+    unknown = write(tmp_path, "unknown.mp4", b"x" * 16)
+
+    assert VideoPublisher.check_task(video_task(ok)) == []
+    assert VideoPublisher.check_task(video_task(short)) == ["视频过短: 2.0s，至少 5s"]
+    assert VideoPublisher.check_task(video_task(long)) == ["视频过长: 61s，上限 60s"]
+    assert VideoPublisher.check_task(video_task(large)) == ["视频过大: 0 MB，上限 0 MB"]
+    assert VideoPublisher.check_task(video_task(unknown)) == [f"无法读取视频时长: {unknown}"]
+    assert VideoPublisher.check_task({"post_type": "video", "media_paths": [ok, ok]}) == ["视频笔记只能上传一个视频文件。"]
+    assert VideoPublisher.check_task(video_task(write(tmp_path, "a.mkv", b"")))[0].startswith("不支持的视频格式")
+    assert VideoPublisher.check_task(video_task(str(tmp_path / "missing.mp4"))) == [
+        f"文件不存在: {tmp_path / 'missing.mp4'}"
+    ]
+    assert VideoPublisher.check_task({"post_type": "image", "media_paths": []}) == ["媒体文件路径不能为空。"]
+
+
+def test_publish_checks_the_task_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    probe = media_probe.probe_video
+
+    def recording_probe(path):
+        threads.append(threading.get_ident())
+        return probe(path)
+
+    monkeypatch.setattr(media_probe, "probe_video", recording_probe)
+    short = write(tmp_path, "short.mp4", box(b"ftyp", b"isom") + box(b"moov", mvhd(1, 2)))
+    publisher = VideoPublisher(None, video_task(short), print)
+
+    with pytest.raises(ValueError, match="视频过短"):
+        asyncio.run(publisher.publish())
+    assert threads and threading.get_ident() not in threads
+
+
+class Request:
+    def __init__(self, url, method="POST", body_size=0):
+        self.url = url
+        self.method = method
+        self.body_size = body_size
+
+    async def sizes(self):
+        return {"requestBodySize": self.body_size}
+
+
+def test_upload_requests_are_matched_by_host():
+    progress = UploadProgress(100, upload_hosts=("upload.example.com", "*.vod.example.com"))
+    assert progress.is_upload(Request("https://upload.example.com/part?n=1"))
+    assert progress.is_upload(Request("https://cn.vod.example.com/put", "PUT"))
+    assert not progress.is_upload(Request("https://upload.example.com/part", "GET"))
+    assert not progress.is_upload(Request("https://www.example.com/upload.example.com"))
+    assert not progress.is_upload(Request("https://upload.example.com.evil.net/part"))
+
+
+def test_no_stall_while_a_request_is_in_flight(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("publishers.upload_progress.time.monotonic", lambda: now[0])
+    updates = []
+    progress = UploadProgress(100, on_progress=updates.append, stall_timeout=10, upload_hosts=("up.example.com",))
+    request = Request("https://up.example.com/part", body_size=40)
+
+    progress.on_request(request)
+    now[0] += 60
+    progress.check_stall()
+    assert progress.in_flight == 1
+
+    async def finish():
+        progress.on_request_finished(request)
+        await asyncio.sleep(0)
+
+    asyncio.run(finish())
+    assert progress.in_flight == 0
+    assert progress.sent == 40
+    assert updates[-1]["sent"] == 40
+
+    progress.update(percent=50)
+    assert progress.sent == 50
+    now[0] += 11
+    with pytest.raises(UploadStalled):
+        progress.check_stall()
+
+
+def test_failed_request_no_longer_blocks_stall_detection(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("publishers.upload_progress.time.monotonic", lambda: now[0])
+    progress = UploadProgress(100, stall_timeout=10, upload_hosts=("up.example.com",))
+    request = Request("https://up.example.com/part")
+    progress.on_request(request)
+    progress.on_request_failed(request)
+    now[0] += 11
+    with pytest.raises(UploadStalled):
+        progress.check_stall()
+    progress.update(done=True)
+    assert progress.sent == 100
@@ -0,0 +1,134 @@
+import pytest
+from sqlmodel import create_engine
+
+from app.controllers import publication_controller, stats_controller
+from app.services import database
+
+# The tables as the first release created them (no PRAGMA user_version)
+V1_SCHEMA = [
+    """
+    CREATE TABLE account (
+        id INTEGER NOT NULL PRIMARY KEY,
+        platform VARCHAR NOT NULL,
+        username VARCHAR NOT NULL,
+        password VARCHAR NOT NULL,
+        remark VARCHAR
+    )
+    """,
+    "CREATE INDEX ix_account_platform ON account (platform)",
+    """
+    CREATE TABLE publicationrecord (
+        id INTEGER NOT NULL PRIMARY KEY,
+        title VARCHAR NOT NULL,
+        description VARCHAR NOT NULL,
+        media_paths VARCHAR NOT NULL,
+        status VARCHAR NOT NULL,
+        published_at DATETIME NOT NULL,
+        account_id INTEGER REFERENCES account (id)
+    )
+    """,
+    "CREATE INDEX ix_publicationrecord_status ON publicationrecord (status)",
+    "INSERT INTO account VALUES (1, 'xiaohongshu', 'alice', 'secret', NULL), (2, 'douyin', 'bob', 'secret', NULL)",
+    """
+    INSERT INTO publicationrecord VALUES
+        (1, '春季新品发布', '今天发布了新款连衣裙', 'a.jpg', 'success', '2024-05-01 08:00:00.000000', 1),
+        (2, '秋冬穿搭', '保暖外套推荐', 'b.jpg', 'failed', '2024-05-01 09:00:00.000000', 1),
+        (3, '开箱视频', '新品开箱', 'c.mp4', 'success', '2024-05-02 10:00:00.000000', 2)
+    """,
+]
+
+
+@pytest.fixture(params=[0, 1])
+def v1_db(request, tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    with engine.begin() as connection:
+        for statement in V1_SCHEMA:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(f"PRAGMA user_version = {request.param}")
+    for module in (database, publication_controller, stats_controller):
+        monkeypatch.setattr(module, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def columns(connection, table):
+    return {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+
+
+def test_upgrade_from_v1(v1_db):
+    database.create_db_and_tables()
+
+    with v1_db.connect() as connection:
+        assert database.get_schema_version(connection) == database.SCHEMA_VERSION
+        assert {"login_status", "session_expires_at", "login_checked_at"} <= columns(connection, "account")
+        assert {"duration_ms", "diagnostics_path", "search_grams"} <= columns(connection, "publicationrecord")
+        assert {"publishtemplate", "publishcontent", "publicationdailystat"} <= {
+            row[0] for row in connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        grams = connection.exec_driver_sql("SELECT search_grams FROM publicationrecord WHERE id = 2").scalar()
+        assert set(grams.split()) >= {"秋冬", "穿搭", "推", "推荐"}
+
+    # The rollup is backfilled from the existing records
+    by_day = stats_controller.get_statistics("day")
+    assert [(row["day"], row["total"], row["succeeded"]) for row in by_day] == [
+        ("2024-05-02", 1, 1), ("2024-05-01", 2, 1),
+    ]
+    by_account = stats_controller.get_statistics("account")
+    assert {row["username"]: row["total"] for row in by_account} == {"alice": 2, "bob": 1}
+
+    # Both search indexes are built from the existing records
+    assert [row["id"] for row in publication_controller.search_publication_records("连衣裙")] == [1]
+    assert [row["id"] for row in publication_controller.search_publication_records("新品")] == [3, 1]
+
+
+def test_upgrade_is_idempotent(v1_db):
+    database.create_db_and_tables()
+    publication_controller.add_publication_record(1, "新标题", "正文", [], "success")
+    database.create_db_and_tables()
+
+    assert stats_controller.get_statistics("account")[0]["total"] == 3
+    assert [row["title"] for row in publication_controller.search_publication_records("标题")] == ["新标题"]
+
+
+def test_resumes_from_an_intermediate_version(v1_db):
+    database.create_db_and_tables()
+    with v1_db.begin() as connection:
+        # A version 6 database: no gram column contents and no gram index yet
+        for name in ("insert", "delete", "update"):
+            connection.exec_driver_sql(f"DROP TRIGGER publicationrecord_gram_fts_{name}")
+        connection.exec_driver_sql(f"DROP TABLE {database.PUBLICATION_GRAM_FTS_TABLE}")
+        connection.exec_driver_sql("UPDATE publicationrecord SET search_grams = NULL")
+        connection.exec_driver_sql("PRAGMA user_version = 6")
+
+    database.create_db_and_tables()
+
+    assert [row["id"] for row in publication_controller.search_publication_records("穿搭")] == [2]
+    # Earlier migrations are not replayed: the rollup is not backfilled twice
+    assert sum(row["total"] for row in stats_controller.get_statistics("platform")) == 3
+
+
+def test_claims_without_a_timestamp_are_released(v1_db):
+    database.create_db_and_tables()
+    with v1_db.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO publishcontent (batch, account_id, title, description, media_paths, status, created_at) "
+            "VALUES ('b', 1, 't', 'd', '', 'claimed', '2024-05-01 08:00:00.000000')"
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 7")
+
+    database.create_db_and_tables()
+
+    with v1_db.connect() as connection:
+        assert connection.exec_driver_sql("SELECT status, claimed_at FROM publishcontent").one() == ("pending", None)
+
+
+def test_rollup_follows_platform_changes_made_before_the_upgrade(v1_db):
+    database.create_db_and_tables()
+    with v1_db.begin() as connection:
+        # Older releases left the rollup under the platform the account had when it published
+        connection.exec_driver_sql("UPDATE account SET platform = 'douyin' WHERE id = 1")
+        connection.exec_driver_sql("PRAGMA user_version = 8")
+
+    database.create_db_and_tables()
+
+    assert {row["platform"]: row["total"] for row in stats_controller.get_statistics("platform")} == {"douyin": 3}
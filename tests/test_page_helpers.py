@@ -0,0 +1,178 @@
+import asyncio
+
+import pytest
+
+from publishers import page_helpers
+from publishers.page_helpers import PageHelper, RoundTripCounter, Target, unwrap
+
+PLAYWRIGHT_MODULE = "playwright.async_api._generated"
+
+
+class Locator:
+    __module__ = PLAYWRIGHT_MODULE
+
+    def __init__(self, page, css, index=None):
+        self.page = page
+        self.css = css
+        self.index = index
+
+    def nth(self, index):
+        return Locator(self.page, self.css, index)
+
+    async def click(self, timeout=None):
+        self.page.clicks.append((self.css, self.index))
+        if self.index in self.page.broken:
+            raise RuntimeError("element is not visible")
+
+
+class Keyboard:
+    __module__ = PLAYWRIGHT_MODULE
+
+    def __init__(self):
+        self.pressed = []
+
+    async def press(self, key):
+        self.pressed.append(key)
+
+
+class Page:
+    """
+    Answers the resolve script with a fixed index per target name and the current page version.
+    """
+    __module__ = PLAYWRIGHT_MODULE
+
+    def __init__(self, indexes, version="v1", url="https://example.com/publish?from=home"):
+        self.indexes = indexes
+        self.version = version
+        self.url = url
+        self.evaluations = 0
+        self.failures = []  # errors raised by the next evaluate calls
+        self.clicks = []
+        self.broken = set()  # indexes whose click fails
+        self.keyboard = Keyboard()
+        self.handled = []
+
+    async def evaluate(self, script, args):
+        self.evaluations += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        resolved = {
+            name: {"index": self.indexes[name], "count": 3, "enabled": True, "text": ""} if name in self.indexes else None
+            for name in args["targets"]
+        }
+        return {"done": all(resolved.values()), "resolved": resolved, "version": self.version}
+
+    def locator(self, css, has_text=None):
+        return Locator(self, css)
+
+    async def set_input_files(self, locator, files):
+        self.handled.append(locator)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+BUTTON = Target("button.publish", text="发布")
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(page_helpers, "_resolution_cache", {})
+    monkeypatch.setattr(page_helpers, "_page_versions", {})
+
+
+def test_resolve_caches_the_index_per_page_version():
+    page = Page({"button": 2})
+    helper = PageHelper(page, "test")
+
+    # Nothing known about the page yet: the first match
+    assert helper.locator("button", BUTTON).index == 0
+    assert asyncio.run(helper.resolve({"button": BUTTON}))["button"]["index"] == 2
+    assert helper.locator("button", BUTTON).index == 2
+    # Query strings do not matter, and another helper on the same page shares the cache
+    page.url = "https://example.com/publish?from=draft"
+    assert PageHelper(page, "test").locator("button", BUTTON).index == 2
+    assert PageHelper(page, "other").locator("button", BUTTON).index == 0
+
+    # A new front-end release changes the page version: the cached index no longer applies
+    page.version, page.indexes = "v2", {"button": 1}
+    asyncio.run(helper.snapshot({"button": BUTTON}))
+    assert helper.locator("button", BUTTON).index == 2
+    asyncio.run(helper.resolve({"button": BUTTON}))
+    assert helper.locator("button", BUTTON).index == 1
+
+
+def test_click_uses_the_cache_and_falls_back_to_resolving():
+    page = Page({"button": 2})
+    helper = PageHelper(page, "test")
+
+    # Miss: resolve, then click
+    asyncio.run(helper.click("button", BUTTON))
+    assert page.evaluations == 1
+    assert page.clicks == [("button.publish", 2)]
+
+    # Hit: a single click, no evaluate
+    asyncio.run(helper.click("button", BUTTON))
+    assert page.evaluations == 1
+    assert page.clicks[-1] == ("button.publish", 2)
+
+    # The cached element no longer works: drop it and resolve again
+    page.broken, page.indexes = {2}, {"button": 0}
+    asyncio.run(helper.click("button", BUTTON))
+    assert page.evaluations == 2
+    assert page.clicks[-2:] == [("button.publish", 2), ("button.publish", 0)]
+    assert helper.locator("button", BUTTON).index == 0
+
+
+def test_resolve_retries_navigation_errors_and_reports_missing_targets():
+    page = Page({"button": 1})
+    page.failures = [RuntimeError("Execution context was destroyed, most likely because of a navigation")]
+    helper = PageHelper(page, "test")
+
+    assert asyncio.run(helper.resolve({"button": BUTTON}))["button"]["index"] == 1
+    assert page.evaluations == 2
+
+    with pytest.raises(TimeoutError, match="editor"):
+        asyncio.run(helper.resolve({"button": BUTTON, "editor": Target("div.editor")}, timeout=0))
+    page.failures = [RuntimeError("boom")]
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(helper.resolve({"button": BUTTON}))
+
+
+def test_snapshot_treats_navigation_as_not_found():
+    page = Page({"button": 1})
+    page.failures = [RuntimeError("Cannot find context with specified id")]
+    assert asyncio.run(PageHelper(page, "test").snapshot({"button": BUTTON})) == {"button": None}
+
+
+def test_round_trips_are_counted_through_proxies():
+    page = Page({"button": 1})
+    counter = RoundTripCounter()
+    counted = counter.wrap(page)
+
+    async def main():
+        await counted.evaluate("script", {"targets": {}})
+        # Building locators is local; only the awaited click reaches the driver
+        locator = counted.locator("a").nth(1)
+        assert counter.count == 1
+        await locator.click()
+        # Attributes that are Playwright objects are proxied too
+        await counted.keyboard.press("Control+A")
+        await counted.keyboard.press("Backspace")
+        # Proxies are unwrapped before reaching Playwright
+        await counted.set_input_files(locator, [])
+        async with counted as entered:
+            await entered.evaluate("script", {"targets": {}})
+
+    asyncio.run(main())
+
+    assert counter.count == 7
+    assert page.keyboard.pressed == ["Control+A", "Backspace"]
+    assert isinstance(page.handled[0], Locator)
+    assert unwrap(counted) is page and unwrap(page) is page
+    # Plain values are returned as they are
+    assert counted.url == page.url
+    assert counter.wrap(3) == 3
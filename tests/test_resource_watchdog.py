@@ -0,0 +1,110 @@
+import asyncio
+import os
+
+import pytest
+
+from app.controllers import account_controller
+from app.services import job_runner
+from app.services.job_engine import JobEngine
+from app.services.resource_watchdog import MB, ResourceLimits, ResourceWatchdog, profile_key
+from publishers import registry
+
+
+def browser(rss_mb, pid):
+    return {"rss": rss_mb * MB, "cpu": 0.0, "processes": 3, "pid": pid}
+
+
+def fake_sample(browsers):
+    return {
+        "pid": os.getpid(),
+        "python": {"rss": 50 * MB, "cpu": 0.0, "processes": 1},
+        "browsers": browsers,
+        "browser_rss": sum(b["rss"] for b in browsers.values()),
+        "browser_cpu": 0.0,
+    }
+
+
+def test_apply_limits():
+    watchdog = ResourceWatchdog(max_context_rss_mb=100, max_total_rss_mb=250)
+
+    sample = fake_sample({"/a": browser(150, 1), "/b": browser(50, 2)})
+    watchdog.apply_limits(sample)
+    assert sample["recycle"] == ["/a"] and not sample["throttled"]
+
+    # The same browser is only asked once, even if the request was not acted on yet
+    sample = fake_sample({"/a": browser(160, 1), "/b": browser(120, 2)})
+    watchdog.apply_limits(sample)
+    assert sample["recycle"] == ["/b"] and sample["throttled"]
+    assert watchdog.recycle_requests == {"/a", "/b"}
+
+    # A reopened browser (new pid) is judged again; closed browsers drop their requests
+    sample = fake_sample({"/a": browser(150, 3)})
+    watchdog.apply_limits(sample)
+    assert sample["recycle"] == ["/a"] and not sample["throttled"]
+    assert watchdog.recycle_requests == {"/a"}
+
+    watchdog.reset()
+    assert not watchdog.recycle_requests and not watchdog.throttled
+
+
+def test_should_recycle_matches_normalized_paths(tmp_path):
+    limits = ResourceLimits()
+    limits.update(False, [profile_key(tmp_path / "1")])
+    assert not limits.should_recycle(tmp_path / "2")
+    assert limits.should_recycle(str(tmp_path / "x" / ".." / "1"))
+    assert not limits.should_recycle(tmp_path / "1")
+
+
+def test_throttled_limits_hold_back_new_jobs(mock_platform):
+    jobs = [
+        {"index": 0, "platform": "mock", "account": {"id": 1, "username": "u1"}, "content": {}},
+    ]
+    limits = ResourceLimits()
+    limits.update(True)
+    events = []
+
+    async def main():
+        shard = asyncio.create_task(job_runner.run_shard(jobs, {"title": "t"}, events.append, watchdog=limits))
+        await asyncio.sleep(0.1)
+        assert events == []
+        limits.update(False)
+        await shard
+
+    asyncio.run(main())
+    assert events[0] == ("job_started", 0)
+
+
+def test_engine_watchdog_forwards_recycle_requests_to_the_owning_worker(db, mock_platform, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    carol, dave = (account_controller.add_account("mock", name, "secret") for name in ("carol", "dave"))
+    profile = profile_key(registry.get("mock").profile_dir_for(carol))
+    samples = []
+
+    def sample(self):
+        samples.append(None)
+        return fake_sample({profile: browser(500, 1000)})
+
+    monkeypatch.setattr(ResourceWatchdog, "sample", sample)
+    engine = JobEngine(processes=2, watchdog_options={"interval": 0.05, "max_context_rss_mb": 100})
+    jobs = job_runner.build_jobs([
+        {"account": carol, "platform": "mock", "content": {"wait_recycle": True}},
+        {"account": dave, "platform": "mock", "content": {"delay": 0.3}},
+    ])
+
+    async def main():
+        job = engine.submit(jobs, {"title": "t", "description": "d", "media_paths": []})
+        await job.wait()
+        return job
+
+    job = asyncio.run(main())
+
+    assert job.results == {0: (True, ""), 1: (True, "")}
+    events = [event for _, _, event in job.events]
+    assert ("log", 0, "收到回收请求") in events
+    resources = [event[2] for event in events if event[0] == "resources"]
+    assert resources and resources[0]["recycle"] == [profile]
+    # Sampling stops with the last batch
+    assert engine._watchdog_task is None
+    count = len(samples)
+    asyncio.run(asyncio.sleep(0.1))
+    assert len(samples) == count
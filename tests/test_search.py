@@ -0,0 +1,149 @@
+import logging
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.controllers import account_controller, publication_controller
+from app.models.publication_record_model import PublicationRecord
+from app.services import database
+from app.services.database import publication_search_grams
+
+
+@pytest.fixture
+def records(db, accounts):
+    alice, bob = accounts
+    rows = [
+        (alice, "春季新品发布", "今天发布了新款连衣裙，折扣 50%_off", "success", datetime(2024, 5, 1, 8)),
+        (alice, "秋冬穿搭", "保暖外套推荐，搭配 \"大衣\"", "failed", datetime(2024, 5, 2, 23, 59, 59)),
+        (bob, "开箱视频", "新品开箱 Vlog", "success", datetime(2024, 5, 3)),
+        (bob, "旅行日记", "周末去海边", "cancelled", datetime(2024, 5, 4)),
+    ]
+    with Session(db) as session:
+        for account, title, description, status, published_at in rows:
+            session.add(PublicationRecord(
+                account_id=account.id, title=title, description=description, media_paths="",
+                status=status, published_at=published_at,
+                search_grams=publication_search_grams(title, description),
+            ))
+        session.commit()
+
+
+def titles(query, **filters):
+    return [row["title"] for row in publication_controller.search_publication_records(query, **filters)]
+
+
+def test_long_terms_use_trigram_ranking(records):
+    assert titles("连衣裙") == ["春季新品发布"]
+    assert titles("外套推荐") == ["秋冬穿搭"]
+    assert titles("vlog") == ["开箱视频"]
+    # A title match ranks before a newer description-only match
+    publication_controller.add_publication_record(None, "周末随拍", "顺便聊聊春季新品", [], "success")
+    assert titles("春季新品") == ["春季新品发布", "周末随拍"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("新品", ["开箱视频", "春季新品发布"]),
+    ("穿搭", ["秋冬穿搭"]),
+    ("海", ["旅行日记"]),
+    ("冬穿", ["秋冬穿搭"]),
+    ("搭 推荐", ["秋冬穿搭"]),
+    ("V", ["开箱视频"]),
+    ("开 海", []),
+    ("不存在", []),
+])
+def test_short_terms(records, query, expected):
+    assert titles(query) == expected
+
+
+def test_mixed_short_and_long_terms(records):
+    assert titles("新品 连衣裙") == ["春季新品发布"]
+    assert titles("开箱 连衣裙") == []
+
+
+def test_special_characters_are_literal(records):
+    assert titles("%_") == ["春季新品发布"]
+    assert titles("_o") == ["春季新品发布"]
+    assert titles("%") == ["春季新品发布"]
+    assert titles('"大衣"') == ["秋冬穿搭"]
+    assert titles("AND") == []
+    assert titles("  ") == []
+
+
+def test_date_filters_are_inclusive_days(records):
+    assert titles("新品", since=date(2024, 5, 2)) == ["开箱视频"]
+    assert titles("新品", until=date(2024, 5, 2)) == ["春季新品发布"]
+    assert titles("穿搭", since=date(2024, 5, 2), until=date(2024, 5, 2)) == ["秋冬穿搭"]
+    assert titles("穿搭", until=date(2024, 5, 1)) == []
+
+
+def test_account_and_status_filters(records, accounts):
+    alice, bob = accounts
+    assert titles("新品", account_id=bob.id) == ["开箱视频"]
+    assert titles("新品", account_id=alice.id, status="failed") == []
+    assert titles("新品", status="success", limit=1) == ["开箱视频"]
+
+
+def test_results_are_highlighted(records):
+    [row] = publication_controller.search_publication_records("外套 搭配")
+    assert row["username"] == "alice"
+    assert row["platform"] == "xiaohongshu"
+    assert row["title_html"] == "秋冬穿搭"
+    assert row["description_html"] == "保暖<b>外套</b>推荐，<b>搭配</b> &quot;大衣&quot;"
+
+
+def test_highlight_snippet():
+    text = "开头" + "甲" * 100 + "关键词" + "乙" * 100
+    snippet = publication_controller._highlight(text, ["关键词"], 20)
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "<b>关键词</b>" in snippet
+
+
+def test_short_terms_do_not_scan_the_records(records, db):
+    with db.connect() as connection:
+        plan = connection.exec_driver_sql(
+            f"""
+            EXPLAIN QUERY PLAN SELECT publicationrecord.id FROM publicationrecord
+            WHERE publicationrecord.id IN (
+                SELECT rowid FROM {database.PUBLICATION_GRAM_FTS_TABLE} WHERE {database.PUBLICATION_GRAM_FTS_TABLE} MATCH ?
+            ) AND publicationrecord.title LIKE ?
+            ORDER BY publicationrecord.published_at DESC
+            """,
+            ('"新品"', "%新品%"),
+        ).all()
+    details = [row[-1] for row in plan]
+    assert not any(detail.startswith("SCAN publicationrecord") and "VIRTUAL" not in detail for detail in details)
+    assert any("USING INTEGER PRIMARY KEY" in detail for detail in details)
+
+
+def test_gram_index_follows_deletes(records, accounts):
+    account_controller.delete_account(accounts[1].id)
+    assert titles("新品") == ["春季新品发布"]
+    assert titles("海") == []
+
+
+def test_search_grams():
+    assert publication_search_grams("新品A", "b c!") == "a b c 品 品a 新 新品"
+    assert publication_search_grams(None, "") == ""
+
+
+class NoTrigramConnection:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def exec_driver_sql(self, statement, *args):
+        if "tokenize='trigram'" in statement:
+            raise OperationalError(statement, None, Exception("no such tokenizer: trigram"))
+        return self.connection.exec_driver_sql(statement, *args)
+
+
+def test_missing_trigram_tokenizer_is_logged(db, caplog):
+    with caplog.at_level(logging.WARNING, logger=database.__name__):
+        with db.begin() as connection:
+            database.create_publication_search_index(NoTrigramConnection(connection))
+            sql = connection.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE name = ?", (database.PUBLICATION_FTS_TABLE,)
+            ).scalar()
+    assert "unicode61" in sql
+    assert "trigram" in caplog.text
@@ -0,0 +1,136 @@
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import session_keeper
+from app.services.session_keeper import EXPIRED, EXPIRING, HEALTHY, UNKNOWN
+from publishers.xiaohongshu_publisher import XiaohongshuPublisher
+
+NOW = datetime(2024, 5, 1, 12)
+SESSION = XiaohongshuPublisher.session_cookies[0]
+TOKEN = XiaohongshuPublisher.session_cookies[1]
+
+
+def chromium_time(moment):
+    return (moment - datetime(1601, 1, 1)) // timedelta(microseconds=1)
+
+
+def create_cookies(path, journal_mode="wal"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute(f"PRAGMA journal_mode = {journal_mode}")
+    connection.execute("CREATE TABLE cookies (name TEXT, host_key TEXT, expires_utc INTEGER, has_expires INTEGER)")
+    return connection
+
+
+def add_cookie(connection, name, host_key, expires_at):
+    connection.execute(
+        "INSERT INTO cookies VALUES (?, ?, ?, ?)",
+        (name, host_key, chromium_time(expires_at) if expires_at else 0, 1 if expires_at else 0),
+    )
+
+
+@pytest.fixture
+def profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(XiaohongshuPublisher, "profile_root", str(tmp_path))
+    account = SimpleNamespace(id=1, platform="xiaohongshu", username="alice")
+    return account, tmp_path / "1"
+
+
+def test_cookie_domain_matches():
+    assert session_keeper._cookie_domain_matches(".xiaohongshu.com", "xiaohongshu.com")
+    assert session_keeper._cookie_domain_matches("creator.xiaohongshu.com", ".xiaohongshu.com")
+    assert not session_keeper._cookie_domain_matches("evilxiaohongshu.com", "xiaohongshu.com")
+    assert not session_keeper._cookie_domain_matches("xiaohongshu.com.evil.net", "xiaohongshu.com")
+
+
+def test_read_cookie_expiry_sees_uncheckpointed_wal_writes(tmp_path):
+    path = tmp_path / "Default" / "Network" / "Cookies"
+    # The browser keeps the database open: recent writes only exist in Cookies-wal
+    connection = create_cookies(path)
+    try:
+        add_cookie(connection, SESSION, ".xiaohongshu.com", NOW + timedelta(days=3))
+        add_cookie(connection, SESSION, "creator.xiaohongshu.com", NOW + timedelta(days=1))
+        add_cookie(connection, TOKEN, ".xiaohongshu.com", None)
+        add_cookie(connection, SESSION, ".example.com", NOW)
+        add_cookie(connection, "other", ".xiaohongshu.com", NOW)
+        assert path.with_name("Cookies-wal").stat().st_size > 0
+
+        expiry = session_keeper.read_cookie_expiry(tmp_path, "xiaohongshu.com", [SESSION, TOKEN])
+    finally:
+        connection.close()
+
+    # The earliest expiry across subdomains; session cookies have none
+    assert expiry == {SESSION: NOW + timedelta(days=1), TOKEN: None}
+
+
+def test_read_cookie_expiry_rolls_back_an_interrupted_write(tmp_path):
+    path = tmp_path / "Default" / "Cookies"  # the pre-Network location
+    connection = create_cookies(path, journal_mode="delete")
+    connection.execute("BEGIN")
+    add_cookie(connection, SESSION, ".xiaohongshu.com", NOW + timedelta(days=3))
+    for i in range(2000):
+        add_cookie(connection, f"filler{i}", ".example.com", NOW)
+    connection.execute("COMMIT")
+    # An uncommitted update spills rewritten pages into the database file; Cookies-journal holds the originals
+    connection.execute("PRAGMA cache_size = 1")
+    connection.execute("BEGIN")
+    connection.execute("UPDATE cookies SET expires_utc = 0")
+    try:
+        assert path.with_name("Cookies-journal").exists()
+
+        expiry = session_keeper.read_cookie_expiry(tmp_path, "xiaohongshu.com", [SESSION])
+    finally:
+        connection.rollback()
+        connection.close()
+
+    assert expiry == {SESSION: NOW + timedelta(days=3)}
+
+
+def test_read_cookie_expiry_without_a_database(tmp_path):
+    assert session_keeper.read_cookie_expiry(tmp_path, "xiaohongshu.com", [SESSION]) is None
+
+
+@pytest.mark.parametrize("cookies, expected", [
+    ([(SESSION, NOW + timedelta(days=3))], (HEALTHY, NOW + timedelta(days=3))),
+    ([(SESSION, NOW + timedelta(hours=3)), (TOKEN, NOW + timedelta(days=3))], (EXPIRING, NOW + timedelta(hours=3))),
+    ([(SESSION, NOW - timedelta(minutes=1))], (EXPIRED, NOW - timedelta(minutes=1))),
+    ([], (EXPIRED, None)),  # logged out
+    ([(SESSION, None)], (UNKNOWN, None)),  # session cookies only
+])
+def test_check_login_health(profile, cookies, expected):
+    account, profile_dir = profile
+    connection = create_cookies(profile_dir / "Default" / "Network" / "Cookies")
+    for name, expires_at in cookies:
+        add_cookie(connection, name, ".xiaohongshu.com", expires_at)
+    connection.close()
+
+    assert session_keeper.check_login_health(account, timedelta(hours=24), now=NOW) == expected
+
+
+def test_check_login_health_without_cookie_information(profile):
+    account, _ = profile
+    # The browser was never opened for this account
+    assert session_keeper.check_login_health(account, now=NOW) == (UNKNOWN, None)
+    # Unknown platform
+    assert session_keeper.check_login_health(SimpleNamespace(id=1, platform="nowhere"), now=NOW) == (UNKNOWN, None)
+
+
+def job(username, status):
+    return {"account": SimpleNamespace(username=username, login_status=status), "platform": "xiaohongshu"}
+
+
+def test_sort_by_login_health_is_stable():
+    jobs = [job("a", EXPIRED), job("b", None), job("c", HEALTHY), job("d", UNKNOWN), job("e", EXPIRING), job("f", HEALTHY)]
+    assert [j["account"].username for j in session_keeper.sort_by_login_health(jobs)] == ["c", "f", "e", "b", "d", "a"]
+    # Accounts without a login_status attribute rank as unknown
+    bare = {"account": SimpleNamespace(username="g"), "platform": "xiaohongshu"}
+    assert session_keeper.sort_by_login_health([job("a", EXPIRED), bare])[0] is bare
+
+
+def test_flag_expired():
+    jobs = [job("a", EXPIRED), job("b", HEALTHY), job("c", EXPIRED)]
+    assert session_keeper.flag_expired(jobs) == ["a", "c"]
+    assert [j.get("login_expired", False) for j in jobs] == [True, False, True]
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+
+from publishers import registry, session_recorder
+from publishers.base import BasePublisher
+from publishers.session_recorder import SessionRecorder
+
+
+class ReplayPublisher:
+    instances = []
+
+    def __init__(self, account, task_data, logger_callback, recorder=None):
+        self.account = account
+        self.task_data = task_data
+        self.recorder = recorder
+        ReplayPublisher.instances.append(self)
+
+    async def publish(self):
+        if self.task_data["title"] == "boom":
+            raise RuntimeError("页面结构已变化")
+
+
+@pytest.fixture
+def resolved(monkeypatch):
+    platforms = []
+
+    def get(platform):
+        platforms.append(platform)
+        if platform != "xiaohongshu":
+            raise ValueError(f"不支持的平台: {platform}")
+        return ReplayPublisher
+
+    monkeypatch.setattr(registry, "get", get)
+    ReplayPublisher.instances = []
+    return platforms
+
+
+def record(tmp_path, name, title="标题", platform="xiaohongshu", har=True):
+    media = tmp_path / "cover.jpg"
+    media.write_bytes(b"jpg")
+    account = type("Account", (), {"id": 3, "platform": platform, "username": "alice", "remark": ""})()
+    recorder = SessionRecorder(SessionRecorder.RECORD, tmp_path / "sessions" / name)
+    recorder.save_metadata(platform, account, {"title": title, "description": "d", "media_paths": [str(media)]})
+    if har:
+        recorder.har_path.write_bytes(b"har")
+    return recorder.session_dir
+
+
+def test_replay_resolves_the_publisher_through_the_registry(tmp_path, resolved):
+    session_dir = record(tmp_path, "ok")
+
+    success, elapsed, error = asyncio.run(session_recorder.replay_session(session_dir, print))
+
+    assert (success, error) == (True, "")
+    assert elapsed >= 0
+    assert resolved == ["xiaohongshu"]
+    [publisher] = ReplayPublisher.instances
+    assert publisher.recorder.is_replay
+    assert publisher.account.username == "alice"
+    assert publisher.account.password == ""
+    # Media is replayed from the copy inside the session directory
+    assert publisher.task_data["media_paths"] == [str(session_dir / "media" / "cover.jpg")]
+    # Replay uses a throwaway browser profile, removed afterwards
+    assert publisher.recorder.user_data_dir("real-profile") != "real-profile"
+    assert not publisher.recorder.profile_dir.exists()
+
+
+def test_replay_fails_cleanly_when_the_archive_is_missing(tmp_path, resolved):
+    session_dir = record(tmp_path, "no-har", har=False)
+
+    success, _, error = asyncio.run(session_recorder.replay_session(session_dir, print))
+
+    assert not success
+    assert "录制文件不存在" in error
+    assert resolved == []
+
+
+def test_replay_fails_cleanly_for_missing_metadata_or_platform(tmp_path, resolved):
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    (empty / session_recorder.HAR_FILE_NAME).write_bytes(b"har")
+    assert not asyncio.run(session_recorder.replay_session(empty, print))[0]
+
+    unknown = record(tmp_path, "unknown", platform="nowhere")
+    success, _, error = asyncio.run(session_recorder.replay_session(unknown, print))
+    assert not success
+    assert error == "不支持的平台: nowhere"
+
+
+def test_replay_all_reports_every_session(tmp_path, resolved):
+    record(tmp_path, "a")
+    record(tmp_path, "b", title="boom")
+    record(tmp_path, "c", har=False)  # not a complete recording, skipped
+
+    results = asyncio.run(session_recorder.replay_all(tmp_path / "sessions", lambda message: None, concurrency=2))
+
+    assert [(path.name, success, error) for path, (success, _, error) in results] == [
+        ("a", True, ""), ("b", False, "页面结构已变化"),
+    ]
+
+
+def test_metadata_round_trip(tmp_path):
+    session_dir = record(tmp_path, "meta")
+    meta = json.loads((session_dir / session_recorder.META_FILE_NAME).read_text(encoding="utf-8"))
+    assert meta["task_data"]["media_paths"] == ["cover.jpg"]
+    assert "password" not in meta["account"]
+
+
+def test_replay_skips_waits_and_typing_delays():
+    recorder = SessionRecorder(SessionRecorder.REPLAY, "unused")
+    publisher = BasePublisher(None, {}, print, recorder=recorder)
+    assert publisher.typing_delay(120) == 0
+    assert recorder.launch_options() == {"headless": True}
+    with pytest.raises(ValueError):
+        SessionRecorder("live", "unused")
@@ -0,0 +1,114 @@
+from datetime import date, datetime
+
+from sqlmodel import Session, select
+
+from app.controllers import account_controller, publication_controller, stats_controller
+from app.models.publication_record_model import PublicationRecord
+from app.models.publication_stat_model import PublicationDailyStat
+
+
+def add_record(db, account, status, published_at, duration_ms=None):
+    # Same transaction shape as add_publication_record, with a chosen publication time
+    with Session(db) as session:
+        record = PublicationRecord(
+            account_id=account.id, title="t", description="d", media_paths="",
+            status=status, duration_ms=duration_ms, published_at=published_at,
+        )
+        session.add(record)
+        stats_controller.update_rollup(session, record, account.platform)
+        session.commit()
+
+
+def rollup_rows(db):
+    with Session(db) as session:
+        return {
+            (row.day, row.platform, row.account_id): (row.total, row.succeeded, row.failed, row.cancelled)
+            for row in session.exec(select(PublicationDailyStat)).all()
+        }
+
+
+def test_rollup_is_updated_with_each_record(db, accounts):
+    alice, _ = accounts
+    add_record(db, alice, "success", datetime(2024, 5, 1, 8), duration_ms=1000)
+    add_record(db, alice, "failed", datetime(2024, 5, 1, 23, 59), duration_ms=3000)
+    add_record(db, alice, "cancelled", datetime(2024, 5, 2, 0, 0, 1))
+
+    assert rollup_rows(db) == {
+        ("2024-05-01", "xiaohongshu", alice.id): (2, 1, 1, 0),
+        ("2024-05-02", "xiaohongshu", alice.id): (1, 0, 0, 1),
+    }
+    [stats] = stats_controller.get_statistics("platform")
+    assert stats["total"] == 3
+    assert stats["success_rate"] == 1 / 3
+    # Records without a duration do not count towards the average
+    assert stats["avg_duration_ms"] == 2000
+    assert stats["max_duration_ms"] == 3000
+    assert stats["per_day"] == 1.5
+
+
+def test_statistics_grouping_and_filters(db, accounts):
+    alice, bob = accounts
+    add_record(db, alice, "success", datetime(2024, 5, 1))
+    add_record(db, alice, "success", datetime(2024, 5, 3))
+    add_record(db, bob, "failed", datetime(2024, 5, 3))
+
+    by_account = stats_controller.get_statistics("account")
+    assert [(row["username"], row["total"], row["succeeded"]) for row in by_account] == [("alice", 2, 2), ("bob", 1, 0)]
+    by_day = stats_controller.get_statistics("day")
+    assert [(row["day"], row["total"], row["per_day"]) for row in by_day] == [("2024-05-03", 2, 2), ("2024-05-01", 1, 1)]
+
+    since = stats_controller.get_statistics("platform", since=date(2024, 5, 2), until=date(2024, 5, 3))
+    assert {row["platform"]: row["total"] for row in since} == {"xiaohongshu": 1, "douyin": 1}
+    assert all(row["per_day"] == 0.5 for row in since)
+    assert stats_controller.get_statistics("account", platform="douyin")[0]["username"] == "bob"
+    assert stats_controller.get_statistics("day", account_id=bob.id)[0]["day"] == "2024-05-03"
+
+
+def test_add_publication_record_updates_the_rollup(db, accounts):
+    alice, _ = accounts
+    publication_controller.add_publication_record(alice.id, "t", "d", ["a.jpg"], "success", duration_ms=5)
+    [(key, counts)] = rollup_rows(db).items()
+    assert key == (stats_controller.utc_today().isoformat(), "xiaohongshu", alice.id)
+    assert counts == (1, 1, 0, 0)
+
+
+def test_deleting_an_account_removes_its_rollup(db, accounts):
+    alice, bob = accounts
+    add_record(db, alice, "success", datetime(2024, 5, 1))
+    add_record(db, bob, "success", datetime(2024, 5, 1))
+    add_record(db, bob, "failed", datetime(2024, 5, 2))
+
+    assert account_controller.delete_account(bob.id)
+
+    assert rollup_rows(db) == {("2024-05-01", "xiaohongshu", alice.id): (1, 1, 0, 0)}
+    with Session(db) as session:
+        assert session.exec(select(PublicationRecord.account_id)).all() == [alice.id]
+    assert [row["platform"] for row in stats_controller.get_statistics("platform")] == ["xiaohongshu"]
+    assert not account_controller.delete_account(bob.id)
+
+
+def test_changing_an_account_platform_moves_its_rollup(db, accounts):
+    alice, bob = accounts
+    add_record(db, alice, "success", datetime(2024, 5, 1), duration_ms=1000)
+    add_record(db, alice, "failed", datetime(2024, 5, 2), duration_ms=4000)
+    # A row already filed under the new platform for the same day (left behind by an earlier platform change)
+    add_record(db, alice.model_copy(update={"platform": "douyin"}), "success", datetime(2024, 5, 1), duration_ms=3000)
+    add_record(db, bob, "success", datetime(2024, 5, 1))
+
+    account_controller.update_account(alice.id, {"platform": "douyin", "remark": "换平台"})
+
+    assert rollup_rows(db) == {
+        ("2024-05-01", "douyin", alice.id): (2, 2, 0, 0),
+        ("2024-05-02", "douyin", alice.id): (1, 0, 1, 0),
+        ("2024-05-01", "douyin", bob.id): (1, 1, 0, 0),
+    }
+    [douyin] = stats_controller.get_statistics("platform")
+    assert (douyin["platform"], douyin["total"], douyin["max_duration_ms"]) == ("douyin", 4, 4000)
+    assert douyin["avg_duration_ms"] == 8000 / 3
+    assert {row["username"]: row["platform"] for row in stats_controller.get_statistics("account")} == {
+        "alice": "douyin", "bob": "douyin",
+    }
+
+    # Updates that keep the platform leave the rollup alone
+    account_controller.update_account(alice.id, {"platform": "douyin", "remark": ""})
+    assert len(rollup_rows(db)) == 3
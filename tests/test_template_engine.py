@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, update
+
+from app.controllers import content_controller, publication_controller, template_controller
+from app.models.publish_content_model import PublishContent
+from app.services import template_engine
+from app.services.template_engine import TemplateError, compile_template
+
+
+def render(source, **context):
+    return compile_template(source).render(context)
+
+
+def test_render_literals_and_variables():
+    assert render("纯文本") == "纯文本"
+    assert render("{{ username }} 的 {{product}}", username="alice", product="新品") == "alice 的 新品"
+    assert render("{{ tags }}", tags=["a", "b"]) == "a,b"
+
+
+def test_filters():
+    assert render('{{ tags|hashtags }}', tags="新品, 好物，#穿搭") == "#新品 #好物 #穿搭"
+    assert render("{{ name|upper }} {{ name|lower }}", name="Ab") == "AB ab"
+    assert render("[{{ name|strip }}]", name="  x ") == "[x]"
+    assert render("{{ q|url }}", q="a b/c") == "a%20b%2Fc"
+    assert render('{{ text|truncate:"3" }}', text="一二三四五") == "一二三"
+    assert render('{{ text|strip|upper|truncate:"2" }}', text=" abc ") == "AB"
+
+
+def test_default_applies_to_missing_and_empty_values():
+    assert render('{{ link|default:"无" }}') == "无"
+    assert render('{{ link|default:"无" }}', link="") == "无"
+    assert render('{{ link|default:"无" }}', link="x") == "x"
+    assert compile_template('{{ a }}{{ b|default:"" }}').required == {"a"}
+
+
+@pytest.mark.parametrize("source, message", [
+    ("{{ 1abc }}", "无效的变量名"),
+    ("{{ name|shout }}", "未知的过滤器"),
+    ("{{ name|truncate }}", "需要参数"),
+    ('{{ name|truncate:"x" }}', "必须是数字"),
+    ("{{ name|upper:'x' }}", "无效的过滤器"),
+    ("标题 {{ name", "未闭合"),
+])
+def test_syntax_errors(source, message):
+    with pytest.raises(TemplateError, match=message):
+        compile_template(source)
+
+
+def test_missing_variable():
+    with pytest.raises(TemplateError, match="缺少变量: product"):
+        render("{{ product }}")
+
+
+def test_render_variants_precedence(accounts):
+    alice, bob = accounts
+    manifest = {
+        "variables": {"campaign": "双十一", "product": "全局"},
+        "accounts": {"alice": {"product": "按用户名"}, str(bob.id): {"product": "按ID"}},
+        "rows": [{}, {"product": "行", "account": "alice"}],
+    }
+    variants = list(template_engine.render_variants(
+        "{{ campaign }}-{{ product }}", "{{ username }}@{{ platform }}", accounts, manifest
+    ))
+    assert [(v["account_id"], v["title"], v["description"]) for v in variants] == [
+        (alice.id, "双十一-按用户名", "alice@xiaohongshu"),
+        (alice.id, "双十一-行", "alice@xiaohongshu"),
+        (bob.id, "双十一-按ID", "bob@douyin"),
+    ]
+
+
+def test_render_variants_media_paths(accounts):
+    manifest = {"rows": [{"media_paths": "a.mp4; b.mp4;"}, {"media_paths": ["c.jpg", "d.jpg"]}, {}]}
+    variants = list(template_engine.render_variants("t", "d", accounts[:1], manifest))
+    assert [v["media_paths"] for v in variants] == ["a.mp4;b.mp4", "c.jpg;d.jpg", ""]
+
+
+@pytest.mark.parametrize("media_paths", [3, ["a.mp4", 1], {"path": "a.mp4"}])
+def test_render_variants_rejects_invalid_media_paths(accounts, media_paths):
+    with pytest.raises(TemplateError, match="账号 alice: media_paths"):
+        list(template_engine.render_variants("t", "d", accounts[:1], {"rows": [{"media_paths": media_paths}]}))
+
+
+def test_render_variants_names_the_account(accounts):
+    with pytest.raises(TemplateError, match="账号 alice: 缺少变量: product"):
+        list(template_engine.render_variants("{{ product }}", "d", accounts))
+
+
+def test_duplicate_template_name(db):
+    template_controller.add_template("模板", "t", "d")
+    with pytest.raises(IntegrityError):
+        template_controller.add_template("模板", "t2", "d2")
+
+
+def test_generate_contents_writes_a_batch(accounts, monkeypatch):
+    monkeypatch.setattr(template_engine, "CHUNK_SIZE", 2)
+    template = template_controller.add_template("模板", "{{ product }}", "{{ username }}")
+    manifest = {"rows": [{"product": "A"}, {"product": "B"}]}
+    progress = []
+    assert template_engine.generate_contents(template, accounts, "b1", manifest, progress.append) == 4
+    assert progress == [2, 4, 4]
+    assert content_controller.get_batches() == [("b1", 4, 4)]
+    with pytest.raises(TemplateError, match="批次已存在"):
+        template_engine.generate_contents(template, accounts, "b1", manifest)
+
+
+def test_generate_contents_leaves_no_partial_batch(accounts):
+    template = template_controller.add_template("模板", "{{ product }}", "d")
+    with pytest.raises(TemplateError):
+        template_engine.generate_contents(template, accounts, "b1", {"rows": [{"product": "A"}, {}]})
+    assert content_controller.get_batches() == []
+
+
+def test_claimed_contents_are_used_only_on_success(accounts):
+    alice, bob = accounts
+    template = template_controller.add_template("模板", "{{ product }}", "d")
+    template_engine.generate_contents(template, accounts, "b1", {"rows": [{"product": "A"}, {"product": "B"}]})
+
+    claimed = content_controller.claim_contents("b1", [alice.id, bob.id])
+    assert {account_id: content.title for account_id, content in claimed.items()} == {alice.id: "A", bob.id: "A"}
+    # A second run started meanwhile gets the next rows, never the claimed ones
+    second = content_controller.claim_contents("b1", [alice.id])
+    assert second[alice.id].title == "B"
+    assert content_controller.claim_contents("b1", [alice.id]) == {}
+    assert content_controller.get_batches() == [("b1", 4, 1)]
+
+    publication_controller.add_publication_record(
+        alice.id, "A", "d", [], "success", content_id=claimed[alice.id].id
+    )
+    publication_controller.add_publication_record(bob.id, "A", "d", [], "failed", content_id=claimed[bob.id].id)
+    content_controller.release_contents([second[alice.id].id])
+    assert content_controller.get_batches() == [("b1", 4, 3)]
+    # The failed content goes back to the batch; the used one never does
+    again = content_controller.claim_contents("b1", [alice.id, bob.id])
+    assert {account_id: content.title for account_id, content in again.items()} == {alice.id: "B", bob.id: "A"}
+
+
+def test_stale_claims_are_handed_back(db, accounts):
+    alice, bob = accounts
+    template = template_controller.add_template("模板", "{{ product }}", "d")
+    template_engine.generate_contents(template, [alice], "b1", {"rows": [{"product": "A"}]})
+    claimed = content_controller.claim_contents("b1", [alice.id])
+    assert claimed[alice.id].claimed_at is not None
+    # A fresh claim is never taken over
+    assert content_controller.claim_contents("b1", [alice.id]) == {}
+
+    # The run that claimed it never recorded a result
+    with Session(db) as session:
+        session.exec(update(PublishContent).values(
+            claimed_at=datetime.utcnow() - content_controller.CLAIM_TIMEOUT - timedelta(minutes=1)
+        ))
+        session.commit()
+    again = content_controller.claim_contents("b1", [alice.id])
+    assert again[alice.id].id == claimed[alice.id].id
+
+    publication_controller.add_publication_record(alice.id, "A", "d", [], "success", content_id=again[alice.id].id)
+    assert content_controller.get_batches() == [("b1", 1, 0)]
+
+
+def test_content_overrides():
+    content = content_controller.PublishContent(batch="b", account_id=1, title="t", description="d", media_paths="a;b")
+    assert template_engine.content_overrides(content) == {"title": "t", "description": "d", "media_paths": ["a", "b"]}
+    content.media_paths = ""
+    assert "media_paths" not in template_engine.content_overrides(content)